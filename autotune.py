@@ -0,0 +1,277 @@
+"""批量转换并发数的自动调节
+
+从CPU数量起步，定期观察各工作进程的内存占用（RSS）、系统可用内存和实际吞吐量（每秒完成的页数，
+不受各文件页数差异的影响），在配置的上下限之间增减工作进程数（默认不超过CPU数量，
+转换是CPU密集的，更多的进程只会互相争抢）：
+- 系统可用内存低于警戒线时，按平均RSS估算需要让出的进程数并立即缩减；
+- 有任务排队且内存充足时逐个增加进程；增加后吞吐量反而下降则退回。
+每次调整都记录下来，可以通过 metrics() 查看。
+"""
+import collections
+import math
+import os
+import threading
+import time
+
+# 可用内存低于总内存的该比例时缩减并发
+LOW_MEMORY_RATIO = 0.10
+# 吞吐量下降超过该比例视为增加并发无效
+THROUGHPUT_TOLERANCE = 0.05
+DEFAULT_INTERVAL = 5.0
+
+
+def cpu_count():
+    """当前进程可用的CPU数量（考虑CPU亲和性），工作进程数和页级并行的默认值"""
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return max(1, os.cpu_count() or 1)
+
+
+def memory_info():
+    """返回 (总内存, 可用内存) 字节数，无法获取时返回None"""
+    try:
+        values = {}
+        with open('/proc/meminfo') as f:
+            for line in f:
+                name, value = line.split(':', 1)
+                values[name] = int(value.split()[0]) * 1024
+        return values['MemTotal'], values['MemAvailable']
+    except (OSError, KeyError, ValueError):
+        pass
+    try:
+        import psutil
+        memory = psutil.virtual_memory()
+        return memory.total, memory.available
+    except ImportError:
+        return None
+
+
+def process_rss(pid):
+    """返回进程的常驻内存字节数，无法获取时返回0"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss
+    except Exception:
+        return 0
+
+
+def process_group_rss(pgid):
+    """进程组（工作进程及其启动的按页并行子进程、渲染进程等）的常驻内存之和
+
+    无法读取 /proc 时只统计组长进程。
+    """
+    try:
+        names = os.listdir('/proc')
+        page_size = os.sysconf('SC_PAGE_SIZE')
+    except (OSError, AttributeError, ValueError):
+        return process_rss(pgid)
+    total = 0
+    for name in names:
+        if not name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{name}/stat', 'rb') as f:
+                # 进程名可能含空格和括号，从最后一个 ')' 之后开始按字段切分
+                fields = f.read().rsplit(b')', 1)[1].split()
+            if int(fields[2]) == pgid:     # pgrp
+                total += int(fields[21]) * page_size   # rss（页数）
+        except (OSError, IndexError, ValueError):
+            continue
+    return total or process_rss(pgid)
+
+
+def _high_water_mark():
+    """当前进程自上次重置以来的峰值常驻内存（/proc/self/status 的 VmHWM），无法获取时返回None"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _reset_high_water_mark():
+    """把 VmHWM 重置为当前RSS（Linux 4.0+ 向 clear_refs 写入5），成功时返回True"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+_peak_lock = threading.Lock()
+_active_peaks = []
+
+
+class PeakRss:
+    """测量一段时间内当前进程的峰值常驻内存
+
+    进程生命周期内的 ru_maxrss 在常驻的工作进程中只会单调增长，不能反映单个任务。
+    Linux上开始时重置内核记录的峰值（VmHWM），结束时读取；重置前先把已有的峰值
+    并入其他正在进行的测量，嵌套或并发的测量互不影响。不支持时改为后台线程定期采样RSS。
+    """
+
+    SAMPLE_INTERVAL = 0.05
+
+    def __init__(self):
+        self.peak = 0
+        self._thread = None
+        self._stop = None
+
+    def start(self):
+        with _peak_lock:
+            current = _high_water_mark()
+            if current is not None and _reset_high_water_mark():
+                for other in _active_peaks:
+                    other.peak = max(other.peak, current)
+                self.peak = process_rss(os.getpid())
+                _active_peaks.append(self)
+                return self
+        self.peak = process_rss(os.getpid())
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name='peak-rss', daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        pid = os.getpid()
+        while not self._stop.wait(self.SAMPLE_INTERVAL):
+            self.peak = max(self.peak, process_rss(pid))
+
+    def stop(self):
+        """结束测量，返回期间的峰值（字节）"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self.peak = max(self.peak, process_rss(os.getpid()))
+            return self.peak
+        with _peak_lock:
+            if self in _active_peaks:
+                _active_peaks.remove(self)
+            self.peak = max(self.peak, _high_water_mark() or 0)
+        return self.peak
+
+
+class ConcurrencyController:
+    """根据内存压力和吞吐量决定工作进程数"""
+
+    def __init__(self, min_workers=1, max_workers=None, initial=None, interval=DEFAULT_INTERVAL,
+                 low_memory_ratio=LOW_MEMORY_RATIO):
+        self.min_workers = max(1, min_workers)
+        self.max_workers = max(self.min_workers, max_workers or cpu_count())
+        self.target = self._clamp(initial or cpu_count())
+        self.interval = interval
+        self.low_memory_ratio = low_memory_ratio
+
+        self.completed = 0
+        self.decisions = collections.deque(maxlen=200)
+        self.last_sample = {}
+        self._window_start = time.monotonic()
+        self._window_pages = 0
+        self._last_throughput = None
+        self._last_action = None
+        # 吞吐量回退过的进程数，之后若干个周期内不再尝试
+        self._blocked = None
+        self._blocked_windows = 0
+
+    def _clamp(self, value):
+        return max(self.min_workers, min(self.max_workers, value))
+
+    def _can_grow(self):
+        return self._blocked is None or self.target + 1 < self._blocked
+
+    def record_completion(self):
+        self.completed += 1
+
+    def record_pages(self, count):
+        """记录完成的页数（DOCX→PDF每个文件计为一页），吞吐量按此计算"""
+        self._window_pages += count
+
+    def due(self):
+        return time.monotonic() - self._window_start >= self.interval
+
+    def decide(self, worker_pids, busy, queued):
+        """根据当前状态返回新的目标进程数
+
+        worker_pids: 存活工作进程的pid；busy: 正在执行任务的进程数；queued: 排队任务数。
+        """
+        now = time.monotonic()
+        elapsed = max(now - self._window_start, 1e-6)
+        throughput = self._window_pages / elapsed
+        self._window_start = now
+        self._window_pages = 0
+        if self._blocked is not None:
+            self._blocked_windows -= 1
+            if self._blocked_windows <= 0:
+                self._blocked = None
+
+        rss = [value for value in (process_rss(pid) for pid in worker_pids) if value]
+        avg_rss = sum(rss) / len(rss) if rss else 0
+        memory = memory_info()
+        old = self.target
+        reason = None
+
+        if memory is not None and avg_rss:
+            total, available = memory
+            floor = total * self.low_memory_ratio
+            if available < floor:
+                # 内存不足：按平均RSS估算需要让出的进程数
+                release = max(1, math.ceil((floor - available) / avg_rss))
+                self.target = self._clamp(self.target - release)
+                reason = 'memory-pressure'
+            elif (self._last_action == 'grow' and self._last_throughput
+                    and throughput < self._last_throughput * (1 - THROUGHPUT_TOLERANCE)):
+                self._blocked, self._blocked_windows = self.target, 10
+                self.target = self._clamp(self.target - 1)
+                reason = 'throughput-regressed'
+            elif (queued and busy >= self.target and self._can_grow()
+                    and available - 2 * avg_rss > floor):
+                self.target = self._clamp(self.target + 1)
+                reason = 'grow'
+        elif queued and busy >= self.target and self._can_grow() and self._last_action != 'grow':
+            # 读取不到内存信息时只按吞吐量缓慢试探
+            self.target = self._clamp(self.target + 1)
+            reason = 'grow'
+
+        if self.target == old:
+            reason = None
+        self._last_action = 'grow' if reason == 'grow' else ('shrink' if reason else None)
+        self._last_throughput = throughput
+
+        self.last_sample = {
+            'time': time.time(),
+            'workers': len(worker_pids),
+            'busy': busy,
+            'queued': queued,
+            'throughput': round(throughput, 3),
+            'avg_rss': int(avg_rss),
+            'max_rss': max(rss) if rss else 0,
+            'mem_available': memory[1] if memory else None,
+        }
+        if reason:
+            decision = dict(self.last_sample, previous=old, target=self.target, reason=reason)
+            self.decisions.append(decision)
+        return self.target
+
+    def metrics(self):
+        """当前并发调节状态，便于导出或显示"""
+        return {
+            'target': self.target,
+            'min_workers': self.min_workers,
+            'max_workers': self.max_workers,
+            'completed': self.completed,
+            'last_sample': dict(self.last_sample),
+            'decisions': list(self.decisions),
+        }
@@ -0,0 +1,556 @@
+"""多进程批量转换引擎
+
+pdf2docx 的版面解析是纯Python的CPU密集计算，线程会被GIL串行化，
+因此批量任务交给常驻的工作进程执行。每个工作进程启动时预先导入转换后端，
+之后循环领取任务，通过各自的管道上报进度和结果；后台收集线程按完成顺序逐个回调，GUI和命令行共用。
+工作进程可以随时结束，卡死或内存失控的任务由看门狗（见 job_watchdog 模块）结束并重试。
+每个工作进程自成一个进程组，结束时连同它启动的按页并行子进程一起结束，不留下孤儿进程。
+"""
+import atexit
+import itertools
+import multiprocessing
+import multiprocessing.connection
+import os
+import queue
+import signal
+import threading
+import time
+
+import tracing
+from converter_core import convert, guess_conversion_type
+from autotune import ConcurrencyController, cpu_count
+from job_watchdog import CRASH, JobWatchdog
+from progress import Throttle
+from preflight import ROUTE_REJECT, ROUTE_TEXT, TEXT_ONLY_SETTINGS, classify
+from scheduler import FIFO, LARGEST_FIRST, JobScheduler, estimate_cost
+
+# 工作进程上报进度的最小间隔（秒）
+PROGRESS_INTERVAL = 0.25
+# 按页推进、计入吞吐量的转换阶段
+WORK_PHASES = ('parse', 'render')
+
+
+def warm_up():
+    """预先导入转换后端，避免每个任务重复付出导入开销"""
+    for module in ('pdf2docx', 'docx2pdf'):
+        try:
+            __import__(module)
+        except Exception:
+            pass
+
+
+def _worker_main(task_queue, conn):
+    """工作进程主循环，消息写入本进程专属的管道 conn"""
+    if hasattr(os, 'setpgrp'):
+        # 自成一个进程组：按页并行的子进程、渲染进程都在组内，结束任务时整组结束
+        os.setpgrp()
+    warm_up()
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        job_id, input_path, output_path, kind, options, trace = task
+        tracing.enable(trace)
+        tracing.set_context(file=os.path.basename(input_path))
+        conn.send(('started', job_id, os.getpid(), time.time()))
+        start = time.perf_counter()
+        stats = {}
+        throttle = Throttle(lambda event, job_id=job_id: conn.send(('progress', job_id, event)),
+                            PROGRESS_INTERVAL)
+
+        def progress(event, stats=stats, throttle=throttle):
+            stats.update(event.stats)
+            throttle(event)
+
+        try:
+            convert(input_path, output_path, kind, progress=progress, **options)
+            result = (True, None)
+        except Exception as e:
+            result = (False, str(e))
+        conn.send(('done', job_id) + result
+                  + (time.perf_counter() - start, stats, tracing.collect()))
+
+
+class ConversionJob:
+    """一个待转换的文件"""
+
+    def __init__(self, job_id, input_path, output_path, kind, options=None, callback=None):
+        self.job_id = job_id
+        self.input_path = input_path
+        self.output_path = output_path
+        self.kind = kind
+        self.options = options or {}
+        self.callback = callback
+        self.progress = None
+        self.last_event = None  # 工作进程上报的最近一次进度
+        self.preflight = None  # PreflightReport，未做预检时为None
+        self.cost = 0
+        self.submitted_at = time.time()
+        self.started = None  # 本次执行开始的时间（time.monotonic），等待中为None
+        self.attempts = 0    # 因超限或崩溃而失败的执行次数
+
+    @property
+    def filename(self):
+        return os.path.basename(self.input_path)
+
+    def task(self, page_workers=None):
+        """发给工作进程的任务；page_workers 为大PDF按页并行的默认子进程数"""
+        options = self.options
+        if page_workers is not None and options.get('workers') is None:
+            options = dict(options, workers=page_workers)
+        return (self.job_id, self.input_path, self.output_path, self.kind, options,
+                tracing.is_enabled())
+
+
+class ConversionResult:
+    """单个文件的转换结果"""
+
+    def __init__(self, job, success, error=None, duration=0.0, cancelled=False, stats=None):
+        self.job = job
+        self.success = success
+        self.error = error
+        self.duration = duration
+        self.cancelled = cancelled
+        self.stats = stats or {}  # 工作进程上报的统计信息，如峰值内存
+
+    @property
+    def filename(self):
+        return self.job.filename
+
+
+class _Worker:
+    """一个常驻工作进程及其专属任务队列和结果管道
+
+    结果不走所有进程共用的队列：进程可能在写入中途被强制结束，共用的队列会因此损坏或卡死，
+    专属管道损坏时只影响这一个进程，随进程一起丢弃。
+    """
+
+    def __init__(self, ctx):
+        self.task_queue = ctx.SimpleQueue()
+        self.conn, child_conn = ctx.Pipe(duplex=False)
+        self.process = ctx.Process(target=_worker_main,
+                                   args=(self.task_queue, child_conn),
+                                   name='pdf-word-worker')
+        self.process.start()
+        # 只保留读端，工作进程退出后读端才能收到EOF
+        child_conn.close()
+        self.job = None
+        # 并发缩减时标记，执行完当前任务后退出
+        self.retiring = False
+
+    def stop(self):
+        try:
+            self.task_queue.put(None)
+        except (OSError, ValueError):
+            pass
+
+    def kill(self):
+        """强制结束工作进程及其子进程（用于取消正在执行或超限的任务）"""
+        self.kill_group()
+        self.process.kill()
+        self.process.join()
+
+    def kill_group(self):
+        """结束工作进程所在的进程组；工作进程已退出时结束它留下的子进程"""
+        if not hasattr(os, 'killpg') or self.process.pid is None:
+            return
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except OSError:
+            # 工作进程还没来得及建立进程组，或组内已没有进程
+            pass
+
+
+class BatchEngine:
+    """基于进程池的批量转换引擎
+
+    on_result(result) 在每个文件完成时调用，on_all_completed() 在队列清空时调用，
+    on_progress(job, event) 在工作进程上报进度时调用，都运行在引擎的收集线程中；
+    提交任务时也可以单独指定该任务的 callback 和 progress 回调。
+    policy 为等待队列的调度策略（见 scheduler 模块）。
+    autotune 为True或 ConcurrencyController 时按内存压力和吞吐量自动调整进程数，
+    此时 max_workers 是进程数上限。
+    preflight 为True时提交PDF前先做快速预检（见 preflight 模块）：加密或损坏的文件直接失败，
+    纯文字文档走不做表格识别的快速路径，调度代价按文档类别估算。
+    watchdog 为 JobWatchdog 时限制单个任务的执行时间和内存：超限的任务结束其工作进程后重试，
+    反复超限或崩溃的文件进入隔离名单。
+    """
+
+    def __init__(self, max_workers=None, on_result=None, on_all_completed=None, on_progress=None,
+                 policy=FIFO, autotune=False, preflight=False, watchdog=None):
+        if autotune is True:
+            autotune = ConcurrencyController(max_workers=max_workers,
+                                             initial=min(cpu_count(), max_workers or cpu_count()))
+        self.autotune = autotune or None
+        self.max_workers = (self.autotune.target if self.autotune
+                            else max_workers or cpu_count())
+        self.on_result = on_result
+        self.on_all_completed = on_all_completed
+        self.on_progress = on_progress
+        self.preflight = preflight
+        self.watchdog = watchdog
+
+        # 使用spawn启动，避免在带有Qt线程的进程里fork
+        self._ctx = multiprocessing.get_context('spawn')
+        self._workers = []
+        self._scheduler = JobScheduler(policy)
+        # 不经过工作进程就已结束的任务（取消、预检拒绝），由收集线程回调
+        self._early_results = []
+        self._jobs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._collector = None
+        self._stopped = False
+        self._had_work = False
+
+    # ---------- 提交与结果 ----------
+
+    def submit(self, input_path, output_path, kind=None, callback=None, progress=None, **options):
+        """提交一个转换任务，返回 ConversionJob"""
+        kind = kind or guess_conversion_type(input_path)
+        quarantined = None
+        if self.watchdog is not None and self.watchdog.quarantine is not None:
+            quarantined = self.watchdog.quarantine.lookup(input_path)
+        report = None
+        if self.preflight and kind == 'pdf2word':
+            report = classify(input_path, options.get('password'))
+            if report.route == ROUTE_TEXT:
+                # 调用方显式给出的设置优先
+                options = dict(TEXT_ONLY_SETTINGS, **options)
+        if not self._scheduler.needs_cost():
+            cost = 0
+        elif report is not None:
+            cost = report.cost
+        else:
+            cost = estimate_cost(input_path, kind)
+        with self._lock:
+            if self._stopped:
+                raise RuntimeError('批量转换引擎已关闭')
+            self._ensure_started()
+            job = ConversionJob(next(self._ids), input_path, output_path, kind, options, callback)
+            job.progress = progress
+            job.preflight = report
+            job.cost = cost
+            self._had_work = True
+            if quarantined is not None:
+                self.watchdog.stats['rejected'] += 1
+                self._early_results.append(ConversionResult(
+                    job, False, f'文件已被隔离（曾反复{self.watchdog.describe(quarantined["reason"])}）'))
+                return job
+            if report is not None and report.route == ROUTE_REJECT:
+                self._early_results.append(ConversionResult(job, False, f'预检未通过: {report.reason}'))
+                return job
+            self._jobs[job.job_id] = job
+            self._scheduler.push(job, cost)
+            self._dispatch()
+        return job
+
+    def map(self, jobs, **options):
+        """提交一批 (输入, 输出, 类型) 任务，按完成顺序逐个产出 ConversionResult"""
+        results = queue.Queue()
+        count = 0
+        for input_path, output_path, kind in jobs:
+            self.submit(input_path, output_path, kind, callback=results.put, **options)
+            count += 1
+        for _ in range(count):
+            yield results.get()
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._jobs)
+
+    def scaling_metrics(self):
+        """并发调节的指标（当前目标、最近采样和历次调整记录）"""
+        with self._lock:
+            workers = len([worker for worker in self._workers if not worker.retiring])
+        metrics = self.autotune.metrics() if self.autotune else {'target': self.max_workers}
+        metrics['workers'] = workers
+        return metrics
+
+    def watchdog_metrics(self):
+        """看门狗的超时、内存超限、重试和隔离统计，未启用时返回None"""
+        if self.watchdog is None:
+            return None
+        with self._lock:
+            return self.watchdog.metrics()
+
+    def cancel(self, job_ids):
+        """取消任务：等待中的直接出队，执行中的结束其工作进程并补充新进程
+
+        被取消的任务同样以 ConversionResult（cancelled=True）回调。
+        """
+        with self._lock:
+            for job_id in job_ids:
+                job = self._scheduler.cancel(job_id)
+                if job is None:
+                    job = self._jobs.get(job_id)
+                    if job is None:
+                        continue
+                    for worker in self._workers:
+                        if worker.job is job:
+                            self._kill_worker(worker)
+                            break
+                self._jobs.pop(job_id, None)
+                self._early_results.append(ConversionResult(job, False, '已取消', cancelled=True))
+            self._dispatch()
+
+    def cancel_all(self):
+        """取消所有等待中和执行中的任务"""
+        with self._lock:
+            job_ids = list(self._jobs)
+        self.cancel(job_ids)
+
+    # ---------- 进程管理 ----------
+
+    def _ensure_started(self):
+        if self._collector is not None:
+            return
+        for _ in range(self.max_workers):
+            self._workers.append(_Worker(self._ctx))
+        self._collector = threading.Thread(target=self._collect, name='pdf-word-collector', daemon=True)
+        self._collector.start()
+        atexit.register(self.shutdown)
+
+    def _resize(self, target):
+        """把工作进程数调整到 target（调用方持有锁）
+
+        增加时直接启动新进程；减少时优先让空闲进程退出，不足部分等当前任务完成后再退出。
+        """
+        self.max_workers = target
+        active = [worker for worker in self._workers if not worker.retiring]
+        for _ in range(target - len(active)):
+            self._workers.append(_Worker(self._ctx))
+        excess = len(active) - target
+        for worker in sorted(active, key=lambda worker: worker.job is not None):
+            if excess <= 0:
+                break
+            worker.retiring = True
+            excess -= 1
+            if worker.job is None:
+                self._retire(worker)
+
+    def _kill_worker(self, worker):
+        """结束工作进程，需要时补充新进程（调用方持有锁）"""
+        worker.kill()
+        index = self._workers.index(worker)
+        if worker.retiring:
+            del self._workers[index]
+        else:
+            self._workers[index] = _Worker(self._ctx)
+
+    def _retire(self, worker):
+        worker.stop()
+        self._workers.remove(worker)
+
+    def _autotune(self):
+        """定期让并发控制器根据内存和吞吐量重新决定进程数"""
+        with self._lock:
+            active = [worker for worker in self._workers if not worker.retiring]
+            pids = [worker.process.pid for worker in active]
+            busy = sum(1 for worker in active if worker.job is not None)
+            queued = len(self._scheduler)
+        target = self.autotune.decide(pids, busy, queued)
+        with self._lock:
+            if target != len([worker for worker in self._workers if not worker.retiring]):
+                self._resize(target)
+                self._dispatch()
+
+    def _dispatch(self):
+        """把等待中的任务分配给空闲的工作进程（调用方持有锁）
+
+        大PDF按页并行的子进程数为CPU数量除以执行中和等待中的任务数：只有一个任务时用满所有CPU，
+        任务多时各任务分得的子进程相应减少，进程总数不会成倍膨胀。
+        """
+        active = [worker for worker in self._workers if not worker.retiring]
+        running = sum(1 for worker in active if worker.job is not None)
+        page_workers = max(1, cpu_count() // max(1, running + len(self._scheduler)))
+        for worker in active:
+            if not self._scheduler:
+                break
+            if worker.job is None:
+                job = self._scheduler.pop()
+                worker.job = job
+                worker.task_queue.put(job.task(page_workers))
+
+    def _receive(self, timeout):
+        """等待工作进程的消息，返回 [(工作进程, 消息)]；已被结束或替换的进程发来的消息直接丢弃"""
+        with self._lock:
+            workers = {worker.conn: worker for worker in self._workers}
+        if not workers:
+            time.sleep(timeout)
+            return []
+        messages = []
+        for conn in multiprocessing.connection.wait(list(workers), timeout):
+            try:
+                messages.append((workers[conn], conn.recv()))
+            except Exception:
+                # 进程已退出或在写入中途被结束，由 _reap_dead_workers 处理
+                pass
+        with self._lock:
+            return [(worker, message) for worker, message in messages if worker in self._workers]
+
+    def _collect(self):
+        """收集线程：接收工作进程的消息并回调结果"""
+        while not self._stopped:
+            done = []
+            for worker, message in self._receive(0.2):
+                if message[0] == 'progress':
+                    self._notify_progress(*message[1:])
+                elif message[0] == 'started':
+                    self._job_started(*message[1:])
+                else:
+                    done.append((worker, message))
+
+            with self._lock:
+                finished, self._early_results = self._early_results, []
+                for worker, message in done:
+                    result = self._job_done(worker, *message[1:])
+                    if result is not None:
+                        finished.append(result)
+                finished.extend(self._reap_dead_workers())
+                if self.watchdog is not None and self.watchdog.due():
+                    finished.extend(self._enforce_limits())
+                self._dispatch()
+                all_done = self._had_work and not self._jobs
+                if all_done:
+                    self._had_work = False
+
+            for result in finished:
+                self._notify(result)
+            if all_done and self.on_all_completed is not None:
+                self.on_all_completed()
+            if self.autotune and self.autotune.due():
+                self._autotune()
+
+    def _job_done(self, worker, job_id, success, error, duration, stats, events):
+        """处理工作进程的完成消息，返回 ConversionResult；过时的消息返回None（调用方持有锁）"""
+        if worker not in self._workers or worker.job is None or worker.job.job_id != job_id:
+            # 该进程已被结束，任务已取消或重新排队（可能已分配给其他进程），迟到的结果不算数
+            return None
+        tracing.add_events(events)
+        worker.job = None
+        if worker.retiring:
+            self._retire(worker)
+        job = self._jobs.pop(job_id, None)
+        if job is None:
+            return None
+        if self.autotune:
+            self.autotune.record_completion()
+        if self.watchdog is not None:
+            self.watchdog.finished(job, success)
+        return ConversionResult(job, success, error, duration, stats=stats)
+
+    def _reap_dead_workers(self):
+        """替换意外退出的工作进程，并把其上的任务记为失败（调用方持有锁）"""
+        failed = []
+        for worker in list(self._workers):
+            if worker.process.is_alive():
+                continue
+            # 崩溃的工作进程留下的按页并行子进程一并结束
+            worker.kill_group()
+            job = worker.job
+            if job is not None:
+                result = self._job_killed(
+                    job, CRASH, f'工作进程异常退出 (exitcode={worker.process.exitcode})')
+                if result is not None:
+                    failed.append(result)
+            if worker.retiring or self._stopped:
+                # 关闭过程中退出的工作进程不再补充
+                self._workers.remove(worker)
+            else:
+                self._workers[self._workers.index(worker)] = _Worker(self._ctx)
+        return failed
+
+    def _enforce_limits(self):
+        """结束超过时限或内存上限的任务（调用方持有锁）"""
+        failed = []
+        now = time.monotonic()
+        for worker in list(self._workers):
+            job = worker.job
+            if job is None or job.started is None:
+                continue
+            reason = self.watchdog.check(worker.process.pid, job.started, now)
+            if reason is None:
+                continue
+            self._kill_worker(worker)
+            result = self._job_killed(job, reason, self.watchdog.describe(reason), now)
+            if result is not None:
+                failed.append(result)
+        return failed
+
+    def _job_killed(self, job, reason, error, now=None):
+        """任务所在的工作进程被结束或崩溃后：还能重试时重新排队返回None，否则返回失败结果"""
+        elapsed = None if job.started is None else (now or time.monotonic()) - job.started
+        job.started = None
+        job.attempts += 1
+        if self.watchdog is not None and not self._stopped:
+            if self.watchdog.killed(job, reason, elapsed):
+                self._scheduler.push(job, job.cost)
+                return None
+            if self.watchdog.isolate(job, reason):
+                error += '，已隔离'
+        self._jobs.pop(job.job_id, None)
+        return ConversionResult(job, False, error, elapsed or 0.0)
+
+    def _job_started(self, job_id, pid, started_at):
+        """记录任务在队列中的等待时间和开始执行的时间"""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            job.started = time.monotonic()
+            tracing.record('queue-wait', job.submitted_at, started_at, file=job.filename)
+
+    def _notify_progress(self, job_id, event):
+        job = self._jobs.get(job_id)
+        if job is None:
+            return
+        if self.autotune and event.phase in WORK_PHASES:
+            pages = event.done
+            previous = job.last_event
+            if previous is not None and previous.phase == event.phase and pages >= previous.done:
+                pages -= previous.done
+            if pages:
+                self.autotune.record_pages(pages)
+        job.last_event = event
+        for callback in (job.progress, self.on_progress):
+            if callback is not None:
+                try:
+                    callback(job, event)
+                except Exception:
+                    pass
+
+    def _notify(self, result):
+        for callback in (result.job.callback, self.on_result):
+            if callback is not None:
+                try:
+                    callback(result)
+                except Exception:
+                    pass
+
+    def shutdown(self, wait=True):
+        """停止所有工作进程"""
+        with self._lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            workers = list(self._workers)
+        for worker in workers:
+            worker.stop()
+        for worker in workers:
+            worker.process.join(timeout=5 if wait else 0)
+            if worker.process.is_alive():
+                worker.kill()
+
+
+_shared_engine = None
+_shared_lock = threading.Lock()
+
+
+def shared_engine():
+    """进程内共享的批量引擎，GUI各窗口与命令行都提交到这里"""
+    global _shared_engine
+    with _shared_lock:
+        if _shared_engine is None:
+            # 大文件优先，整批最快完成（与命令行 --order 的默认值相同）
+            _shared_engine = BatchEngine(autotune=True, policy=LARGEST_FIRST,
+                                         watchdog=JobWatchdog.from_env())
+        return _shared_engine
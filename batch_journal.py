@@ -0,0 +1,167 @@
+"""批量转换的追加式日志（断点续转）
+
+每个批次一个日志文件，逐行追加JSON记录任务状态的变化（queued/done/failed/cancelled），
+完成的任务同时记录输入文件的大小、修改时间和输出文件的SHA-256。
+批次由 (输入, 输出, 类型) 列表确定，同一批文件重新开始转换时先回放日志：
+输入未变、输出仍在且校验和一致的任务直接跳过，只转换剩下的和失败的任务。
+边扫描文件夹边转换的批次事先不知道完整的任务列表，可以改用 key 指定批次
+（例如由所选文件夹和输出目录确定），之后扫描到的任务再逐批交给 resume() 检查。
+
+记录先放进队列，由后台线程成批写入（每批只 flush/fsync 一次），
+输出文件的校验和也在该线程中计算，不拖慢转换本身。批次全部成功后删除日志。
+"""
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from conversion_cache import default_cache_dir, file_digest
+
+# 后台线程每批最多等待的时间（秒）和最多写入的记录数
+FLUSH_INTERVAL = 0.5
+MAX_BATCH = 512
+
+
+def default_journal_dir():
+    return os.path.join(default_cache_dir(), 'journals')
+
+
+def batch_id(jobs):
+    """由任务列表（与顺序无关）确定批次标识"""
+    entries = sorted([os.path.abspath(input_path), os.path.abspath(output_path), kind]
+                     for input_path, output_path, kind in jobs)
+    return hashlib.sha256(json.dumps(entries).encode()).hexdigest()[:32]
+
+
+def _input_fingerprint(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+class BatchJournal:
+    """一个批次的日志，record() 可以在任意线程中调用"""
+
+    def __init__(self, jobs, root=None, key=None):
+        self.jobs = list(jobs)
+        self.root = root or default_journal_dir()
+        self.path = os.path.join(self.root, (key or batch_id(self.jobs)) + '.jsonl')
+        self._queue = queue.Queue()
+        self._thread = None
+        self._records = None
+
+    def replay(self):
+        """读取日志，返回每个输入文件最后一条记录"""
+        records = {}
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # 崩溃时最后一行可能只写了一半
+                        continue
+                    records[record['input']] = record
+        except OSError:
+            pass
+        return records
+
+    def _verified(self, job, record):
+        input_path, output_path, _ = job
+        try:
+            if [*_input_fingerprint(input_path)] != [record['input_size'], record['input_mtime']]:
+                return False
+            if os.path.getsize(output_path) != record['size']:
+                return False
+            return file_digest(output_path) == record['sha256']
+        except (OSError, KeyError):
+            return False
+
+    def resume(self, jobs=None):
+        """回放日志，返回 (仍需转换的任务, 已完成且校验通过而跳过的任务)
+
+        jobs 为之后追加到该批次的任务，省略时检查创建日志时给出的任务；日志只读取一次。
+        """
+        if self._records is None:
+            self._records = self.replay()
+        records = self._records
+        jobs = self.jobs if jobs is None else list(jobs)
+        candidates = [(job, records[os.path.abspath(job[0])]) for job in jobs
+                      if records.get(os.path.abspath(job[0]), {}).get('event') == 'done']
+        # 校验和计算主要耗在读文件上，用线程并行
+        with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as pool:
+            verified = pool.map(lambda candidate: self._verified(*candidate), candidates)
+            skipped = {candidate[0][0] for candidate, ok in zip(candidates, verified) if ok}
+        pending = [job for job in jobs if job[0] not in skipped]
+        return pending, [job for job in jobs if job[0] in skipped]
+
+    def open(self):
+        os.makedirs(self.root, exist_ok=True)
+        self._thread = threading.Thread(target=self._write_loop, name='pdf-word-journal', daemon=True)
+        self._thread.start()
+
+    def record(self, event, input_path, output_path=None, **fields):
+        """追加一条状态记录（done 记录的校验和在写入线程中计算）"""
+        fields.update(event=event, input=os.path.abspath(input_path), time=time.time())
+        if output_path is not None:
+            fields['output'] = os.path.abspath(output_path)
+        self._queue.put(fields)
+
+    def record_result(self, result):
+        """按 ConversionResult 记录任务结果"""
+        job = result.job
+        if result.success:
+            self.record('done', job.input_path, job.output_path)
+        elif result.cancelled:
+            self.record('cancelled', job.input_path, job.output_path)
+        else:
+            self.record('failed', job.input_path, job.output_path, error=result.error)
+
+    def _complete(self, record):
+        if record['event'] == 'done':
+            try:
+                record['input_size'], record['input_mtime'] = _input_fingerprint(record['input'])
+                record['size'] = os.path.getsize(record['output'])
+                record['sha256'] = file_digest(record['output'])
+            except OSError as e:
+                record.update(event='failed', error=f'无法校验输出: {e}')
+        return json.dumps(record, ensure_ascii=False)
+
+    def _write_loop(self):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            while True:
+                record = self._queue.get()
+                if record is None:
+                    break
+                batch = [record]
+                deadline = time.monotonic() + FLUSH_INTERVAL
+                while len(batch) < MAX_BATCH:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(self._queue.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+                    if batch[-1] is None:
+                        break
+                stop = batch[-1] is None
+                f.write(''.join(self._complete(record) + '\n' for record in batch if record is not None))
+                f.flush()
+                os.fsync(f.fileno())
+                if stop:
+                    break
+
+    def close(self, complete=False):
+        """写完剩余记录；complete=True（整批成功）时删除日志"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        if complete:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
@@ -0,0 +1,411 @@
+"""可复现的转换性能基准
+
+在本地生成合成语料（纯文本、表格密集、图片密集、数百页长文档的PDF，以及不同复杂度的DOCX），
+通过与 ConversionThread 相同的 converter_core.convert 逐个转换，
+以JSON输出页/秒、单文件耗时分位数、峰值内存和CPU时间。
+可以与保存的基线结果比较，性能退化超过阈值时以非零状态退出。
+指定多个转换模式时，同一批文件按各模式分别转换，并给出相对第一个模式的页/秒提升倍数。
+
+用法示例:
+    python benchmark.py -o bench.json
+    python benchmark.py --baseline bench.json --max-regression 0.1
+    python benchmark.py --corpus text,table --mode full,fast
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import statistics
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# 只用ASCII单词，避免PDF内置字体缺少中文字形
+WORDS = ('contract clause party agreement payment delivery term liability dispute '
+         'report revenue quarter growth market customer service product analysis '
+         'summary detail annual budget forecast review policy section appendix').split()
+
+# 语料名: (转换类型, 文件数, 每个文件的页数/段落规模)
+CORPORA = {
+    'text': ('pdf2word', 10, 5),
+    'table': ('pdf2word', 5, 5),
+    'image': ('pdf2word', 5, 5),
+    'long': ('pdf2word', 1, 300),
+    'docx-simple': ('word2pdf', 10, 5),
+    'docx-complex': ('word2pdf', 5, 5),
+}
+
+
+# ---------- 合成语料 ----------
+
+def _sentence(rng, words=12):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)) + '.'
+
+
+def _paragraph(rng, sentences=5):
+    return ' '.join(_sentence(rng) for _ in range(sentences))
+
+
+def png_bytes(width, height, rng):
+    """不依赖图像库生成一张色块PNG"""
+    blocks = [(rng.randrange(256), rng.randrange(256), rng.randrange(256)) for _ in range(16)]
+    rows = []
+    for y in range(height):
+        row = bytearray(b'\0')
+        for x in range(width):
+            row += bytes(blocks[(x * 4 // width) + 4 * (y * 4 // height)])
+        rows.append(bytes(row))
+
+    def chunk(tag, data):
+        return (struct.pack('>I', len(data)) + tag + data
+                + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff))
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header)
+            + chunk(b'IDAT', zlib.compress(b''.join(rows), 6)) + chunk(b'IEND', b''))
+
+
+def make_pdf(path, style, pages, rng):
+    import fitz
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page()
+        if style == 'table':
+            rows, cols = 12, 4
+            left, top, width, height = 60, 80, 480, 24
+            for r in range(rows + 1):
+                page.draw_line((left, top + r * height), (left + width, top + r * height))
+            for c in range(cols + 1):
+                x = left + c * width / cols
+                page.draw_line((x, top), (x, top + rows * height))
+            for r in range(rows):
+                for c in range(cols):
+                    page.insert_text((left + c * width / cols + 4, top + r * height + 16),
+                                     f'{rng.choice(WORDS)} {rng.randrange(10000)}', fontsize=9)
+        elif style == 'image':
+            for i in range(3):
+                rect = fitz.Rect(60, 60 + i * 230, 540, 270 + i * 230)
+                page.insert_image(rect, stream=png_bytes(480, 210, rng))
+        else:
+            page.insert_textbox(fitz.Rect(60, 60, 550, 780),
+                                '\n\n'.join(_paragraph(rng) for _ in range(6)), fontsize=10)
+    doc.save(path)
+    doc.close()
+
+
+def make_docx(path, style, pages, rng):
+    import io
+    from docx import Document
+    doc = Document()
+    for i in range(pages):
+        doc.add_heading(_sentence(rng, 5), level=1)
+        for _ in range(4):
+            doc.add_paragraph(_paragraph(rng))
+        if style == 'complex':
+            table = doc.add_table(rows=8, cols=4)
+            table.style = 'Table Grid'
+            for row in table.rows:
+                for cell in row.cells:
+                    cell.text = f'{rng.choice(WORDS)} {rng.randrange(10000)}'
+            doc.add_picture(io.BytesIO(png_bytes(320, 160, rng)))
+        if i < pages - 1:
+            doc.add_page_break()
+    doc.save(path)
+
+
+def generate_corpus(root, names, scale=1.0, seed=0):
+    """生成语料文件，返回 [(语料名, 转换类型, 路径, 页数)]；同一种子生成的文件完全相同"""
+    files = []
+    for name in names:
+        kind, count, pages = CORPORA[name]
+        rng = random.Random(f'{seed}-{name}')
+        folder = os.path.join(root, name)
+        os.makedirs(folder, exist_ok=True)
+        for i in range(max(1, int(count * scale))):
+            if kind == 'pdf2word':
+                path = os.path.join(folder, f'{name}-{i:03d}.pdf')
+                make_pdf(path, name, pages, rng)
+            else:
+                path = os.path.join(folder, f'{name}-{i:03d}.docx')
+                make_docx(path, name.split('-')[1], pages, rng)
+            files.append((name, kind, path, pages))
+    return files
+
+
+# ---------- 测量 ----------
+
+def _measure(input_path, output_path, kind, options, results):
+    """子进程：预先导入后端，然后计时转换一个文件"""
+    import resource
+    from autotune import PeakRss
+    from converter_core import convert
+    from batch_engine import warm_up
+    warm_up()
+    # 只统计转换期间的峰值，不含预热
+    peak = PeakRss().start()
+    before = resource.getrusage(resource.RUSAGE_SELF)
+    start = time.perf_counter()
+    try:
+        convert(input_path, output_path, kind, **options)
+        error = None
+    except Exception as e:
+        error = str(e)
+    wall = time.perf_counter() - start
+    after = resource.getrusage(resource.RUSAGE_SELF)
+    peak_rss = peak.stop()
+    results.put({
+        'wall': wall,
+        'cpu': (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime),
+        'peak_rss': peak_rss,
+        'error': error,
+    })
+
+
+def measure_file(input_path, output_path, kind, options):
+    """在独立进程中转换一个文件，保证峰值内存和CPU时间互不干扰"""
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    process = ctx.Process(target=_measure, args=(input_path, output_path, kind, options, results))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    # 最近秩法
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def measure_startup(repeat=3):
+    """冷启动耗时：命令行 --help 以及导入GUI模块"""
+    def timed(args):
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            completed = subprocess.run([sys.executable] + args, cwd=HERE,
+                                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            if completed.returncode != 0:
+                return None
+            samples.append(time.perf_counter() - start)
+        return statistics.median(samples)
+
+    return {
+        'cli_help': timed(['pdf_word.py', '--help']),
+        'gui_import': timed(['-c', 'import converter_main']),
+    }
+
+
+def run_benchmark(names, scale=1.0, repeat=1, seed=0, options=None, workdir=None, modes=None):
+    """modes 为要比较的转换模式列表（None 表示只用 options 中的设置）；
+    summary 总是第一个模式的结果，与不分模式的基线保持可比"""
+    options = options or {}
+    modes = modes or [options.get('mode')]
+    with tempfile.TemporaryDirectory(prefix='pdf-word-bench-', dir=workdir) as root:
+        files = generate_corpus(os.path.join(root, 'corpus'), names, scale, seed)
+        out_dir = os.path.join(root, 'out')
+        os.makedirs(out_dir)
+
+        records = []
+        for name, kind, path, pages in files:
+            ext = '.docx' if kind == 'pdf2word' else '.pdf'
+            output_path = os.path.join(out_dir, os.path.splitext(os.path.basename(path))[0] + ext)
+            for mode in modes:
+                # 转换模式只对PDF转Word有意义
+                run_options = dict(options, mode=mode) if mode and kind == 'pdf2word' else options
+                runs = [measure_file(path, output_path, kind, run_options) for _ in range(repeat)]
+                errors = [run['error'] for run in runs if run['error']]
+                records.append({
+                    'corpus': name,
+                    'file': os.path.basename(path),
+                    'kind': kind,
+                    'mode': mode,
+                    'pages': pages,
+                    'bytes': os.path.getsize(path),
+                    'wall': statistics.median(run['wall'] for run in runs),
+                    'cpu': statistics.median(run['cpu'] for run in runs),
+                    'peak_rss': max(run['peak_rss'] for run in runs),
+                    'error': errors[0] if errors else None,
+                })
+
+    report = {
+        'meta': environment_info(seed, scale, repeat, options),
+        'startup': measure_startup(),
+        'summary': summarize(names, [r for r in records if r['mode'] == modes[0]]),
+        'files': records,
+    }
+    if len(modes) > 1:
+        report['meta']['modes'] = modes
+        report['modes'] = {mode: summarize(names, [r for r in records if r['mode'] == mode])
+                           for mode in modes}
+        report['speedup'] = speedup(report['modes'], modes[0])
+    return report
+
+
+def summarize(names, records):
+    """按语料汇总页/秒、耗时分位数、CPU时间和峰值内存"""
+    summary = {}
+    for name in names:
+        ok = [r for r in records if r['corpus'] == name and not r['error']]
+        failed = [r for r in records if r['corpus'] == name and r['error']]
+        if not ok:
+            summary[name] = {'failed': len(failed), 'error': failed[0]['error'] if failed else None}
+            continue
+        latencies = [r['wall'] for r in ok]
+        summary[name] = {
+            'files': len(ok),
+            'failed': len(failed),
+            'pages_per_sec': sum(r['pages'] for r in ok) / sum(latencies),
+            'latency_p50': percentile(latencies, 0.50),
+            'latency_p90': percentile(latencies, 0.90),
+            'latency_p99': percentile(latencies, 0.99),
+            'cpu_time': sum(r['cpu'] for r in ok),
+            'peak_rss': max(r['peak_rss'] for r in ok),
+        }
+    return summary
+
+
+def speedup(summaries, reference):
+    """各模式相对参照模式的页/秒倍数：{模式: {语料: 倍数}}"""
+    base = summaries[reference]
+    result = {}
+    for mode, summary in summaries.items():
+        if mode == reference:
+            continue
+        result[mode] = {}
+        for name, item in summary.items():
+            old = base.get(name, {}).get('pages_per_sec')
+            if old and 'pages_per_sec' in item:
+                result[mode][name] = round(item['pages_per_sec'] / old, 3)
+    return result
+
+
+def environment_info(seed, scale, repeat, options):
+    from importlib import metadata
+    versions = {}
+    for package in ('pdf2docx', 'PyMuPDF', 'python-docx', 'docx2pdf'):
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'packages': versions,
+        'seed': seed,
+        'scale': scale,
+        'repeat': repeat,
+        'options': {key: str(value) for key, value in options.items()},
+    }
+
+
+# ---------- 与基线比较 ----------
+
+# 指标名: True 表示越大越好
+METRICS = {
+    'pages_per_sec': True,
+    'latency_p50': False,
+    'latency_p90': False,
+    'peak_rss': False,
+}
+
+
+def compare(current, baseline, max_regression):
+    """返回超过阈值的退化列表"""
+    regressions = []
+    for name, base in baseline.get('summary', {}).items():
+        now = current.get('summary', {}).get(name)
+        if not now or 'pages_per_sec' not in base or 'pages_per_sec' not in now:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old, new = base.get(metric), now.get(metric)
+            if not old or new is None:
+                continue
+            change = (old - new) / old if higher_is_better else (new - old) / old
+            if change > max_regression:
+                regressions.append({'corpus': name, 'metric': metric, 'baseline': old,
+                                    'current': new, 'regression': round(change, 4)})
+    return regressions
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='benchmark', description='PDF/Word转换性能基准')
+    parser.add_argument('--corpus', default=','.join(CORPORA),
+                        help=f'要运行的语料，逗号分隔，可选: {",".join(CORPORA)}')
+    parser.add_argument('--scale', type=float, default=1.0, help='语料文件数量的倍数')
+    parser.add_argument('--repeat', type=int, default=1, help='每个文件重复转换次数（取中位数）')
+    parser.add_argument('--seed', type=int, default=0, help='语料生成的随机种子')
+    parser.add_argument('--set', action='append', default=[], metavar='KEY=VALUE',
+                        help='传给 convert() 的转换选项，值按JSON解析，例如 --set memory_budget=536870912')
+    parser.add_argument('--mode', default=None,
+                        help='PDF转Word的转换模式，逗号分隔时逐个比较，例如 --mode full,fast；'
+                             '第一个模式作为参照，也是与基线比较的结果')
+    parser.add_argument('-o', '--output', help='把结果JSON写入该文件（默认输出到标准输出）')
+    parser.add_argument('--baseline', help='与之比较的基线结果JSON')
+    parser.add_argument('--max-regression', type=float, default=0.10,
+                        help='允许的最大退化比例，默认0.10')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    names = [name for name in args.corpus.split(',') if name]
+    unknown = [name for name in names if name not in CORPORA]
+    if unknown:
+        print(f'未知的语料: {",".join(unknown)}', file=sys.stderr)
+        return 2
+
+    options = {}
+    for item in args.set:
+        key, _, value = item.partition('=')
+        try:
+            options[key] = json.loads(value)
+        except ValueError:
+            options[key] = value
+
+    from converter_core import CONVERSION_MODES
+    modes = [mode for mode in (args.mode or '').split(',') if mode] or None
+    unknown = [mode for mode in modes or () if mode not in CONVERSION_MODES]
+    if unknown:
+        print(f'未知的转换模式: {",".join(unknown)}', file=sys.stderr)
+        return 2
+
+    report = run_benchmark(names, args.scale, args.repeat, args.seed, options, modes=modes)
+    for mode, items in report.get('speedup', {}).items():
+        for name, ratio in items.items():
+            print(f'{name}: {mode} 相对 {modes[0]} 页/秒 x{ratio}', file=sys.stderr)
+    status = 0
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        report['regressions'] = compare(report, baseline, args.max_regression)
+        for item in report['regressions']:
+            print('性能退化: {corpus} {metric} {baseline:.4g} -> {current:.4g} ({regression:.1%})'
+                  .format(**item), file=sys.stderr)
+        status = 1 if report['regressions'] else 0
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,208 @@
+"""按内容寻址的转换结果缓存
+
+缓存键 = 输入文件内容哈希 + 转换类型 + 转换设置 + 转换后端版本。
+命中时直接把缓存的输出复制（或硬链接）到目标位置。
+索引保存在SQLite（WAL模式）中，多个工作进程可以同时读写；
+总大小超过上限时按最近最少使用（LRU）淘汰。
+"""
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import time
+import uuid
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024  # 1GB
+_CHUNK_SIZE = 1024 * 1024
+
+# (soffice 实际路径, 修改时间) -> 版本，每个进程对同一个安装只查询一次
+_libreoffice_versions = {}
+
+
+def default_cache_dir():
+    return os.environ.get('PDF_WORD_CACHE_DIR') or os.path.join(
+        os.path.expanduser('~'), '.cache', 'pdf-word')
+
+
+def file_digest(path):
+    """计算文件内容的SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def backend_version(kind):
+    """转换后端的版本号，后端升级后旧缓存自动失效"""
+    from importlib import metadata
+    if kind == 'pdf2word':
+        package = 'pdf2docx'
+    else:
+        from converter_core import uses_word_renderer
+        if not uses_word_renderer():
+            return libreoffice_version()
+        package = 'docx2pdf'
+    try:
+        return metadata.version(package)
+    except metadata.PackageNotFoundError:
+        return 'unknown'
+
+
+def libreoffice_version():
+    """soffice --version 的输出（例如 LibreOffice 7.6.4.1 ...），未安装时返回 'unknown'"""
+    path = shutil.which('soffice') or shutil.which('libreoffice')
+    if path is None:
+        return 'unknown'
+    path = os.path.realpath(path)
+    try:
+        key = (path, os.stat(path).st_mtime_ns)
+    except OSError:
+        return 'unknown'
+    if key not in _libreoffice_versions:
+        try:
+            output = subprocess.run([path, '--version'], capture_output=True, text=True, timeout=60).stdout
+        except (OSError, subprocess.SubprocessError):
+            output = ''
+        _libreoffice_versions[key] = output.strip() or 'unknown'
+    return _libreoffice_versions[key]
+
+
+class ConversionCache:
+    """磁盘上的转换结果缓存，可安全地在多个进程间共享"""
+
+    def __init__(self, root=None, max_bytes=DEFAULT_MAX_BYTES, link=False):
+        self.root = root or default_cache_dir()
+        self.max_bytes = max_bytes
+        # link=True 时命中结果以硬链接形式提供（同一文件系统上最快）
+        self.link = link
+        self.objects_dir = os.path.join(self.root, 'objects')
+        self.db_path = os.path.join(self.root, 'index.sqlite3')
+        os.makedirs(self.objects_dir, exist_ok=True)
+        with self._connect() as db:
+            db.execute('CREATE TABLE IF NOT EXISTS entries ('
+                       'key TEXT PRIMARY KEY, path TEXT, size INTEGER, last_access REAL)')
+            db.execute('CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER)')
+
+    def _connect(self):
+        db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA synchronous=NORMAL')
+        return _Closing(db)
+
+    def make_key(self, input_path, kind, options=None):
+        """生成缓存键"""
+        parts = [
+            file_digest(input_path),
+            kind,
+            json.dumps(options or {}, sort_keys=True, default=str),
+            backend_version(kind),
+        ]
+        return hashlib.sha256('\0'.join(parts).encode()).hexdigest()
+
+    def _object_path(self, key):
+        return os.path.join(self.objects_dir, key[:2], key)
+
+    def _count(self, db, name):
+        db.execute('INSERT INTO stats (name, value) VALUES (?, 1) '
+                   'ON CONFLICT(name) DO UPDATE SET value = value + 1', (name,))
+
+    def fetch(self, key, output_path):
+        """命中时把缓存结果放到 output_path 并返回True"""
+        with self._connect() as db:
+            row = db.execute('SELECT path FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                try:
+                    self._materialize(row[0], output_path)
+                except FileNotFoundError:
+                    # 文件已被其他进程淘汰
+                    db.execute('DELETE FROM entries WHERE key = ?', (key,))
+                    row = None
+            if row is None:
+                self._count(db, 'misses')
+                return False
+            db.execute('UPDATE entries SET last_access = ? WHERE key = ?', (time.time(), key))
+            self._count(db, 'hits')
+            return True
+
+    def _materialize(self, cached_path, output_path):
+        if os.path.lexists(output_path):
+            os.remove(output_path)
+        if self.link:
+            try:
+                os.link(cached_path, output_path)
+                return
+            except OSError:
+                pass
+        shutil.copyfile(cached_path, output_path)
+
+    def store(self, key, output_path):
+        """把一次转换的输出放入缓存"""
+        size = os.path.getsize(output_path)
+        if size > self.max_bytes:
+            return
+        path = self._object_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 先写临时文件再原子替换，并发写入同一键时不会读到半个文件
+        temp_path = f'{path}.{uuid.uuid4().hex[:8]}.tmp'
+        shutil.copyfile(output_path, temp_path)
+        os.replace(temp_path, path)
+        with self._connect() as db:
+            db.execute('INSERT OR REPLACE INTO entries (key, path, size, last_access) '
+                       'VALUES (?, ?, ?, ?)', (key, path, size, time.time()))
+        self.evict()
+
+    def evict(self):
+        """总大小超过上限时按LRU淘汰"""
+        with self._connect() as db:
+            db.execute('BEGIN IMMEDIATE')
+            total = db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+            removed = []
+            if total > self.max_bytes:
+                for key, path, size in db.execute(
+                        'SELECT key, path, size FROM entries ORDER BY last_access').fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    db.execute('DELETE FROM entries WHERE key = ?', (key,))
+                    removed.append(path)
+                    total -= size
+                    self._count(db, 'evictions')
+            db.execute('COMMIT')
+        for path in removed:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        """返回命中/未命中/淘汰次数及当前条目数和总大小"""
+        with self._connect() as db:
+            result = {'hits': 0, 'misses': 0, 'evictions': 0}
+            result.update(db.execute('SELECT name, value FROM stats').fetchall())
+            entries, size = db.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        result['entries'] = entries
+        result['bytes'] = size
+        return result
+
+    def clear(self):
+        with self._connect() as db:
+            db.execute('DELETE FROM entries')
+            db.execute('DELETE FROM stats')
+        shutil.rmtree(self.objects_dir, ignore_errors=True)
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+
+class _Closing:
+    """sqlite3连接的上下文管理器：退出时关闭连接"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        return self.db
+
+    def __exit__(self, *exc):
+        self.db.close()
@@ -0,0 +1,252 @@
+"""无界面的转换核心
+
+不导入PyQt5，pdf2docx/docx2pdf等转换后端在真正转换时才按需导入，
+供命令行、脚本以及GUI的转换线程共用。
+"""
+import io
+import os
+import queue
+import shutil
+import sys
+import tempfile
+import threading
+
+import tracing
+from progress import ProgressTracker
+
+PDF2WORD = 'pdf2word'
+WORD2PDF = 'word2pdf'
+CONVERSION_TYPES = (PDF2WORD, WORD2PDF)
+
+# 各转换类型对应的输入/输出扩展名
+INPUT_EXTENSIONS = {PDF2WORD: '.pdf', WORD2PDF: '.docx'}
+OUTPUT_EXTENSIONS = {PDF2WORD: '.docx', WORD2PDF: '.pdf'}
+
+# PDF转Word的转换模式：完整版面分析 / 跳过表格识别的快速模式 / 按预检结果自动选择
+MODE_FULL = 'full'
+MODE_FAST = 'fast'
+MODE_AUTO = 'auto'
+CONVERSION_MODES = (MODE_FULL, MODE_FAST, MODE_AUTO)
+
+
+def guess_conversion_type(input_path):
+    """根据输入文件扩展名推断转换类型"""
+    ext = os.path.splitext(input_path)[1].lower()
+    for kind, input_ext in INPUT_EXTENSIONS.items():
+        if ext == input_ext:
+            return kind
+    raise ValueError(f'无法根据扩展名判断转换类型: {input_path}')
+
+
+def default_output_path(input_path, kind, output_dir=None):
+    """生成默认输出路径（与输入同名，扩展名替换为目标格式）"""
+    base = os.path.splitext(os.path.basename(input_path))[0] + OUTPUT_EXTENSIONS[kind]
+    return os.path.join(output_dir or os.path.dirname(input_path), base)
+
+
+def cleanup_temp_file(output_path):
+    """清理输出文件旁边残留的 ~$ 临时文件"""
+    output_dir = os.path.dirname(output_path)
+    temp_file = os.path.join(output_dir, f"~${os.path.basename(output_path)}")
+    if os.path.exists(temp_file):
+        try:
+            os.remove(temp_file)
+        except OSError:
+            pass
+
+
+def uses_word_renderer():
+    """DOCX→PDF是否使用Word（docx2pdf）渲染
+
+    docx2pdf 只支持Windows和macOS，其他平台使用常驻的LibreOffice渲染进程池；
+    可用环境变量 PDF_WORD_RENDERER=word/libreoffice 指定。
+    """
+    renderer = os.environ.get('PDF_WORD_RENDERER')
+    if renderer:
+        return renderer == 'word'
+    return sys.platform in ('win32', 'darwin')
+
+
+def render_docx(input_path, output_path):
+    """把DOCX渲染为PDF"""
+    if uses_word_renderer():
+        from docx2pdf import convert as docx2pdf
+        docx2pdf(input_path, output_path)
+    else:
+        from render_pool import default_pool
+        default_pool().convert(input_path, output_path)
+
+
+def mode_settings(input_path, mode, options, password=None):
+    """按转换模式补充 pdf2docx 设置，返回 (实际使用的模式, 设置)
+
+    快速模式保留段落、字体和图片，只关闭表格识别；自动模式先做预检，
+    以文字为主的文档走快速模式，其余走完整模式。调用方显式给出的设置优先。
+
+    快速模式的收益几乎都来自表格识别（基准测试：表格语料页/秒 x3.1，纯文字语料 x0.99），
+    自动模式恰好把表格文档留给完整模式，所以它只用于防止误用快速模式，默认不启用。
+    """
+    if mode in (None, MODE_FULL):
+        return MODE_FULL, options
+    if mode not in CONVERSION_MODES:
+        raise ValueError(f'不支持的转换模式: {mode}')
+    from preflight import ROUTE_TEXT, TEXT_ONLY_SETTINGS, classify
+    if mode == MODE_AUTO:
+        with tracing.span('preflight'):
+            report = classify(input_path, password)
+        if report.route != ROUTE_TEXT:
+            return MODE_FULL, options
+    return MODE_FAST, dict(TEXT_ONLY_SETTINGS, **options)
+
+
+def convert(input_path, output_path, kind=None, progress=None, parallel=None, workers=None,
+            cache=None, memory_budget=None, layouts=None, mode=None, **options):
+    """转换单个文件
+
+    kind 为 'pdf2word' 或 'word2pdf'，省略时按输入扩展名推断；
+    progress 为可选回调，参数为 ProgressEvent（阶段、已完成/总页数、页/秒、剩余时间）。
+    parallel 控制大PDF按页并行：None 表示页数超过阈值时自动启用，
+    True/False 强制开启/关闭；workers 为并行进程数。
+    cache 为可选的 ConversionCache，命中时直接复用之前的转换结果。
+    memory_budget 为内存预算（字节），指定时PDF按页分窗口处理以限制峰值内存，
+    此时不使用按页并行；start/end/pages 指定页码范围时同样不使用按页并行。
+    layouts 为可选的 LayoutStore：解析设置相同的页面复用之前的解析结果，只重新生成DOCX。
+    mode 为PDF转Word的转换模式：'full'（默认）、'fast'（跳过表格识别）或 'auto'（按预检结果选择）。
+    max_image_dpi/image_quality 为PDF转Word时嵌入图片的分辨率上限和JPEG质量（见 image_stage）。
+    其余关键字参数作为 pdf2docx 的转换设置。
+    """
+    if kind is None:
+        kind = guess_conversion_type(input_path)
+    if kind not in CONVERSION_TYPES:
+        raise ValueError(f'不支持的转换类型: {kind}')
+
+    with tracing.span('convert', file=os.path.basename(input_path), kind=kind):
+        return _convert(input_path, output_path, kind, progress, parallel, workers, cache,
+                        memory_budget, layouts, mode, options)
+
+
+def _convert(input_path, output_path, kind, progress, parallel, workers, cache, memory_budget,
+             layouts, mode, options):
+    tracker = ProgressTracker(progress)
+    tracker.start_phase('open')
+    if kind == PDF2WORD:
+        tracker.stats['mode'], options = mode_settings(input_path, mode, options,
+                                                        options.get('password'))
+    if cache is not None:
+        with tracing.span('cache-lookup'):
+            cache_key = cache.make_key(input_path, kind, options)
+            hit = cache.fetch(cache_key, output_path)
+        if hit:
+            tracker.finish()
+            return output_path
+
+    if kind == PDF2WORD:
+        import page_parallel
+        if memory_budget or any(options.get(name) is not None for name in ('start', 'end', 'pages')):
+            parallel = False
+        elif parallel is None:
+            parallel = page_parallel.should_parallelize(input_path)
+        if parallel:
+            page_parallel.convert_parallel(input_path, output_path, workers, tracker,
+                                           layouts=layouts, **options)
+        else:
+            from pdf_pipeline import convert_pdf
+            convert_pdf(input_path, output_path, tracker, memory_budget=memory_budget,
+                        layouts=layouts, **options)
+
+        # 清理临时文件
+        cleanup_temp_file(output_path)
+    else:
+        tracker.start_phase('render', 1)
+        with tracing.span('render'):
+            render_docx(input_path, output_path)
+        tracker.advance()
+
+    if cache is not None:
+        with tracing.span('cache-store'):
+            cache.store(cache_key, output_path)
+    tracker.finish()
+    return output_path
+
+
+def _read_source(source):
+    """把输入统一为 bytes/bytearray/memoryview，内存中已有的数据不再复制
+
+    BytesIO 取其缓冲区的 memoryview，PyMuPDF直接在这块内存上打开PDF。
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return source
+    if isinstance(source, io.BytesIO):
+        return source.getbuffer()
+    return source.read()
+
+
+def _memory_temp_dir():
+    """临时文件优先放在内存文件系统上（Linux的 /dev/shm）"""
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm'
+    return None
+
+
+def convert_stream(source, target, kind, progress=None, memory_budget=None, **options):
+    """转换内存中的文档，结果写入可写的文件对象 target
+
+    source 可以是 bytes/bytearray/memoryview 或可读的文件对象。
+    PDF→DOCX 全程在内存中完成：PyMuPDF直接从内存打开PDF，DOCX直接写入 target。
+    DOCX→PDF 的渲染器（Word/LibreOffice）只接受文件，输入输出放在临时目录
+    （优先使用 /dev/shm），转换结束后无论成败都会删除。
+    缓存、结果复用和按页并行都依赖文件路径，这里不支持。
+    """
+    if kind not in CONVERSION_TYPES:
+        raise ValueError(f'不支持的转换类型: {kind}')
+    data = _read_source(source)
+    with tracing.span('convert', kind=kind, size=len(data)):
+        tracker = ProgressTracker(progress)
+        tracker.start_phase('open')
+        if kind == PDF2WORD:
+            from pdf_pipeline import convert_pdf
+            convert_pdf(data, target, tracker, memory_budget=memory_budget, **options)
+        else:
+            with tempfile.TemporaryDirectory(prefix='pdf-word-', dir=_memory_temp_dir()) as temp_dir:
+                input_path = os.path.join(temp_dir, 'input' + INPUT_EXTENSIONS[kind])
+                output_path = os.path.join(temp_dir, 'output' + OUTPUT_EXTENSIONS[kind])
+                with open(input_path, 'wb') as f:
+                    f.write(data)
+                tracker.start_phase('render', 1)
+                with tracing.span('render'):
+                    render_docx(input_path, output_path)
+                tracker.advance()
+                with open(output_path, 'rb') as f:
+                    shutil.copyfileobj(f, target)
+        tracker.finish()
+    return target
+
+
+def convert_bytes(data, kind, progress=None, **options):
+    """转换内存中的文档，返回输出文档的 bytes（参数同 convert_stream）"""
+    output = io.BytesIO()
+    convert_stream(data, output, kind, progress, **options)
+    return output.getvalue()
+
+
+def iter_convert(input_path, output_path, kind=None, **options):
+    """以迭代器形式转换：逐个产出 ProgressEvent，转换失败时抛出原异常"""
+    events = queue.Queue()
+    outcome = {}
+
+    def run():
+        try:
+            convert(input_path, output_path, kind, progress=events.put, **options)
+        except BaseException as e:
+            outcome['error'] = e
+        finally:
+            events.put(None)
+
+    threading.Thread(target=run, name='pdf-word-convert', daemon=True).start()
+    while True:
+        event = events.get()
+        if event is None:
+            break
+        yield event
+    if 'error' in outcome:
+        raise outcome['error']
@@ -1,10 +1,16 @@
 import sys
 import os
-from PyQt5.QtWidgets import (QApplication, QMainWindow, QPushButton, QLabel, QFileDialog, QVBoxLayout, QWidget, QProgressBar, QHBoxLayout)
+import threading
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QPushButton, QLabel, QFileDialog, QVBoxLayout, QWidget, QProgressBar, QHBoxLayout, QComboBox,
+                             QTableView, QHeaderView, QAbstractItemView)
 from PyQt5.QtCore import Qt, QMimeData, QThread, pyqtSignal, QObject
 from PyQt5.QtGui import QDragEnterEvent, QDropEvent
-from pdf2docx import Converter as PDFConverter
-from docx2pdf import convert as docx2pdf
+from converter_core import MODE_AUTO, MODE_FAST, MODE_FULL
+from batch_engine import shared_engine
+from batch_journal import BatchJournal, batch_id
+from folder_scan import mirror_path, path_key, scan
+from layout_store import LayoutStore
+from queue_model import (BatchQueueModel, CANCELLED, FAILED, RUNNING, SKIPPED, SUCCESS)
 
 # 添加转换工作线程类
 class ConversionThread(QThread):
@@ -13,78 +19,195 @@ class ConversionThread(QThread):
     finished = pyqtSignal(bool) # 完成信号
     error = pyqtSignal(str, str)  # 错误信号(错误信息, 文件名)
 
-    def __init__(self, input_path, output_path, conversion_type):
+    def __init__(self, input_path, output_path, conversion_type, mode=None):
         super().__init__()
         self.input_path = input_path
         self.output_path = output_path
         self.conversion_type = conversion_type
+        self.mode = mode  # PDF转Word的转换模式，见 converter_core.CONVERSION_MODES
 
     def run(self):
+        # 在可以随时结束的工作进程中转换，卡死的文件由引擎的看门狗结束，不会占住界面线程
+        filename = os.path.basename(self.input_path)
+        done = threading.Event()
+        results = []
+
+        def finished(result):
+            results.append(result)
+            done.set()
+
         try:
-            filename = os.path.basename(self.input_path)
             self.status.emit(f'正在转换: {filename}')
-            self.progress.emit(10, filename)
-
-            if self.conversion_type == 'pdf2word':
-                cv = PDFConverter(self.input_path)
-                self.progress.emit(30, filename)
-                cv.convert(self.output_path, start=0, end=None)
-                cv.close()
-                
-                # 清理临时文件
-                output_dir = os.path.dirname(self.output_path)
-                temp_file = os.path.join(output_dir, f"~${os.path.basename(self.output_path)}")
-                if os.path.exists(temp_file):
-                    try:
-                        os.remove(temp_file)
-                    except:
-                        pass
-                        
-            else:  # word2pdf
-                self.progress.emit(30, filename)
-                docx2pdf(self.input_path, self.output_path)
-
-            self.progress.emit(100, filename)
+            options = {}
+            if self.conversion_type == 'pdf2word' and os.environ.get('PDF_WORD_LAYOUT_DIR'):
+                # 与命令行相同，设置了 PDF_WORD_LAYOUT_DIR 才保存每页的解析结果：
+                # 同一文档的修订版只重新解析改动或新插入的页面
+                options['layouts'] = LayoutStore()
+            # 工作进程上报的进度已经限流
+            shared_engine().submit(self.input_path, self.output_path, self.conversion_type,
+                                   callback=finished,
+                                   progress=lambda job, event: self.report_progress(event, filename),
+                                   mode=self.mode, **options)
+            done.wait()
+            if not results[0].success:
+                raise RuntimeError(results[0].error)
             self.finished.emit(True)
 
         except Exception as e:
             self.error.emit(str(e), filename)
             self.finished.emit(False)
 
+    def report_progress(self, event, filename):
+        self.progress.emit(event.percent, filename)
+        if event.phase != 'done':
+            self.status.emit(f'正在转换: {filename}  {event.describe()}')
+
+# 后台扫描文件夹的线程
+class FolderScanThread(QThread):
+    found = pyqtSignal(list)  # 扫描到的一批文件 [(路径, 相对路径)]
+
+    def __init__(self, roots, extensions, parent=None):
+        super().__init__(parent)
+        self.roots = roots
+        self.extensions = extensions
+
+    def run(self):
+        for chunk in scan(self.roots, self.extensions, stop=self.isInterruptionRequested):
+            self.found.emit(chunk)
+
 # 添加批量转换管理器
 class BatchConversionManager(QObject):
     all_completed = pyqtSignal()  # 所有转换完成的信号
-    file_completed = pyqtSignal(str, bool)  # 单个文件完成的信号(文件名, 是否成功)
 
-    def __init__(self, parent=None):
+    def __init__(self, model, parent=None):
         super().__init__(parent)
-        self.threads = []
-        self.active_threads = 0
-        self.max_threads = 3  # 最大同时转换数量
-
-    def add_conversion(self, input_path, output_path, conversion_type):
-        thread = ConversionThread(input_path, output_path, conversion_type)
-        thread.finished.connect(lambda success: self.thread_finished(thread, success))
-        self.threads.append(thread)
-        self.start_next_thread()
-
-    def start_next_thread(self):
-        if self.active_threads < self.max_threads:
-            for thread in self.threads:
-                if not thread.isRunning():
-                    self.active_threads += 1
-                    thread.start()
-                    break
-
-    def thread_finished(self, thread, success):
-        self.active_threads -= 1
-        self.threads.remove(thread)
-        self.file_completed.emit(os.path.basename(thread.input_path), success)
-        
-        if self.threads:
-            self.start_next_thread()
-        elif self.active_threads == 0:
-            self.all_completed.emit()
+        # 每个文件的结果和进度写入队列模型，由界面定时合并刷新
+        self.model = model
+        # 批量任务交给多进程引擎，不再受GIL限制
+        self.engine = shared_engine()
+        self.active_jobs = 0
+        self.job_ids = set()
+        self.lock = threading.Lock()
+        # 当前批次的断点续转日志及其中未成功的任务数
+        self.journal = None
+        self.unfinished = 0
+        # 批次是否进行中、是否还会追加任务（边扫描边转换），以及追加任务使用的选项
+        self.batch_open = False
+        self.more_jobs = False
+        self.options = {}
+        # 已创建的输出目录，避免对每个文件重复创建
+        self.created_dirs = set()
+
+    def add_conversion(self, input_path, output_path, conversion_type, **options):
+        self.add_conversions([(input_path, output_path, conversion_type)], **options)
+
+    def resume_batch(self, jobs, key=None):
+        """打开该批次的日志，返回 (需要转换的任务, 上次已完成且校验通过的任务)
+
+        key 为批次标识，省略时由任务列表确定（见 batch_journal）。
+        """
+        journal = BatchJournal(jobs, key=key)
+        pending, skipped = journal.resume()
+        journal.open()
+        with self.lock:
+            self.journal = journal
+            self.unfinished = 0
+            self.batch_open = True
+        return pending, skipped
+
+    def start_batch(self, jobs, more=False, **options):
+        """提交 resume_batch 返回的待转换任务
+
+        more=True 表示之后还会用 extend_batch 追加任务，直到调用 end_batch 批次才会结束。
+        """
+        with self.lock:
+            self.more_jobs = more
+            self.options = options
+        for input_path, output_path, _ in jobs:
+            self.journal.record('queued', input_path, output_path)
+        if jobs:
+            self.add_conversions(jobs, **options)
+        else:
+            self.end_batch(more)
+
+    def extend_batch(self, jobs):
+        """向进行中的批次追加任务，返回日志中已完成且校验通过而跳过的任务"""
+        pending, skipped = self.journal.resume(jobs)
+        for input_path, output_path, _ in pending:
+            self.journal.record('queued', input_path, output_path)
+        if pending:
+            self.add_conversions(pending, **self.options)
+        return skipped
+
+    def end_batch(self, more=False):
+        """不再追加任务；已提交的任务都已完成时立即结束批次"""
+        with self.lock:
+            self.more_jobs = more
+            done = self._batch_done()
+        if done:
+            self.finish_batch()
+
+    def _batch_done(self):
+        """批次是否刚好全部完成（调用方持有锁），每个批次只返回一次True"""
+        if self.batch_open and self.active_jobs == 0 and not self.more_jobs:
+            self.batch_open = False
+            return True
+        return False
+
+    def finish_batch(self):
+        """写完日志；整批成功时日志不再需要"""
+        with self.lock:
+            journal, self.journal = self.journal, None
+            complete = self.unfinished == 0
+        if journal is not None:
+            journal.close(complete=complete)
+        self.all_completed.emit()
+
+    def add_conversions(self, jobs, **options):
+        # 先计数再提交，避免任务在提交过程中就全部完成而提前发出完成信号
+        with self.lock:
+            self.active_jobs += len(jobs)
+        for input_path, output_path, conversion_type in jobs:
+            directory = os.path.dirname(output_path)
+            if directory not in self.created_dirs:
+                # 按文件夹结构输出时逐级创建子目录
+                os.makedirs(directory, exist_ok=True)
+                self.created_dirs.add(directory)
+            job = self.engine.submit(input_path, output_path, conversion_type,
+                                     callback=self.job_finished, progress=self.job_progress,
+                                     **options)
+            with self.lock:
+                self.job_ids.add(job.job_id)
+
+    def cancel_all(self):
+        """取消本窗口提交的所有任务，正在执行的工作进程会被结束并补充"""
+        with self.lock:
+            job_ids = list(self.job_ids)
+        self.engine.cancel(job_ids)
+
+    def job_progress(self, job, event):
+        """在引擎收集线程中调用"""
+        self.model.post(job.input_path, RUNNING, progress=event.percent)
+
+    def job_finished(self, result):
+        """在引擎收集线程中调用，结果交给队列模型合并刷新"""
+        with self.lock:
+            self.active_jobs -= 1
+            self.job_ids.discard(result.job.job_id)
+            journal = self.journal
+            if not result.success:
+                self.unfinished += 1
+            done = self._batch_done()
+        if journal is not None:
+            journal.record_result(result)
+        if result.success:
+            state = SUCCESS
+        else:
+            state = CANCELLED if result.cancelled else FAILED
+        self.model.post(result.job.input_path, state, duration=result.duration,
+                        error=result.error or '')
+        if done:
+            self.finish_batch()
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -193,12 +316,23 @@ class BaseConverterWindow(QMainWindow):
         
         # 添加转换线程属性
         self.conversion_thread = None
-        self.batch_manager = BatchConversionManager(self)
-        self.batch_manager.file_completed.connect(self.file_completed)
+        self.batch_manager = BatchConversionManager(self.queue_model, self)
         self.batch_manager.all_completed.connect(self.all_completed)
-        self.files_status = {}  # 记录每个文件的转换状态
+        self.queue_model.refreshed.connect(self.update_batch_status)
         self.is_batch_mode = False  # 添加批量模式标志
         self.batch_files = []       # 存储批量文件列表
+        self.batch_relative = {}    # 批量文件 -> 输出时使用的相对路径（保留文件夹结构）
+        self.batch_keys = set()     # 已加入批次的规范化路径，用于去重
+        self.batch_roots = []       # 拖放/粘贴/选择的文件和文件夹
+        self.batch_output_dir = None  # 转换开始后的输出目录，之后扫描到的文件直接提交
+        self.scans = []             # 正在后台扫描的线程
+
+    def conversion_kind(self):
+        return 'pdf2word' if isinstance(self, PDFToWordWindow) else 'word2pdf'
+
+    def conversion_options(self):
+        """传给转换的附加选项，子类按需覆盖"""
+        return {}
 
     def initUI(self, title):
         self.setWindowTitle(title)
@@ -277,9 +411,30 @@ class BaseConverterWindow(QMainWindow):
         self.convert_btn.clicked.connect(self.convert_file)
         self.convert_btn.setEnabled(False)
         
+        # 取消按钮（批量转换时显示）
+        self.cancel_btn = QPushButton('取消')
+        self.cancel_btn.setStyleSheet('''
+            QPushButton {
+                background-color: #f44336;
+                color: white;
+                padding: 12px 20px;
+                border-radius: 5px;
+                border: none;
+                font-size: 14px;
+            }
+            QPushButton:hover {
+                background-color: #d32f2f;
+            }
+        ''')
+        self.cancel_btn.clicked.connect(self.cancel_batch)
+        self.cancel_btn.hide()
+        
+        self.button_layout = button_layout
+
         # 添加按钮到按钮容器
         button_layout.addWidget(self.select_btn)
         button_layout.addWidget(self.convert_btn)
+        button_layout.addWidget(self.cancel_btn)
         
         # 进度条
         self.progress_bar = QProgressBar()
@@ -309,7 +464,7 @@ class BaseConverterWindow(QMainWindow):
         ''')
         
         # 快捷键提示
-        shortcut_label = QLabel('快捷键：Ctrl+V 粘贴文件路径')
+        shortcut_label = QLabel('快捷键：Ctrl+V 粘贴文件或文件夹路径')
         shortcut_label.setAlignment(Qt.AlignCenter)
         shortcut_label.setStyleSheet('''
             QLabel {
@@ -319,18 +474,69 @@ class BaseConverterWindow(QMainWindow):
             }
         ''')
         
+        # 批量转换队列（只绘制可见的行）
+        self.queue_model = BatchQueueModel(self)
+        self.queue_view = QTableView()
+        self.queue_view.setModel(self.queue_model)
+        self.queue_view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.queue_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.queue_view.setWordWrap(False)
+        # 固定行高和列宽，避免按内容计算尺寸时遍历所有行
+        self.queue_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.queue_view.verticalHeader().setDefaultSectionSize(22)
+        self.queue_view.verticalHeader().hide()
+        header = self.queue_view.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.Interactive)
+        for column, width in enumerate((240, 60, 50, 70)):
+            header.resizeSection(column, width)
+        header.setStretchLastSection(True)
+        self.queue_view.hide()
+
         # 添加所有部件到主布局
         layout.addWidget(self.file_label)
         layout.addWidget(button_container)
         layout.addWidget(self.progress_bar)
         layout.addWidget(self.status_label)
-        layout.addWidget(shortcut_label)
+        # 选择文件夹（递归查找其中的文件）
+        self.folder_btn = QPushButton('选择文件夹')
+        self.folder_btn.setFlat(True)
+        self.folder_btn.setCursor(Qt.PointingHandCursor)
+        self.folder_btn.setStyleSheet('''
+            QPushButton {
+                color: #008CBA;
+                font-size: 12px;
+                margin-top: 5px;
+                border: none;
+            }
+            QPushButton:disabled {
+                color: #cccccc;
+            }
+        ''')
+        self.folder_btn.clicked.connect(self.select_folder)
+        hint_container = QWidget()
+        hint_layout = QHBoxLayout(hint_container)
+        hint_layout.setContentsMargins(0, 0, 0, 0)
+        hint_layout.addStretch()
+        hint_layout.addWidget(shortcut_label)
+        hint_layout.addWidget(self.folder_btn)
+        hint_layout.addStretch()
+
+        layout.addWidget(self.queue_view)
+        layout.addWidget(hint_container)
+
+    def show_queue(self, visible):
+        """显示或隐藏批量队列，窗口随之调整大小"""
+        self.queue_view.setVisible(visible)
+        if visible:
+            self.setFixedSize(760, 640)
+        else:
+            self.setFixedSize(600, 400)
 
     def dragEnterEvent(self, event: QDragEnterEvent):
         """处理拖入文件事件"""
-        if event.mimeData().hasUrls():
+        if event.mimeData().hasUrls() and self.select_btn.isEnabled():
             valid_files = [url.toLocalFile() for url in event.mimeData().urls()
-                         if url.toLocalFile().lower().endswith(f'.{self.input_format.lower()}')]
+                           if self.is_input_file(url.toLocalFile()) or os.path.isdir(url.toLocalFile())]
             if valid_files:
                 event.acceptProposedAction()
                 self.file_label.setStyleSheet('''
@@ -357,17 +563,8 @@ class BaseConverterWindow(QMainWindow):
         ''')
     
     def dropEvent(self, event: QDropEvent):
-        """处理文件拖���事件"""
-        files = [url.toLocalFile() for url in event.mimeData().urls()
-                if url.toLocalFile().lower().endswith(f'.{self.input_format.lower()}')]
-        
-        if len(files) > 1:
-            self.is_batch_mode = True
-            self.batch_files = files
-            self.update_file_label()
-        else:
-            self.is_batch_mode = False
-            self.process_file_path(files[0])
+        """处理文件拖放事件"""
+        self.open_paths([url.toLocalFile() for url in event.mimeData().urls()])
             
         self.file_label.setStyleSheet('''
             QLabel {
@@ -393,14 +590,111 @@ class BaseConverterWindow(QMainWindow):
                     file_path = file_path[1:-1]
                 self.process_file_path(file_path)
     
+    def is_input_file(self, path):
+        return path.lower().endswith(f'.{self.input_format.lower()}')
+
+    def open_paths(self, paths):
+        """拖放或选择的文件和文件夹：单个文件直接转换，多个文件或含文件夹时作为新的批次"""
+        folders = [path for path in paths if os.path.isdir(path)]
+        files = [path for path in paths if self.is_input_file(path) and os.path.isfile(path)]
+        if not folders and len(files) <= 1:
+            if files:
+                self.is_batch_mode = False
+                self.process_file_path(files[0])
+            return
+        self.new_batch()
+        self.add_batch_paths(files + folders)
+
+    def new_batch(self):
+        """清空批量文件列表，开始新的批次"""
+        self.stop_scans()
+        self.is_batch_mode = True
+        self.batch_files = []
+        self.batch_relative = {}
+        self.batch_keys = set()
+        self.batch_roots = []
+        self.queue_model.reset([])
+
+    def add_batch_paths(self, paths):
+        """向批次加入文件和文件夹，文件夹在后台递归扫描"""
+        files = []
+        for path in paths:
+            self.batch_roots.append(os.path.abspath(path))
+            if os.path.isdir(path):
+                self.start_scan(path)
+            else:
+                files.append((path, os.path.basename(path)))
+        self.add_batch_files(files)
+        self.update_file_label()
+
+    def add_batch_files(self, entries):
+        """把 (路径, 相对路径) 加入批次并去重；转换已经开始时立即提交"""
+        added = []
+        for path, relative in entries:
+            key = path_key(path)
+            if key in self.batch_keys:
+                continue
+            self.batch_keys.add(key)
+            self.batch_relative[path] = relative
+            added.append(path)
+        if not added:
+            return
+        self.batch_files.extend(added)
+        self.queue_model.append(added)
+        if self.batch_output_dir is not None:
+            self.progress_bar.setMaximum(len(self.batch_files))
+            for input_file, _, _ in self.batch_manager.extend_batch(self.batch_jobs(added)):
+                self.queue_model.post(input_file, SKIPPED)
+        self.update_file_label()
+
+    def batch_jobs(self, paths):
+        """批量文件对应的 (输入, 输出, 类型)，文件夹中的文件在输出目录中保留相同的目录结构"""
+        conversion_type = self.conversion_kind()
+        output_ext = f'.{self.output_format.lower()}'
+        return [(path, mirror_path(self.batch_output_dir, self.batch_relative[path], output_ext),
+                 conversion_type) for path in paths]
+
+    def start_scan(self, folder):
+        thread = FolderScanThread([folder], {f'.{self.input_format.lower()}'}, self)
+        thread.found.connect(lambda chunk: self.scan_found(thread, chunk))
+        thread.finished.connect(lambda: self.scan_finished(thread))
+        self.scans.append(thread)
+        thread.start()
+
+    def scan_found(self, thread, chunk):
+        # 已停止的扫描可能还有排队中的结果，忽略
+        if thread in self.scans:
+            self.add_batch_files(chunk)
+
+    def scan_finished(self, thread):
+        if thread not in self.scans:
+            return
+        self.scans.remove(thread)
+        if not self.scans:
+            if self.batch_output_dir is not None:
+                # 扫描结束，不再有新文件，已提交的任务完成后批次即结束
+                self.batch_manager.end_batch()
+            self.update_file_label()
+
+    def stop_scans(self):
+        scans, self.scans = self.scans, []
+        for thread in scans:
+            thread.requestInterruption()
+        for thread in scans:
+            thread.wait()
+
     def process_file_path(self, file_path):
         """处理文件路径"""
-        if os.path.isfile(file_path) and file_path.lower().endswith(f'.{self.input_format.lower()}'):
+        if os.path.isdir(file_path):
+            # 文件夹：批量模式下加入当前批次，否则作为新的批次
+            if not self.is_batch_mode:
+                self.new_batch()
+            self.add_batch_paths([file_path])
+            self.status_label.setText('')
+        elif os.path.isfile(file_path) and self.is_input_file(file_path):
             if self.is_batch_mode:
                 # 批量模式下添加文件到列表
-                if file_path not in self.batch_files:
-                    self.batch_files.append(file_path)
-                    self.update_file_label()
+                self.add_batch_paths([file_path])
             else:
                 # 单文件模式
                 self.input_path = file_path
@@ -414,18 +708,22 @@ class BaseConverterWindow(QMainWindow):
     def update_file_label(self):
         """更新文件显示标签"""
         if self.is_batch_mode:
+            scanning = '，正在扫描文件夹…' if self.scans else ''
             if self.batch_files:
-                files_text = '\n'.join([os.path.basename(f) for f in self.batch_files[:3]])
-                if len(self.batch_files) > 3:
-                    files_text += f'\n... 等{len(self.batch_files)}个文件'
-                self.file_label.setText(files_text)
-                self.convert_btn.setText(f'开始转换 ({len(self.batch_files)}个文件)')
-                self.convert_btn.setEnabled(True)
+                # 文件列表显示在下方的队列中
+                self.show_queue(True)
+                self.file_label.setText(f'已选择 {len(self.batch_files)} 个{self.input_format}文件{scanning}')
+                if self.batch_output_dir is None:
+                    self.convert_btn.setText(f'开始转换 ({len(self.batch_files)}个文件)')
+                    self.convert_btn.setEnabled(True)
+            elif scanning:
+                self.file_label.setText('正在扫描文件夹…')
             else:
                 self.file_label.setText(f'拖拽{self.input_format}文件到这里\n或点击选择按钮')
                 self.convert_btn.setText('开始转换')
                 self.convert_btn.setEnabled(False)
         else:
+            self.show_queue(False)
             if self.input_path:
                 self.convert_btn.setText('开始转换')
             else:
@@ -442,17 +740,17 @@ class BaseConverterWindow(QMainWindow):
         )
         
         if files:
-            if len(files) > 1:
-                self.is_batch_mode = True
-                self.batch_files = files
-                self.update_file_label()
-            else:
-                self.is_batch_mode = False
-                self.process_file_path(files[0])
+            self.open_paths(files)
+
+    def select_folder(self):
+        """选择文件夹，递归转换其中的文件"""
+        folder = QFileDialog.getExistingDirectory(self, f"选择包含{self.input_format}文件的文件夹", "")
+        if folder:
+            self.open_paths([folder])
 
     def convert_file(self):
         """统一的转换处理方法"""
-        if not (self.input_path or self.batch_files):
+        if not (self.input_path or self.batch_files or (self.is_batch_mode and self.scans)):
             return
             
         if self.is_batch_mode:
@@ -468,6 +766,7 @@ class BaseConverterWindow(QMainWindow):
                 
             # 禁用按钮
             self.select_btn.setEnabled(False)
+            self.folder_btn.setEnabled(False)
             self.convert_btn.setEnabled(False)
             
             # 显示进度条
@@ -476,19 +775,22 @@ class BaseConverterWindow(QMainWindow):
             self.progress_bar.show()
             
             # 开始批量转换
-            self.files_status.clear()
-            for input_file in self.batch_files:
-                filename = os.path.basename(input_file)
-                output_file = os.path.join(
-                    output_dir,
-                    os.path.splitext(filename)[0] + f".{self.output_format.lower()}"
-                )
-                self.files_status[filename] = 'pending'
-                self.batch_manager.add_conversion(input_file, output_file, 
-                    'pdf2word' if isinstance(self, PDFToWordWindow) else 'word2pdf'
-                )
-            
+            self.queue_model.reset(self.batch_files)
+            self.queue_model.start()
+            self.batch_output_dir = output_dir
+            jobs = self.batch_jobs(self.batch_files)
+            self.cancel_btn.show()
             self.update_status(f'正在批量转换 {len(self.batch_files)} 个文件...')
+            # 含文件夹的批次事先不知道全部文件，按所选的文件夹和输出目录确定断点续转日志
+            key = None
+            if any(os.path.isdir(root) for root in self.batch_roots):
+                key = batch_id([(root, output_dir, self.conversion_kind()) for root in self.batch_roots])
+            # 同一批文件上次中断时，已完成且校验通过的文件直接跳过
+            pending, skipped = self.batch_manager.resume_batch(jobs, key)
+            for input_file, _, _ in skipped:
+                self.queue_model.post(input_file, SKIPPED)
+            # 文件夹还在扫描时先转换已找到的文件，之后扫描到的文件陆续加入
+            self.batch_manager.start_batch(pending, more=bool(self.scans), **self.conversion_options())
         else:
             # 单文件转换模式
             save_name, _ = QFileDialog.getSaveFileName(
@@ -506,6 +808,7 @@ class BaseConverterWindow(QMainWindow):
         try:
             # 禁用按钮
             self.select_btn.setEnabled(False)
+            self.folder_btn.setEnabled(False)
             self.convert_btn.setEnabled(False)
             
             # 显示和重置进度条
@@ -517,7 +820,8 @@ class BaseConverterWindow(QMainWindow):
             self.conversion_thread = ConversionThread(
                 self.input_path, 
                 self.output_path,
-                'pdf2word' if isinstance(self, PDFToWordWindow) else 'word2pdf'
+                'pdf2word' if isinstance(self, PDFToWordWindow) else 'word2pdf',
+                **self.conversion_options()
             )
             
             # 连接信号
@@ -532,7 +836,7 @@ class BaseConverterWindow(QMainWindow):
         except Exception as e:
             self.conversion_error(str(e))
 
-    def update_progress(self, value):
+    def update_progress(self, value, filename=None):
         """更新进度条"""
         self.progress_bar.setValue(value)
 
@@ -550,6 +854,7 @@ class BaseConverterWindow(QMainWindow):
         
         # 重新启用按钮
         self.select_btn.setEnabled(True)
+        self.folder_btn.setEnabled(True)
         self.convert_btn.setEnabled(True)
 
     def conversion_error(self, error_message):
@@ -560,38 +865,71 @@ class BaseConverterWindow(QMainWindow):
         
         # 重新启用按钮
         self.select_btn.setEnabled(True)
+        self.folder_btn.setEnabled(True)
         self.convert_btn.setEnabled(True)
 
-    def file_completed(self, filename, success):
-        """单个文件转换完成的处理"""
-        self.files_status[filename] = 'success' if success else 'failed'
-        completed = sum(1 for status in self.files_status.values() if status != 'pending')
-        self.progress_bar.setValue(completed)
-        
-        # 更新状态信息
-        success_count = sum(1 for status in self.files_status.values() if status == 'success')
-        failed_count = sum(1 for status in self.files_status.values() if status == 'failed')
+    def batch_counts(self):
+        """(成功, 失败) 文件数，跳过的文件算成功，取消的算失败"""
+        counts = self.queue_model.counts
+        return counts[SUCCESS] + counts[SKIPPED], counts[FAILED] + counts[CANCELLED]
+
+    def update_batch_status(self):
+        """队列模型合并刷新后更新进度条和状态（每帧最多一次）"""
+        if not self.progress_bar.isVisible() or not self.cancel_btn.isVisible():
+            return
+        self.progress_bar.setValue(self.queue_model.finished_count)
+        success_count, failed_count = self.batch_counts()
         self.update_status(f'已完成: {success_count} 成功, {failed_count} 失败')
         
+    def cancel_batch(self):
+        """取消批量转换"""
+        self.cancel_btn.setEnabled(False)
+        self.update_status('正在取消...')
+        # 停止扫描，不再加入新文件
+        self.stop_scans()
+        self.batch_manager.end_batch()
+        self.batch_manager.cancel_all()
+
     def all_completed(self):
         """所有文件转换完成的处理"""
-        success_count = sum(1 for status in self.files_status.values() if status == 'success')
-        failed_count = sum(1 for status in self.files_status.values() if status == 'failed')
+        self.queue_model.stop()
+        self.progress_bar.setValue(self.queue_model.finished_count)
+        success_count, failed_count = self.batch_counts()
         
         self.status_label.setText(f'批量转换完成！成功: {success_count}, 失败: {failed_count}')
         self.status_label.setStyleSheet('color: #4CAF50;' if failed_count == 0 else 'color: #FF9800;')
         
         # 重新启用按钮
         self.select_btn.setEnabled(True)
+        self.folder_btn.setEnabled(True)
         self.convert_btn.setEnabled(True)
+        self.cancel_btn.hide()
+        self.cancel_btn.setEnabled(True)
         # 重置批量模式
         self.is_batch_mode = False
         self.batch_files = []
+        self.batch_relative = {}
+        self.batch_keys = set()
+        self.batch_roots = []
+        self.batch_output_dir = None
         self.update_file_label()
+        # 保留队列，方便查看失败文件的错误信息
+        self.show_queue(True)
 
 class PDFToWordWindow(BaseConverterWindow):
     def __init__(self):
         super().__init__('PDF转Word工具', 'PDF', 'DOCX')
+        # 转换模式：快速模式跳过表格识别，适合信函等纯文字文档
+        self.mode_box = QComboBox()
+        self.mode_box.addItem('完整', MODE_FULL)
+        self.mode_box.addItem('自动', MODE_AUTO)
+        self.mode_box.addItem('快速', MODE_FAST)
+        self.mode_box.setToolTip('完整：识别表格等复杂版面\n快速：跳过表格识别，只保留段落、字体和图片\n'
+                                 '自动：只对没有表格的文档使用快速模式，防止误用，速度与完整模式相近')
+        self.button_layout.insertWidget(0, self.mode_box)
+
+    def conversion_options(self):
+        return {'mode': self.mode_box.currentData()}
 
 class WordToPDFWindow(BaseConverterWindow):
     def __init__(self):
@@ -0,0 +1,88 @@
+"""递归扫描文件夹中待转换的文件
+
+用 os.scandir 遍历目录树（文件类型来自目录项本身，不必逐个 stat），
+结果按批产出：每积攒一定数量或经过一小段时间就交出一批，调用方可以边扫描边转换，
+十万级文件的目录树不必等整棵树扫完。同一路径只产出一次；不跟随目录的符号链接，避免循环。
+
+每个文件同时给出相对于所选文件夹上一级目录的路径，输出时按该路径在输出目录中重建目录结构：
+选择 docs/ 转换到 out/ 时，docs/a/b.pdf 输出为 out/docs/a/b.docx。
+"""
+import os
+import time
+
+# 每批最多的文件数和最长的积攒时间（秒）
+CHUNK_SIZE = 1000
+CHUNK_INTERVAL = 0.1
+
+
+def path_key(path):
+    """用于去重的规范化路径"""
+    return os.path.normcase(os.path.abspath(path))
+
+
+def iter_files(root, extensions, stop=None):
+    """遍历 root 下扩展名在 extensions 中的文件，产出 (路径, 相对路径)
+
+    extensions 为小写、带点的扩展名集合；stop 为可选的无参函数，返回True时提前结束。
+    root 本身是文件时只产出它自己。
+    """
+    root = os.path.abspath(root)
+    if not os.path.isdir(root):
+        if os.path.splitext(root)[1].lower() in extensions and os.path.isfile(root):
+            yield root, os.path.basename(root)
+        return
+    prefix = len(os.path.join(os.path.dirname(root), ''))
+    stack = [root]
+    while stack:
+        if stop is not None and stop():
+            return
+        current = stack.pop()
+        try:
+            entries = os.scandir(current)
+        except OSError:
+            continue
+        subdirs = []
+        with entries:
+            for entry in entries:
+                name = entry.name
+                # 跳过隐藏文件和Office的 ~$ 临时文件
+                if name.startswith(('.', '~$')):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif os.path.splitext(name)[1].lower() in extensions and entry.is_file():
+                        yield entry.path, entry.path[prefix:]
+                except OSError:
+                    continue
+        # 子目录按名称顺序遍历（后压栈的先出）
+        subdirs.sort(reverse=True)
+        stack.extend(subdirs)
+
+
+def scan(roots, extensions, seen=None, stop=None, chunk_size=CHUNK_SIZE, interval=CHUNK_INTERVAL):
+    """扫描多个文件或文件夹，按批产出 [(路径, 相对路径)]
+
+    seen 为已有文件的 path_key 集合（会被更新），其中的文件不再产出。
+    """
+    seen = set() if seen is None else seen
+    chunk = []
+    deadline = time.monotonic() + interval
+    for root in roots:
+        for path, relative in iter_files(root, extensions, stop):
+            key = path_key(path)
+            if key in seen:
+                continue
+            seen.add(key)
+            chunk.append((path, relative))
+            if len(chunk) >= chunk_size or time.monotonic() >= deadline:
+                yield chunk
+                chunk = []
+                deadline = time.monotonic() + interval
+    if chunk:
+        yield chunk
+
+
+def mirror_path(output_dir, relative, output_ext):
+    """输出目录中与输入相对路径对应的输出文件"""
+    return os.path.join(output_dir, os.path.splitext(relative)[0] + output_ext)
@@ -0,0 +1,541 @@
+"""本地HTTP转换服务
+
+让其他程序通过HTTP提交转换任务，基于asyncio实现，不依赖第三方Web框架：
+
+    python http_service.py --port 8765
+
+接口：
+    POST   /jobs?filename=a.pdf[&type=pdf2word]   请求体为文件内容（Content-Length 或 chunked），
+                                                 边接收边写入磁盘，不在内存中缓存整个文件
+    POST   /jobs   Content-Type: application/json，{"path": "/本机/a.pdf", "type": ..., "output": ...}
+    GET    /jobs/<id>           任务状态
+    GET    /jobs/<id>/events    进度事件流（Server-Sent Events），任务结束后关闭
+    GET    /jobs/<id>/result    下载转换结果
+    DELETE /jobs/<id>           取消任务，或删除已结束的任务及其文件
+    GET    /health              服务状态
+
+任务交给与界面相同的共享批量引擎执行。未结束的任务（含上传中的）达到上限时，
+新的提交直接返回 429，客户端按 Retry-After 稍后重试；默认只监听本机地址。
+提交路径时的 output 只能写到 --output-root 指定的目录中；未指定时只在监听本机地址时接受。
+"""
+import argparse
+import asyncio
+import ipaddress
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import urllib.parse
+import uuid
+
+from converter_core import (
+    CONVERSION_TYPES, INPUT_EXTENSIONS, OUTPUT_EXTENSIONS, default_output_path, guess_conversion_type,
+)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+# 未结束任务数上限（排队、执行和上传中的任务都计入）
+DEFAULT_MAX_PENDING = 64
+DEFAULT_MAX_UPLOAD = 512 * 1024 * 1024
+# 已结束的任务保留多久（秒），之后连同文件一起清理
+DEFAULT_KEEP = 3600
+RETRY_AFTER = 5
+SSE_KEEPALIVE = 15
+_CHUNK_SIZE = 256 * 1024
+
+_STATUS_TEXT = {
+    200: 'OK', 202: 'Accepted', 400: 'Bad Request', 403: 'Forbidden', 404: 'Not Found', 405: 'Method Not Allowed',
+    409: 'Conflict', 413: 'Payload Too Large', 429: 'Too Many Requests', 500: 'Internal Server Error',
+}
+_FINISHED = ('done', 'failed', 'cancelled')
+
+
+class HttpError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class _Request:
+    def __init__(self, method, target, headers):
+        self.method = method
+        url = urllib.parse.urlsplit(target)
+        self.path = urllib.parse.unquote(url.path)
+        self.query = {name: values[-1] for name, values in urllib.parse.parse_qs(url.query).items()}
+        self.headers = headers
+
+    @property
+    def content_length(self):
+        """Content-Length 的值，未提供时为None，不是非负整数时按请求错误处理"""
+        length = self.headers.get('content-length')
+        if length is None:
+            return None
+        if not length.isascii() or not length.isdigit():
+            raise HttpError(400, '无效的 Content-Length')
+        return int(length)
+
+
+class ServiceJob:
+    """服务端记录的一个任务"""
+
+    def __init__(self, job_id, kind, input_path, output_path, filename, job_dir=None):
+        self.id = job_id
+        self.kind = kind
+        self.input_path = input_path
+        self.output_path = output_path
+        self.filename = filename
+        # 任务在暂存目录中的子目录（上传的文件、转换结果），清理任务时一并删除
+        self.job_dir = job_dir
+        self.state = 'uploading'
+        self.progress = None
+        self.error = None
+        self.duration = None
+        self.created = time.time()
+        self.finished_at = None
+        self.engine_job = None
+        self.listeners = []
+
+    @property
+    def finished(self):
+        return self.state in _FINISHED
+
+    def status(self):
+        return {
+            'id': self.id,
+            'state': self.state,
+            'type': self.kind,
+            'filename': self.filename,
+            'progress': self.progress,
+            'error': self.error,
+            'duration': self.duration,
+            'created': self.created,
+        }
+
+
+def _is_loopback(host):
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def _event_dict(event):
+    return {'phase': event.phase, 'done': event.done, 'total': event.total,
+            'percent': event.percent, 'rate': round(event.rate, 2), 'eta': event.eta}
+
+
+class ConversionService:
+    """HTTP接口与批量引擎之间的桥梁，所有状态只在事件循环线程中修改
+
+    output_root 为客户端指定的输出路径所允许的目录，为空时只有监听本机地址才接受输出路径。
+    """
+
+    def __init__(self, engine=None, spool_dir=None, max_pending=DEFAULT_MAX_PENDING,
+                 max_upload=DEFAULT_MAX_UPLOAD, keep=DEFAULT_KEEP, options=None, output_root=None):
+        if engine is None:
+            from batch_engine import shared_engine
+            engine = shared_engine()
+        self.engine = engine
+        self.spool_dir = spool_dir or tempfile.mkdtemp(prefix='pdf-word-service-')
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self.max_pending = max_pending
+        self.max_upload = max_upload
+        self.keep = keep
+        self.options = options or {}
+        self.output_root = os.path.realpath(output_root) if output_root else None
+        self._loopback = True
+        self.jobs = {}
+        # 已通过上限检查、但还没登记到 jobs 的提交（正在读取请求体）
+        self._reserved = set()
+        self._loop = None
+        self._expire_task = None
+
+    @property
+    def pending(self):
+        return len(self._reserved) + sum(1 for job in self.jobs.values() if not job.finished)
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self._loop = asyncio.get_running_loop()
+        self._loopback = _is_loopback(host)
+        server = await asyncio.start_server(self._handle, host, port)
+        self._expire_task = self._loop.create_task(self._expire_loop())
+        return server
+
+    def close(self):
+        """停止定期清理，在关闭服务时调用"""
+        if self._expire_task is not None:
+            self._expire_task.cancel()
+            self._expire_task = None
+
+    # ---------- 与引擎的交互 ----------
+
+    def _reserve(self):
+        """在第一次 await 之前占用名额，返回新任务的id，并发的提交不会超过上限"""
+        if self.pending >= self.max_pending:
+            raise HttpError(429, '队列已满，请稍后重试', {'Retry-After': str(RETRY_AFTER)})
+        job_id = uuid.uuid4().hex
+        self._reserved.add(job_id)
+        return job_id
+
+    def _register(self, job):
+        """登记任务，名额从预留转为任务本身"""
+        self._reserved.discard(job.id)
+        self.jobs[job.id] = job
+
+    async def _enqueue(self, job):
+        """把任务提交给批量引擎（预估代价需要读取文件，放到线程池中执行）"""
+        def submit():
+            return self.engine.submit(
+                job.input_path, job.output_path, job.kind,
+                callback=lambda result: self._loop.call_soon_threadsafe(self._finish, job, result),
+                progress=lambda _, event: self._loop.call_soon_threadsafe(self._progress, job, event),
+                **self.options)
+
+        job.state = 'queued'
+        job.engine_job = await self._loop.run_in_executor(None, submit)
+
+    def _progress(self, job, event):
+        if job.finished:
+            return
+        job.state = 'running'
+        job.progress = _event_dict(event)
+        self._publish(job, 'progress', job.progress)
+
+    def _finish(self, job, result):
+        if result.cancelled:
+            job.state = 'cancelled'
+        elif result.success:
+            job.state = 'done'
+        else:
+            job.state = 'failed'
+            job.error = result.error
+        job.duration = result.duration
+        job.finished_at = time.time()
+        self._publish(job, job.state, job.status())
+
+    def _publish(self, job, name, data):
+        for listener in job.listeners:
+            listener.put_nowait((name, data))
+
+    def _remove_files(self, job):
+        if job.job_dir:
+            shutil.rmtree(job.job_dir, ignore_errors=True)
+
+    async def _expire_loop(self):
+        while True:
+            await asyncio.sleep(60)
+            now = time.time()
+            for job in list(self.jobs.values()):
+                if job.finished and now - job.finished_at > self.keep:
+                    del self.jobs[job.id]
+                    self._remove_files(job)
+
+    # ---------- HTTP ----------
+
+    async def _handle(self, reader, writer):
+        try:
+            request = await self._read_request(reader)
+            await self._route(request, reader, writer)
+        except HttpError as e:
+            await self._send_json(writer, e.status, {'error': str(e)}, e.headers)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            await self._send_json(writer, 500, {'error': str(e)})
+        finally:
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+    async def _read_request(self, reader):
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except asyncio.LimitOverrunError:
+            raise HttpError(400, '请求头过长')
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, target, _ = lines[0].split(' ', 2)
+        except ValueError:
+            raise HttpError(400, '无效的请求行')
+        headers = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(':')
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+        return _Request(method.upper(), target, headers)
+
+    async def _route(self, request, reader, writer):
+        parts = [part for part in request.path.split('/') if part]
+        if parts == ['health']:
+            return await self._send_json(writer, 200, {
+                'pending': self.pending, 'max_pending': self.max_pending,
+                'jobs': len(self.jobs), 'engine': self.engine.scaling_metrics()})
+        if parts == ['jobs'] and request.method == 'POST':
+            return await self._submit(request, reader, writer)
+        if len(parts) < 2 or parts[0] != 'jobs':
+            raise HttpError(404, '未知路径')
+        job = self.jobs.get(parts[1])
+        if job is None:
+            raise HttpError(404, '任务不存在')
+        action = parts[2] if len(parts) > 2 else None
+        if action is None and request.method == 'GET':
+            return await self._send_json(writer, 200, job.status())
+        if action is None and request.method == 'DELETE':
+            return await self._delete(job, writer)
+        if action == 'events' and request.method == 'GET':
+            return await self._events(job, writer)
+        if action == 'result' and request.method == 'GET':
+            return await self._download(job, writer)
+        raise HttpError(405, '不支持的请求方法')
+
+    async def _submit(self, request, reader, writer):
+        job_id = self._reserve()
+        try:
+            if request.headers.get('content-type', '').split(';')[0].strip() == 'application/json':
+                job = await self._submit_path(job_id, request, reader)
+            else:
+                job = await self._submit_upload(job_id, request, reader, writer)
+        finally:
+            self._reserved.discard(job_id)
+        try:
+            await self._enqueue(job)
+        except Exception:
+            del self.jobs[job.id]
+            self._remove_files(job)
+            raise
+        await self._send_json(writer, 202, job.status(), {'Location': f'/jobs/{job.id}'})
+
+    async def _submit_path(self, job_id, request, reader):
+        """提交本机上的文件路径"""
+        body = b''.join([chunk async for chunk in self._iter_body(request, reader, 1024 * 1024)])
+        try:
+            payload = json.loads(body or b'{}')
+            input_path = os.path.abspath(payload['path'])
+        except (ValueError, KeyError, TypeError):
+            raise HttpError(400, '请求体应为包含 path 的JSON')
+        if not os.path.isfile(input_path):
+            raise HttpError(400, f'文件不存在: {input_path}')
+        kind = self._kind(payload.get('type'), input_path)
+        output_path = payload.get('output')
+        job_dir = None
+        if output_path:
+            output_path = self._allowed_output(output_path)
+        else:
+            # 未指定输出位置时结果放在暂存目录，通过 /result 下载
+            job_dir = os.path.join(self.spool_dir, job_id)
+            os.makedirs(job_dir)
+            output_path = default_output_path(input_path, kind, job_dir)
+        job = ServiceJob(job_id, kind, input_path, output_path,
+                         os.path.basename(input_path), job_dir)
+        self._register(job)
+        return job
+
+    def _allowed_output(self, output_path):
+        """客户端指定的输出路径，不在允许写入的位置时拒绝"""
+        if not isinstance(output_path, str):
+            raise HttpError(400, 'output 应为路径字符串')
+        if self.output_root is None:
+            if not self._loopback:
+                raise HttpError(403, '服务监听非本机地址，未用 --output-root 指定允许写入的目录')
+            return os.path.abspath(output_path)
+        # 相对路径相对于允许的目录，解析符号链接后必须仍在其中
+        path = os.path.realpath(os.path.join(self.output_root, output_path))
+        if os.path.commonpath([self.output_root, path]) != self.output_root:
+            raise HttpError(403, f'输出路径不在允许的目录中: {self.output_root}')
+        return path
+
+    async def _submit_upload(self, job_id, request, reader, writer):
+        """接收上传的文件，分块写入暂存目录"""
+        filename = os.path.basename(request.query.get('filename', '')) or 'upload'
+        kind = request.query.get('type')
+        if kind is None and os.path.splitext(filename)[1].lower() not in INPUT_EXTENSIONS.values():
+            raise HttpError(400, '请通过 type 参数或 filename 扩展名指定转换类型')
+        kind = self._kind(kind, filename)
+        length = request.content_length
+        if length is not None and length > self.max_upload:
+            raise HttpError(413, '文件过大')
+        if request.headers.get('expect', '').lower() == '100-continue':
+            writer.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+            await writer.drain()
+
+        job_dir = os.path.join(self.spool_dir, job_id)
+        os.makedirs(job_dir)
+        stem = os.path.splitext(filename)[0]
+        input_path = os.path.join(job_dir, 'input' + INPUT_EXTENSIONS[kind])
+        output_path = os.path.join(job_dir, stem + OUTPUT_EXTENSIONS[kind])
+        job = ServiceJob(job_id, kind, input_path, output_path, filename, job_dir)
+        # 上传期间就登记，可以查询到 uploading 状态
+        self._register(job)
+        try:
+            f = await self._loop.run_in_executor(None, open, input_path, 'wb')
+            try:
+                async for chunk in self._iter_body(request, reader, self.max_upload):
+                    await self._loop.run_in_executor(None, f.write, chunk)
+            finally:
+                await self._loop.run_in_executor(None, f.close)
+        except BaseException:
+            del self.jobs[job_id]
+            self._remove_files(job)
+            raise
+        return job
+
+    def _kind(self, kind, path):
+        if kind is None:
+            try:
+                return guess_conversion_type(path)
+            except ValueError as e:
+                raise HttpError(400, str(e))
+        if kind not in CONVERSION_TYPES:
+            raise HttpError(400, f'不支持的转换类型: {kind}')
+        return kind
+
+    async def _iter_body(self, request, reader, limit):
+        """逐块产出请求体，支持 Content-Length 和 chunked 两种方式"""
+        received = 0
+        if request.headers.get('transfer-encoding', '').lower() == 'chunked':
+            while True:
+                line = await reader.readline()
+                try:
+                    size = int(line.split(b';')[0].strip(), 16)
+                except ValueError:
+                    raise HttpError(400, '无效的分块编码')
+                if size == 0:
+                    while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                        pass
+                    return
+                received += size
+                if received > limit:
+                    raise HttpError(413, '文件过大')
+                while size:
+                    chunk = await reader.read(min(size, _CHUNK_SIZE))
+                    if not chunk:
+                        raise HttpError(400, '请求体不完整')
+                    size -= len(chunk)
+                    yield chunk
+                await reader.readexactly(2)
+        else:
+            remaining = request.content_length or 0
+            if remaining > limit:
+                raise HttpError(413, '文件过大')
+            while remaining:
+                chunk = await reader.read(min(remaining, _CHUNK_SIZE))
+                if not chunk:
+                    raise HttpError(400, '请求体不完整')
+                remaining -= len(chunk)
+                yield chunk
+
+    async def _delete(self, job, writer):
+        if not job.finished:
+            if job.engine_job is None:
+                raise HttpError(409, '任务正在上传')
+            # 取消结果经由引擎回调送达，_finish 中更新状态
+            await self._loop.run_in_executor(None, self.engine.cancel, [job.engine_job.job_id])
+            return await self._send_json(writer, 202, job.status())
+        del self.jobs[job.id]
+        self._remove_files(job)
+        await self._send_json(writer, 200, job.status())
+
+    async def _events(self, job, writer):
+        """以SSE推送进度，直到任务结束"""
+        writer.write(self._head(200, {'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache'}))
+        listener = asyncio.Queue()
+        job.listeners.append(listener)
+        try:
+            name, data = ((job.state, job.status()) if job.finished
+                          else ('progress', job.progress or {'phase': job.state}))
+            while True:
+                writer.write(f'event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n'.encode())
+                await writer.drain()
+                if name in _FINISHED:
+                    break
+                while True:
+                    try:
+                        name, data = await asyncio.wait_for(listener.get(), SSE_KEEPALIVE)
+                        break
+                    except asyncio.TimeoutError:
+                        writer.write(b': keepalive\n\n')
+                        await writer.drain()
+        finally:
+            job.listeners.remove(listener)
+
+    async def _download(self, job, writer):
+        if job.state != 'done':
+            raise HttpError(409, f'任务尚未完成: {job.state}')
+        try:
+            f = open(job.output_path, 'rb')
+        except OSError:
+            raise HttpError(404, '转换结果已被删除')
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            name = os.path.basename(job.output_path)
+            writer.write(self._head(200, {
+                'Content-Type': 'application/octet-stream',
+                'Content-Length': str(size),
+                'Content-Disposition': f"attachment; filename*=UTF-8''{urllib.parse.quote(name)}",
+            }))
+            await writer.drain()
+            await self._loop.sendfile(writer.transport, f)
+
+    def _head(self, status, headers):
+        lines = [f'HTTP/1.1 {status} {_STATUS_TEXT.get(status, "")}', 'Connection: close']
+        lines += [f'{name}: {value}' for name, value in headers.items()]
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+    async def _send_json(self, writer, status, data, headers=None):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        head = {'Content-Type': 'application/json; charset=utf-8', 'Content-Length': str(len(body))}
+        head.update(headers or {})
+        try:
+            writer.write(self._head(status, head) + body)
+            await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='pdf-word-service', description='本地HTTP转换服务')
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f'监听地址，默认 {DEFAULT_HOST}')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'监听端口，默认 {DEFAULT_PORT}')
+    parser.add_argument('--max-pending', type=int, default=DEFAULT_MAX_PENDING,
+                        help='未结束任务数上限，超出时返回429')
+    parser.add_argument('--max-upload', type=int, default=DEFAULT_MAX_UPLOAD // 1024 // 1024,
+                        metavar='MB', help='单个上传文件的大小上限（MB）')
+    parser.add_argument('--spool-dir', help='上传文件和转换结果的暂存目录，默认使用临时目录')
+    parser.add_argument('--keep', type=int, default=DEFAULT_KEEP,
+                        help='已结束任务及其文件的保留时间（秒）')
+    parser.add_argument('--output-root',
+                        help='提交路径时允许写入 output 的目录；未指定时只在监听本机地址时接受 output')
+    return parser
+
+
+async def serve(args):
+    service = ConversionService(spool_dir=args.spool_dir, max_pending=args.max_pending,
+                                max_upload=args.max_upload * 1024 * 1024, keep=args.keep,
+                                output_root=args.output_root)
+    server = await service.start(args.host, args.port)
+    print(f'转换服务已启动: http://{args.host}:{args.port}  暂存目录 {service.spool_dir}', file=sys.stderr)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,308 @@
+"""PDF转Word的图片处理阶段
+
+同一个徽标、信头会出现在每一页和成千上万个文件里。pdf2docx 每遇到一次都要从PDF中解码图片
+（连同软蒙版）并重新编码为PNG，生成DOCX时再逐个嵌入。这里在两处去掉重复的工作：
+
+- 解码缓存：按图片在PDF中的原始数据流（及其软蒙版）计算哈希，缓存解码、编码后的PNG，
+  后续的页面和文件遇到相同的图片直接复用，不再解码和编码。缓存属于进程，批量引擎的工作进程
+  在整个批次中常驻，所以同一批文件共享缓存；缓存按字节数淘汰最久未用的条目。
+- 生成DOCX之前按内容哈希为图片去重：每个文档中相同的图片只处理一次，所有引用指向同一份数据，
+  DOCX中也只保存一份。
+
+可选的分辨率上限（按图片在页面上的显示尺寸计算DPI）和JPEG质量在嵌入前缩小过大的图片，
+每张不同的图片只缩小一次，缩小结果同样进入缓存。缩小和重新编码节省的字节数记录在转换统计中
+（python-docx 本身也按内容去重，所以只统计确实变小的图片）。
+"""
+import collections
+import hashlib
+import math
+import os
+import re
+import threading
+
+import tracing
+
+# 缓存容量（MB），可用环境变量 PDF_WORD_IMAGE_CACHE 调整，0 表示不缓存
+DEFAULT_CACHE_MB = 64
+# 图片超过分辨率上限不到该比例时不缩小，避免为几个像素重新编码
+RESIZE_TOLERANCE = 1.1
+
+_SMASK_REF = re.compile(rb'/SMask\s+\d+\s+\d+\s+R')
+
+
+class ImageCache:
+    """按字节数限制大小的LRU缓存：{键: (宽, 高, 图片数据)}"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        size = len(value[2])
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous[2])
+            self._entries[key] = value
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted[2])
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries),
+                    'bytes': self._bytes}
+
+
+_cache = None
+_installed = False
+
+
+def shared_cache():
+    """进程内共享的图片缓存，未启用时返回None"""
+    global _cache
+    if _cache is None:
+        megabytes = int(os.environ.get('PDF_WORD_IMAGE_CACHE', DEFAULT_CACHE_MB))
+        _cache = ImageCache(megabytes * 1024 * 1024) if megabytes > 0 else False
+    return _cache or None
+
+
+class _DecodedImage:
+    """缓存的解码结果，代替 fitz.Pixmap 交给 pdf2docx 的后续步骤"""
+
+    def __init__(self, width, height, png, pixmap=None):
+        self.width = width
+        self.height = height
+        self.png = png
+        self._pixmap = pixmap
+
+    @property
+    def colorspace(self):
+        # 只缓存有颜色空间的图片，纯alpha图片仍按原方式裁剪页面
+        return True
+
+    def tobytes(self):
+        return self.png
+
+    @property
+    def pixmap(self):
+        if self._pixmap is None:
+            import fitz
+            self._pixmap = fitz.Pixmap(self.png)
+        return self._pixmap
+
+
+def _source_key(doc, item):
+    """图片在PDF中的原始数据流（含软蒙版）的哈希，不同文件中的同一张图片得到相同的键"""
+    xref, smask = item[0], item[1]
+    digest = hashlib.sha1()
+    for number in (xref, smask) if smask > 0 else (xref,):
+        stream = doc.xref_stream_raw(number)
+        if stream is None:
+            return None
+        # 对象字典决定解码方式（颜色空间、Decode数组等），去掉因文件而异的软蒙版编号
+        digest.update(_SMASK_REF.sub(b'', doc.xref_object(number, compressed=True).encode()))
+        digest.update(stream)
+    return ('decoded', digest.hexdigest(), tuple(item[2:6]))
+
+
+def install_decode_cache():
+    """让 pdf2docx 提取图片时先查解码缓存（每个进程安装一次）"""
+    global _installed
+    if _installed or shared_cache() is None:
+        return
+    _installed = True
+    try:
+        from pdf2docx.image.ImagesExtractor import ImagesExtractor
+        recover = ImagesExtractor._recover_pixmap
+        rotate = ImagesExtractor._rotate_image
+    except (ImportError, AttributeError):
+        return
+
+    def recover_pixmap(doc, item):
+        cache = shared_cache()
+        try:
+            key = _source_key(doc, item)
+        except Exception:
+            key = None
+        if key is None:
+            return recover(doc, item)
+        cached = cache.get(key)
+        if cached is not None:
+            return _DecodedImage(*cached)
+        pix = recover(doc, item)
+        if not pix.colorspace:
+            return pix
+        with tracing.span('encode-image'):
+            decoded = (pix.width, pix.height, pix.tobytes())
+        cache.put(key, decoded)
+        return _DecodedImage(*decoded, pixmap=pix)
+
+    def rotate_image(pixmap, rotation):
+        if isinstance(pixmap, _DecodedImage):
+            pixmap = pixmap.pixmap
+        return rotate(pixmap, rotation)
+
+    ImagesExtractor._recover_pixmap = staticmethod(recover_pixmap)
+    ImagesExtractor._rotate_image = staticmethod(rotate_image)
+
+
+def iter_images(page):
+    """遍历已解析页面中的全部图片（浮动图片、图片块、行内图片，包括表格单元格中的）"""
+    from pdf2docx.image.Image import Image
+
+    stack = [page.float_images, page.sections]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, Image):
+            yield item
+            continue
+        for name in ('blocks', 'lines', 'spans'):
+            child = getattr(item, name, None)
+            if child is not None:
+                stack.append(child)
+        # 分节、栏、表格、行以及各种集合本身可迭代
+        if hasattr(item, '__iter__'):
+            stack.extend(item)
+
+
+def _display_area(image):
+    """图片在页面上的显示面积（平方磅）"""
+    x0, y0, x1, y1 = image.bbox
+    return abs(x1 - x0) * abs(y1 - y0)
+
+
+def _encode(pixmap, quality):
+    """按JPEG质量编码（PyMuPDF较新版本直接支持，否则借助Pillow），都不可用时返回None"""
+    try:
+        return pixmap.tobytes('jpg', jpg_quality=quality)
+    except (TypeError, ValueError, RuntimeError):
+        pass
+    try:
+        return pixmap.pil_tobytes(format='JPEG', quality=quality, optimize=True)
+    except Exception:
+        return None
+
+
+class ImageStage:
+    """生成DOCX之前的图片去重与缩小，一个文档一个实例
+
+    max_dpi 为图片的最高分辨率（按显示尺寸计算），quality 为JPEG质量（1-100），
+    都为None时只去重。process() 可以多次调用（低内存模式每个窗口一次），
+    同一文档中已处理过的图片不再处理。
+    """
+
+    def __init__(self, max_dpi=None, quality=None):
+        self.max_dpi = max_dpi
+        self.quality = quality
+        self._processed = {}   # (原图SHA-1, 目标尺寸) -> (宽, 高, 数据)
+        self._seen = set()     # 已计入统计的处理结果
+        self.stats = {'images': 0, 'unique_images': 0, 'images_resized': 0,
+                      'image_bytes_in': 0, 'image_bytes_out': 0, 'image_bytes_saved': 0}
+        cache = shared_cache()
+        self._cache_hits = cache.hits if cache is not None else 0
+
+    def _target_size(self, width, height, area):
+        """按分辨率上限计算缩小后的像素尺寸，无需缩小时返回None"""
+        if not self.max_dpi or not width or not height or not area:
+            return None
+        dpi = 72 * math.sqrt(width * height / area)
+        if dpi <= self.max_dpi * RESIZE_TOLERANCE:
+            return None
+        scale = self.max_dpi / dpi
+        return max(1, round(width * scale)), max(1, round(height * scale))
+
+    def _shrink(self, data, width, height, target):
+        """缩小和/或重新编码一张图片，返回 (宽, 高, 数据)；不能变小时返回原图"""
+        try:
+            import fitz
+            pixmap = fitz.Pixmap(data)
+            if target is not None:
+                pixmap = fitz.Pixmap(pixmap, target[0], target[1], None)
+            encoded = None
+            if self.quality and not pixmap.alpha:
+                encoded = _encode(pixmap, self.quality)
+            if encoded is None and target is not None:
+                encoded = pixmap.tobytes()
+        except Exception:
+            return width, height, data
+        if encoded is None or len(encoded) >= len(data):
+            return width, height, data
+        return pixmap.width, pixmap.height, encoded
+
+    def _process(self, digest, data, width, height, target):
+        key = (digest, target)
+        result = self._processed.get(key)
+        if result is not None:
+            return result
+        if target is None and not self.quality:
+            result = (width, height, data)
+        else:
+            cache = shared_cache()
+            cache_key = ('shrunk', digest, target, self.quality)
+            result = cache.get(cache_key) if cache is not None else None
+            if result is None:
+                result = self._shrink(data, width, height, target)
+                if cache is not None:
+                    cache.put(cache_key, result)
+        self._processed[key] = result
+        return result
+
+    def process(self, pages):
+        """处理这些页面中的全部图片"""
+        with tracing.span('images'):
+            groups = {}
+            for page in pages:
+                for image in iter_images(page):
+                    if not image.image:
+                        continue
+                    digest = hashlib.sha1(image.image).digest()
+                    groups.setdefault(digest, []).append(image)
+
+            for digest, images in groups.items():
+                first = images[0]
+                # 同一张图片显示尺寸不同时按最大的显示尺寸计算分辨率
+                area = max(_display_area(image) for image in images)
+                target = self._target_size(first.width, first.height, area)
+                width, height, data = self._process(digest, first.image, first.width,
+                                                    first.height, target)
+                resized = (width, height) != (first.width, first.height)
+                if (digest, target) not in self._seen:
+                    # DOCX中每种图片只保存一份，按不同的图片统计字节数
+                    self._seen.add((digest, target))
+                    self.stats['unique_images'] += 1
+                    self.stats['image_bytes_in'] += len(first.image)
+                    self.stats['image_bytes_out'] += len(data)
+                    self.stats['image_bytes_saved'] += len(first.image) - len(data)
+                    if resized:
+                        self.stats['images_resized'] += 1
+                for image in images:
+                    image.image = data
+                    image.width, image.height = width, height
+                self.stats['images'] += len(images)
+
+    def report(self, stats):
+        """把统计写入转换统计"""
+        if not self.stats['images']:
+            return
+        stats.update(self.stats)
+        cache = shared_cache()
+        if cache is not None:
+            stats['image_cache_hits'] = cache.hits - self._cache_hits
@@ -0,0 +1,176 @@
+"""批量任务的看门狗
+
+个别畸形PDF会让 pdf2docx 在某一页上空转几个小时或不断占用内存，
+占住一个工作进程，整批的尾部耗时随之失控。批量引擎定期让看门狗检查每个执行中的任务：
+超过单任务时限或内存上限时结束其工作进程（换上新进程），任务重新排队再试一次；
+再次超限（或工作进程再次崩溃）的文件记入隔离名单，之后提交的相同文件直接拒绝。
+
+隔离名单按文件内容（SHA-256）记录并保存到磁盘，换了路径或文件名的同一文件同样会被拦下；
+为避免每次提交都计算哈希，只有大小与隔离文件相同的文件才会计算。
+"""
+import json
+import os
+import threading
+import time
+
+from autotune import process_group_rss
+from conversion_cache import default_cache_dir, file_digest
+
+# 检查执行中任务的间隔（秒）
+CHECK_INTERVAL = 1.0
+# 超限后重试的次数
+DEFAULT_RETRIES = 1
+
+# 结束任务的原因
+TIMEOUT = 'timeout'
+MEMORY = 'memory'
+CRASH = 'crash'
+
+
+def default_quarantine_path():
+    return os.path.join(default_cache_dir(), 'quarantine.json')
+
+
+class Quarantine:
+    """反复超限或崩溃的文件名单：{SHA-256: {path, size, reason, time}}"""
+
+    def __init__(self, path=None):
+        self.path = path or default_quarantine_path()
+        self._lock = threading.Lock()
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+        self._sizes = {entry['size'] for entry in self.entries.values()}
+
+    def lookup(self, input_path):
+        """文件在隔离名单中时返回其记录，否则返回None"""
+        try:
+            if os.path.getsize(input_path) not in self._sizes:
+                return None
+            return self.entries.get(file_digest(input_path))
+        except OSError:
+            return None
+
+    def add(self, input_path, reason):
+        try:
+            size = os.path.getsize(input_path)
+            digest = file_digest(input_path)
+        except OSError:
+            return
+        with self._lock:
+            self.entries[digest] = {'path': os.path.abspath(input_path), 'size': size,
+                                    'reason': reason, 'time': time.time()}
+            self._sizes.add(size)
+            self._save()
+
+    def remove(self, input_path):
+        """把文件移出隔离名单（例如升级了转换后端之后）"""
+        try:
+            digest = file_digest(input_path)
+        except OSError:
+            return False
+        with self._lock:
+            if self.entries.pop(digest, None) is None:
+                return False
+            self._sizes = {entry['size'] for entry in self.entries.values()}
+            self._save()
+        return True
+
+    def _save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        temp_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=1)
+        os.replace(temp_path, self.path)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class JobWatchdog:
+    """单任务的时限和内存上限，以及超限后的重试与隔离
+
+    time_limit 为单个任务的最长执行时间（秒），memory_limit 为工作进程的内存上限（字节），
+    None 表示不限制；retries 为超限或崩溃后重试的次数；quarantine 为 Quarantine 或None。
+    """
+
+    def __init__(self, time_limit=None, memory_limit=None, retries=DEFAULT_RETRIES,
+                 quarantine=None, interval=CHECK_INTERVAL):
+        self.time_limit = time_limit
+        self.memory_limit = memory_limit
+        self.retries = retries
+        self.quarantine = quarantine
+        self.interval = interval
+        self._last_check = 0.0
+        self.stats = {'timeouts': 0, 'memory_kills': 0, 'crashes': 0, 'retries': 0,
+                      'retry_successes': 0, 'quarantined': 0, 'rejected': 0}
+        # 被结束的任务已运行的时间（秒）
+        self.killed_after = []
+
+    @classmethod
+    def from_env(cls):
+        """按环境变量 PDF_WORD_JOB_TIMEOUT（秒）和 PDF_WORD_JOB_MEMORY（MB）创建，都未设置时返回None"""
+        timeout = os.environ.get('PDF_WORD_JOB_TIMEOUT')
+        memory = os.environ.get('PDF_WORD_JOB_MEMORY')
+        if not timeout and not memory:
+            return None
+        return cls(float(timeout) if timeout else None,
+                   int(memory) * 1024 * 1024 if memory else None,
+                   quarantine=Quarantine())
+
+    def due(self):
+        now = time.monotonic()
+        if now - self._last_check < self.interval:
+            return False
+        self._last_check = now
+        return True
+
+    def check(self, pid, started, now=None):
+        """检查一个执行中的任务，需要结束时返回原因
+
+        pid 为工作进程，内存按它所在的进程组（含按页并行的子进程）合计。
+        """
+        now = time.monotonic() if now is None else now
+        if self.time_limit and now - started > self.time_limit:
+            return TIMEOUT
+        if self.memory_limit and process_group_rss(pid) > self.memory_limit:
+            return MEMORY
+        return None
+
+    def describe(self, reason):
+        if reason == TIMEOUT:
+            return f'转换超时（超过 {self.time_limit:g} 秒）'
+        if reason == MEMORY:
+            return f'内存超过上限（{self.memory_limit // (1024 * 1024)} MB）'
+        return '工作进程崩溃'
+
+    def killed(self, job, reason, elapsed):
+        """记录一次超限或崩溃，返回是否应重新排队"""
+        key = {TIMEOUT: 'timeouts', MEMORY: 'memory_kills', CRASH: 'crashes'}[reason]
+        self.stats[key] += 1
+        if elapsed is not None:
+            self.killed_after.append(round(elapsed, 3))
+        if job.attempts <= self.retries:
+            self.stats['retries'] += 1
+            return True
+        return False
+
+    def isolate(self, job, reason):
+        """把重试后仍然失败的文件记入隔离名单，返回是否已隔离"""
+        if self.quarantine is None:
+            return False
+        self.quarantine.add(job.input_path, reason)
+        self.stats['quarantined'] += 1
+        return True
+
+    def finished(self, job, success):
+        if success and job.attempts:
+            self.stats['retry_successes'] += 1
+
+    def metrics(self):
+        killed = sorted(self.killed_after)
+        return dict(self.stats, time_limit=self.time_limit, memory_limit=self.memory_limit,
+                    killed_after_max=killed[-1] if killed else None,
+                    killed_after_median=killed[len(killed) // 2] if killed else None)
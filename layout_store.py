@@ -0,0 +1,234 @@
+"""解析结果（页面版面）的磁盘存储
+
+同一个PDF经常要换着设置或页码范围重新转换，或者只改了几页就整篇重新转换，而耗时的大头是版面解析。
+这里把 pdf2docx 解析完成的每一页（Page.store() 的结果）以gzip压缩的JSON保存下来，
+每页一个文件，按 页面内容指纹 + 解析设置 + pdf2docx版本 存储：
+
+    <root>/<key[:2]>/<key>.json.gz
+
+页面内容指纹由页面对象及其引用的全部对象（内容流、字体、图片、表单等，含数据流的原始字节）
+逐层哈希得到，不含页号和页面树中的父节点，所以与所在文件和位置无关：
+修订版中未改动的页面（包括因前面插入、删除页面而移动了位置的）仍然命中，
+只有改动或新插入的页面需要重新解析，重新转换的耗时随改动的页数而不是总页数增长。
+只改了页码范围或只影响生成阶段的选项时，全部页面都直接恢复。
+总大小超过上限时按最近使用时间淘汰；淘汰需要遍历整个目录，所以多个进程合计每隔一段时间才做一次。
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+
+from conversion_cache import backend_version, default_cache_dir
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024  # 1GB
+# 两次淘汰之间的最短间隔（秒），由共用同一目录的所有进程共同遵守
+EVICT_INTERVAL = 60.0
+# 比这更新的临时文件可能正由其他进程写入，淘汰时跳过（秒）
+TEMP_FILE_GRACE = 3600.0
+
+# 只影响运行方式、不影响解析结果的设置，不计入存储键
+RUNTIME_SETTINGS = frozenset((
+    'debug', 'ignore_page_error', 'multi_processing', 'cpu_count', 'raw_exceptions',
+))
+
+
+def default_layout_dir():
+    return os.environ.get('PDF_WORD_LAYOUT_DIR') or os.path.join(default_cache_dir(), 'layouts')
+
+
+# 间接引用 "12 0 R"，以及指向上级对象、会形成环的引用（页面树父节点、注释所属页面）
+_REFERENCE = re.compile(rb'\b(\d+)\s+(\d+)\s+R\b')
+_BACK_REFERENCE = re.compile(rb'/(?:Parent|P)\s+\d+\s+\d+\s+R')
+
+
+def parse_settings(settings):
+    """从完整设置中取出会影响解析结果的部分"""
+    return {name: value for name, value in settings.items() if name not in RUNTIME_SETTINGS}
+
+
+class PageFingerprints:
+    """计算PDF页面的内容指纹（fitz.Document），多页共用的字体、图片等对象只哈希一次"""
+
+    def __init__(self, fitz_doc):
+        self.doc = fitz_doc
+        self._digests = {}
+        # 其他页面（例如链接目标）只作为占位，不让一页的改动波及引用它的页面
+        self._page_xrefs = {fitz_doc.page_xref(i) for i in range(fitz_doc.page_count)}
+
+    def _source_digest(self, source, active):
+        """对象源码的哈希，其中的间接引用替换为被引用对象的哈希"""
+        digest = hashlib.sha256()
+        position = 0
+        for match in _REFERENCE.finditer(source):
+            digest.update(source[position:match.start()])
+            digest.update(self._object_digest(int(match.group(1)), active))
+            position = match.end()
+        digest.update(source[position:])
+        return digest.digest()
+
+    def _object_digest(self, xref, active):
+        if xref in self._page_xrefs and active:
+            return b'page'
+        if xref in self._digests:
+            return self._digests[xref]
+        if xref in active:
+            return b'cycle'
+        active.add(xref)
+        source = _BACK_REFERENCE.sub(b'', self.doc.xref_object(xref, compressed=True).encode())
+        digest = hashlib.sha256(self._source_digest(source, active))
+        if self.doc.xref_is_stream(xref):
+            digest.update(self.doc.xref_stream_raw(xref) or b'')
+        active.discard(xref)
+        result = digest.digest()
+        self._digests[xref] = result
+        return result
+
+    def _inherited_resources(self, xref):
+        """页面没有 /Resources 时沿页面树向上查找继承的资源"""
+        while xref:
+            kind, value = self.doc.xref_get_key(xref, 'Resources')
+            if kind != 'null':
+                return value.encode()
+            kind, value = self.doc.xref_get_key(xref, 'Parent')
+            xref = int(value.split()[0]) if kind == 'xref' else 0
+        return b''
+
+    def page(self, page_id):
+        """一页的内容指纹（十六进制），无法计算时返回None"""
+        try:
+            page = self.doc.load_page(page_id)
+            digest = hashlib.sha256(self._object_digest(page.xref, set()))
+            digest.update(self._source_digest(self._inherited_resources(page.xref), {page.xref}))
+            # 页面尺寸、裁剪框和旋转可能继承自页面树
+            digest.update(repr((tuple(page.mediabox), tuple(page.cropbox), page.rotation)).encode())
+            return digest.hexdigest()
+        except Exception:
+            return None
+
+
+class LayoutStore:
+    """按页保存的解析结果，可在多个进程间共享"""
+
+    def __init__(self, root=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root or default_layout_dir()
+        self.max_bytes = max_bytes
+        os.makedirs(self.root, exist_ok=True)
+
+    def make_keys(self, fitz_doc, page_ids, settings):
+        """生成各页的存储键 {页号: 键}；无法计算指纹的页面不在结果中，总是重新解析"""
+        common = '\0'.join((json.dumps(parse_settings(settings), sort_keys=True, default=str),
+                            backend_version('pdf2word')))
+        fingerprints = PageFingerprints(fitz_doc)
+        keys = {}
+        for page_id in page_ids:
+            fingerprint = fingerprints.page(page_id)
+            if fingerprint is not None:
+                keys[page_id] = hashlib.sha256(f'{fingerprint}\0{common}'.encode()).hexdigest()
+        return keys
+
+    def _page_path(self, key):
+        return os.path.join(self.root, key[:2], f'{key}.json.gz')
+
+    def load(self, keys):
+        """读取已保存的页面，keys 为 {页号: 键}，返回 {页号: 页面数据}
+
+        页面数据中的页号换成当前的页号（页面在修订版中可能移动了位置），
+        缺少或损坏的页面不在结果中。
+        """
+        pages = {}
+        for page_id, key in keys.items():
+            path = self._page_path(key)
+            try:
+                with gzip.open(path, 'rt', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError, EOFError):
+                continue
+            data['id'] = page_id
+            pages[page_id] = data
+            try:
+                os.utime(path)  # 记录最近使用时间，供淘汰参考
+            except OSError:
+                pass
+        return pages
+
+    def save(self, keys, pages):
+        """保存解析完成的页面（可迭代的 Page.store() 结果，需含 id），keys 为 {页号: 键}"""
+        for data in pages:
+            key = keys.get(data['id'])
+            if key is None:
+                continue
+            path = self._page_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb',
+                                                             compresslevel=6, mtime=0) as f:
+                    f.write(json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+                os.replace(temp_path, path)
+            except BaseException:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+                raise
+        self._evict_if_due()
+
+    def _evict_if_due(self):
+        """距上次淘汰（任一进程）超过 EVICT_INTERVAL 时淘汰一次，时间记录在目录下的标记文件中"""
+        marker = os.path.join(self.root, '.last-evict')
+        try:
+            if time.time() - os.stat(marker).st_mtime < EVICT_INTERVAL:
+                return
+        except OSError:
+            pass
+        try:
+            with open(marker, 'a'):
+                pass
+            os.utime(marker)
+        except OSError:
+            return
+        self.evict()
+
+    def _entries(self):
+        """所有存储的页面：(最近使用时间, 大小, 路径)
+
+        其他进程可能正在写入的临时文件不计入；长时间未完成的临时文件是中断留下的，照常淘汰。
+        """
+        entries = []
+        recent = time.time() - TEMP_FILE_GRACE
+        for prefix in os.scandir(self.root):
+            if not prefix.is_dir():
+                continue
+            for entry in os.scandir(prefix.path):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    # 其他进程刚刚替换或删除了这个文件
+                    continue
+                if entry.name.endswith('.tmp') and stat.st_mtime > recent:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self):
+        """总大小超过上限时按最近使用时间淘汰"""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            # 不删除空的前缀目录：其他进程可能正要在其中创建临时文件
+            total -= size
+
+    def clear(self):
+        for prefix in os.scandir(self.root):
+            if prefix.is_dir():
+                shutil.rmtree(prefix.path, ignore_errors=True)
@@ -0,0 +1,136 @@
+"""单个大PDF按页并行转换
+
+把PDF拆成若干连续页段，由多个工作进程分别完成解析和版面分析，
+主进程按页序恢复各段的解析结果，再一次性生成DOCX。
+DOCX只在主进程里按页序生成一遍，所以分节、页眉页脚在页段边界处保持连续。
+提供 LayoutStore 时只解析含有未保存页面（改动或新插入的页面）的页段。
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import tracing
+from autotune import cpu_count
+from image_stage import ImageStage, install_decode_cache
+from pdf_pipeline import convert_pdf, converter_settings, make_docx
+from progress import ProgressTracker
+
+# 超过该页数时自动启用按页并行
+PARALLEL_PAGE_THRESHOLD = 200
+# 每个页段至少包含的页数，页段太小时进程开销得不偿失
+MIN_PAGES_PER_PART = 25
+
+
+def page_count(input_path):
+    """读取PDF页数（只读取文档结构，不解析版面）"""
+    import fitz
+    with fitz.open(input_path) as doc:
+        return doc.page_count
+
+
+def should_parallelize(input_path, threshold=PARALLEL_PAGE_THRESHOLD):
+    """页数达到阈值时返回True"""
+    try:
+        return page_count(input_path) >= threshold
+    except Exception:
+        return False
+
+
+def split_page_ranges(total, parts):
+    """把 [0, total) 均分为不超过 parts 段，返回 (start, end) 列表，end不含"""
+    parts = max(1, min(parts, total // MIN_PAGES_PER_PART or 1))
+    size, extra = divmod(total, parts)
+    ranges = []
+    start = 0
+    for i in range(parts):
+        end = start + size + (1 if i < extra else 0)
+        if end > start:
+            ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def _settings(cv, options):
+    settings = converter_settings(cv, options)
+    # 并行由本模块负责，不再使用pdf2docx自带的多进程
+    settings['multi_processing'] = False
+    return settings
+
+
+def _parse_pages(input_path, page_ids, options, trace=False):
+    """工作进程：解析一组页面（通常是连续的页段），返回可序列化的解析结果和追踪事件"""
+    from pdf2docx import Converter as PDFConverter
+    tracing.enable(trace)
+    install_decode_cache()
+    with tracing.span('parse-range', start=page_ids[0] + 1, end=page_ids[-1] + 1):
+        cv = PDFConverter(input_path)
+        try:
+            cv.parse(pages=page_ids, **_settings(cv, options))
+            data = cv.store()
+        finally:
+            cv.close()
+    return data, tracing.collect()
+
+
+def convert_parallel(input_path, output_path, workers=None, tracker=None, layouts=None,
+                     max_image_dpi=None, image_quality=None, **options):
+    """按页并行地把PDF转换为DOCX
+
+    workers 为子进程数，默认为CPU数量；在批量引擎的工作进程中由引擎按CPU数量除以工作进程数给出。
+    """
+    from pdf2docx import Converter as PDFConverter
+
+    tracker = tracker or ProgressTracker()
+    workers = workers or cpu_count()
+    total = page_count(input_path)
+    ranges = split_page_ranges(total, workers)
+    if len(ranges) < 2:
+        # 页数太少，直接整篇转换
+        return convert_pdf(input_path, output_path, tracker, layouts=layouts,
+                           max_image_dpi=max_image_dpi, image_quality=image_quality, **options)
+
+    cv = PDFConverter(input_path)
+    try:
+        settings = _settings(cv, options)
+        stored = {}
+        if layouts is not None:
+            with tracing.span('fingerprint', pages=total):
+                keys = layouts.make_keys(cv.fitz_doc, range(total), settings)
+            with tracing.span('layout-load'):
+                stored = layouts.load(keys)
+            tracker.stats['layout_pages_reused'] = len(stored)
+        # 只解析缺少的页面（修订版中改动或新插入的页面），均分给各子进程
+        missing = [page_id for page_id in range(total) if page_id not in stored]
+        parts = [missing[start:end] for start, end in split_page_ranges(len(missing), workers)]
+        if stored and len(parts) < 2:
+            # 需要解析的页面不多，不值得启动子进程；已算好的指纹直接沿用
+            return convert_pdf(input_path, output_path, tracker, layouts=layouts, layout_keys=keys,
+                               max_image_dpi=max_image_dpi, image_quality=image_quality, **options)
+
+        # 完成一组推进一组的页数
+        tracker.start_phase('parse', total)
+        tracker.advance(len(stored))
+        parsed = {}
+        ctx = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=len(parts), mp_context=ctx) as pool:
+            futures = {pool.submit(_parse_pages, input_path, part, options,
+                                   tracing.is_enabled()): part
+                       for part in parts}
+            for future in as_completed(futures):
+                part = futures[future]
+                parsed[part[0]], events = future.result()
+                tracing.add_events(events)
+                tracker.advance(len(part))
+        if layouts is not None:
+            with tracing.span('layout-save'):
+                layouts.save(keys, [page for start in parsed for page in parsed[start]['pages']])
+
+        # 按页序恢复解析结果后统一生成DOCX
+        with tracing.span('restore'):
+            if stored:
+                cv.restore({'page_cnt': total, 'pages': list(stored.values())})
+            for start in sorted(parsed):
+                cv.restore(parsed[start])
+        make_docx(cv, output_path, tracker, settings, ImageStage(max_image_dpi, image_quality))
+    finally:
+        cv.close()
+    return output_path
@@ -0,0 +1,262 @@
+"""PDF→DOCX 转换流水线
+
+按 pdf2docx.Converter.convert 相同的步骤执行（载入页面、分析文档、解析页面、生成DOCX），
+但把各阶段拆开调用，并在每页解析/生成完成时推进进度。
+
+提供 LayoutStore 时，内容和设置都相同的已解析页面直接从存储中恢复，
+只解析缺少的页面（例如修订版中改动或新插入的页面），新解析的页面再写回存储。
+
+指定内存预算时改为分窗口处理：每次只分析、解析一小批页面，立即写入DOCX后释放
+这些页面的版面数据，窗口大小根据实测的每页内存增量动态调整。
+
+生成DOCX之前经过图片处理阶段（image_stage）：相同的图片每个文档只处理、嵌入一次，
+可选地按分辨率上限和JPEG质量缩小过大的图片。
+"""
+import os
+
+import tracing
+from autotune import PeakRss, process_rss
+from image_stage import ImageStage, install_decode_cache
+from progress import ProgressTracker
+
+# 低内存模式下首个窗口的页数和窗口上限
+INITIAL_WINDOW = 4
+MAX_WINDOW = 64
+
+
+def open_converter(source):
+    """打开PDF：source 为文件路径，或内存中的PDF内容（直接由PyMuPDF在内存中打开，不复制）"""
+    from pdf2docx import Converter as PDFConverter
+    if not isinstance(source, (bytes, bytearray, memoryview)):
+        return PDFConverter(source)
+    import fitz
+    if isinstance(source, bytearray):
+        # PyMuPDF会复制 bytearray，memoryview 则直接引用原数据
+        source = memoryview(source)
+    # pdf2docx 0.5.6 的 Converter 只接受文件路径：先打开一个空文档，再换成内存中的PDF
+    cv = PDFConverter(None)
+    cv.fitz_doc.close()
+    cv._fitz_doc = fitz.Document(stream=source, filetype='pdf')
+    cv.filename_pdf = 'memory.pdf'
+    return cv
+
+
+def converter_settings(cv, options):
+    """在 pdf2docx 默认设置的基础上合并调用方的设置"""
+    settings = cv.default_settings
+    settings.update(options)
+    return settings
+
+
+def track_pages(pages, method, tracker):
+    """包装每页的 parse/make_docx 方法，每完成一页推进一次进度"""
+    stage = method.replace('_', '-') + '-page'
+    for page in pages:
+        original = getattr(page, method)
+
+        def wrapped(*args, _original=original, _page=page, **kwargs):
+            try:
+                with tracing.span(stage, page=_page.id + 1):
+                    return _original(*args, **kwargs)
+            finally:
+                tracker.advance()
+
+        setattr(page, method, wrapped)
+
+
+def convert_pdf(input_path, output_path, tracker=None, start=0, end=None, pages=None,
+                memory_budget=None, layouts=None, layout_keys=None, max_image_dpi=None,
+                image_quality=None, **options):
+    """把PDF转换为DOCX，逐页上报解析和生成进度
+
+    input_path 也可以是内存中的PDF内容（bytes/bytearray/memoryview），output_path 也可以是可写的文件对象。
+    memory_budget 为进程内存预算（字节），指定时使用分窗口的低内存模式。
+    layouts 为可选的 LayoutStore，用于复用之前解析好的页面（低内存模式下不使用）；
+    layout_keys 为调用方已经算好的各页存储键（见 LayoutStore.make_keys），省略时在这里计算。
+    max_image_dpi/image_quality 为嵌入图片的分辨率上限和JPEG质量，None 表示不缩小。
+    """
+    tracker = tracker or ProgressTracker()
+    peak = PeakRss().start()
+    install_decode_cache()
+    images = ImageStage(max_image_dpi, image_quality)
+    with tracing.span('open'):
+        cv = open_converter(input_path)
+    try:
+        settings = converter_settings(cv, options)
+        with tracing.span('load-pages'):
+            cv.load_pages(start, end, pages)
+        if memory_budget:
+            convert_windowed(cv, output_path, tracker, settings, memory_budget, images)
+            return output_path
+
+        selected = [page for page in cv.pages if not page.skip_parsing]
+        if layouts is not None:
+            keys = layout_keys
+            if keys is None:
+                with tracing.span('fingerprint', pages=len(selected)):
+                    keys = layouts.make_keys(cv.fitz_doc, [page.id for page in selected], settings)
+            restore_layouts(selected, layouts, keys, tracker)
+        missing = [page for page in selected if not page.finalized]
+        if missing:
+            tracker.start_phase('analyze')
+            with tracing.span('analyze'):
+                cv.parse_document(**settings)
+
+            tracker.start_phase('parse', len(missing))
+            track_pages(missing, 'parse', tracker)
+            with tracing.span('parse', pages=len(missing)):
+                cv.parse_pages(**settings)
+            if layouts is not None:
+                with tracing.span('layout-save'):
+                    layouts.save(keys, [page.store() for page in missing if page.finalized])
+
+        make_docx(cv, output_path, tracker, settings, images)
+    finally:
+        cv.close()
+        tracker.stats['peak_rss'] = peak.stop()
+    return output_path
+
+
+def restore_layouts(pages, layouts, keys, tracker):
+    """从存储中恢复已解析的页面，恢复的页面不再参与解析"""
+    with tracing.span('layout-load'):
+        stored = layouts.load(keys)
+        for page in pages:
+            data = stored.get(page.id)
+            if data is not None:
+                page.restore(data)
+                page.skip_parsing = True
+    tracker.stats['layout_pages_reused'] = len(stored)
+    tracker.stats['layout_pages_parsed'] = len(pages) - len(stored)
+    return stored
+
+
+def _release_page(page):
+    """释放已写入DOCX的页面版面数据"""
+    page.sections.reset()
+    page.float_images.reset()
+
+
+def _shrink_fitz_store():
+    """释放PyMuPDF内部缓存的页面资源"""
+    try:
+        import fitz
+        fitz.TOOLS.store_shrink(100)
+    except Exception:
+        pass
+
+
+def _analyze_page(cv, page, fonts, settings):
+    """文档级分析中单页的部分（同 pdf2docx 0.5.6 的 Pages.parse）
+
+    Pages.parse 每次调用都重新提取整个文档的字体，分窗口时改为逐页分析、共用一份字体信息。
+    """
+    from pdf2docx.page.RawPageFactory import RawPageFactory
+    raw_page = RawPageFactory.create(page_engine=cv.fitz_doc[page.id], backend='PyMuPDF')
+    raw_page.restore(**settings)
+    raw_page.clean_up(**settings)
+    raw_page.process_font(fonts)
+    page.width = raw_page.width
+    page.height = raw_page.height
+    page.float_images.reset().extend(raw_page.blocks.floating_image_blocks)
+    raw_page.margin = page.margin = raw_page.calculate_margin(**settings)
+    page.sections.extend(raw_page.parse_section(**settings))
+
+
+def convert_windowed(cv, output_path, tracker, settings, memory_budget, images=None):
+    """低内存模式：分窗口解析页面并立即写入DOCX，写完即释放"""
+    from docx import Document
+    from pdf2docx.font.Fonts import Fonts
+
+    selected = [page for page in cv.pages if not page.skip_parsing]
+    # 字体信息整个文档只提取一次，各窗口共用
+    with tracing.span('fonts'):
+        fonts = Fonts.extract(cv.fitz_doc)
+
+    images = images or ImageStage()
+    docx_file = Document()
+    tracker.start_phase('parse', len(selected))
+    window = INITIAL_WINDOW
+    written = 0
+    index = 0
+    while index < len(selected):
+        batch = selected[index:index + window]
+        before = process_rss(os.getpid())
+
+        analyzed = []
+        with tracing.span('analyze', pages=len(batch)):
+            for page in batch:
+                if _run_page_step(page, 'parse', lambda page=page: _analyze_page(cv, page, fonts, settings), settings):
+                    analyzed.append(page)
+        for page in analyzed:
+            with tracing.span('parse-page', page=page.id + 1):
+                _run_page_step(page, 'parse', lambda page=page: page.parse(**settings), settings)
+        images.process([page for page in batch if page.finalized])
+        for page in batch:
+            if page.finalized:
+                with tracing.span('make-docx-page', page=page.id + 1):
+                    _run_page_step(page, 'make', lambda page=page: page.make_docx(docx_file), settings)
+                written += 1
+            tracker.advance()
+
+        grown = max(0, process_rss(os.getpid()) - before)
+        for page in batch:
+            _release_page(page)
+        _shrink_fitz_store()
+
+        # 按本窗口的每页内存增量估算下一个窗口能容纳的页数
+        index += len(batch)
+        per_page = grown / len(batch) if grown else 0
+        headroom = memory_budget - process_rss(os.getpid())
+        if per_page:
+            window = max(1, min(MAX_WINDOW, int(headroom / per_page)))
+        elif headroom > 0:
+            window = min(MAX_WINDOW, window * 2)
+        else:
+            window = 1
+
+    if not written:
+        raise RuntimeError('没有成功解析的页面')
+    images.report(tracker.stats)
+    with tracing.span('save-docx'):
+        docx_file.save(output_path)
+    tracker.stats['memory_budget'] = memory_budget
+
+
+def _run_page_step(page, step, action, settings):
+    """执行单页的解析/生成，按 ignore_page_error 设置决定是否跳过出错的页面，成功时返回 True"""
+    try:
+        action()
+    except Exception as e:
+        if settings.get('debug') or not settings.get('ignore_page_error', True):
+            raise RuntimeError(f'第 {page.id + 1} 页{"解析" if step == "parse" else "生成"}失败: {e}')
+        return False
+    return True
+
+
+def make_docx(cv, output_path, tracker, settings, images=None):
+    """由已解析（或已恢复）的页面生成DOCX，images 为 ImageStage，省略时只为图片去重"""
+    parsed = [page for page in cv.pages if page.finalized]
+    images = images or ImageStage()
+    images.process(parsed)
+    images.report(tracker.stats)
+    tracker.start_phase('make', len(parsed))
+    track_pages(parsed, 'make_docx', tracker)
+    with tracing.span('make-docx', pages=len(parsed)):
+        if isinstance(output_path, (str, os.PathLike)):
+            cv.make_docx(output_path, **settings)
+        else:
+            # pdf2docx 0.5.6 的 make_docx 只接受文件名，写入文件对象时自己逐页生成
+            _write_docx(parsed, output_path, settings)
+
+
+def _write_docx(pages, target, settings):
+    """逐页生成DOCX并保存到 target（文件名或可写的文件对象）"""
+    from docx import Document
+    if not pages:
+        raise RuntimeError('没有成功解析的页面')
+    docx_file = Document()
+    for page in pages:
+        _run_page_step(page, 'make', lambda page=page: page.make_docx(docx_file), settings)
+    with tracing.span('save-docx'):
+        docx_file.save(target)
@@ -0,0 +1,390 @@
+"""pdf-word 命令行入口
+
+用法示例:
+    python pdf_word.py report.pdf
+    python pdf_word.py contract.docx -o out/contract.pdf
+    python pdf_word.py *.pdf -o out/ -j 8
+    python pdf_word.py --watch inbox/ -o outbox/
+    python pdf_word.py *.pdf -o /mnt/share/out --spool /mnt/share/spool --wait
+    python pdf_word.py --spool-worker /mnt/share/spool
+"""
+import argparse
+import json
+import os
+import sys
+
+import tracing
+from converter_core import (CONVERSION_MODES, CONVERSION_TYPES, INPUT_EXTENSIONS, MODE_FULL,
+                            OUTPUT_EXTENSIONS, convert, default_output_path, guess_conversion_type)
+from folder_scan import mirror_path, path_key, scan
+from progress import Throttle
+from scheduler import LARGEST_FIRST, POLICIES
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='pdf-word',
+        description='PDF与Word文档互相转换（无界面模式）',
+    )
+    parser.add_argument('inputs', nargs='*', help='输入文件（.pdf 或 .docx）或文件夹（递归查找）')
+    parser.add_argument('-o', '--output',
+                        help='输出文件路径；输入多个文件时为输出目录')
+    parser.add_argument('-t', '--type', dest='kind', choices=CONVERSION_TYPES,
+                        help='转换类型，默认按输入扩展名判断')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='批量转换的工作进程数；不指定时从CPU数量起步，按内存和吞吐量自动调整')
+    parser.add_argument('--max-jobs', type=int, default=None,
+                        help='自动调整时的进程数上限，默认为CPU数量')
+    parser.add_argument('--metrics', help='把并发调整记录以JSON写入该文件')
+    parser.add_argument('--order', choices=POLICIES, default=LARGEST_FIRST,
+                        help='批量任务顺序：largest 大文件优先（整批最快完成），'
+                             'shortest 小文件优先，fifo 按输入顺序')
+    parser.add_argument('--mode', choices=CONVERSION_MODES, default=MODE_FULL,
+                        help='PDF转Word的模式：full 完整版面分析（默认），fast 跳过表格识别（适合信函等纯文字文档），'
+                             'auto 只对没有表格的文档使用快速模式（防止误用，不会明显变快）')
+    parser.add_argument('--parallel', choices=('auto', 'on', 'off'), default='auto',
+                        help='大PDF按页并行转换：auto 为页数超过阈值时自动启用')
+    parser.add_argument('--memory-budget', type=int, default=None, metavar='MB',
+                        help='低内存模式：按页分批处理PDF，使每个转换进程的内存不超过该值（MB）')
+    parser.add_argument('--max-image-dpi', type=int, default=None, metavar='DPI',
+                        help='PDF转Word时把分辨率超过该值的图片（按页面上的显示尺寸计算）缩小后再嵌入')
+    parser.add_argument('--image-quality', type=int, default=None, metavar='1-100',
+                        help='PDF转Word时把不透明的图片重新编码为该质量的JPEG（变小时才替换）')
+    parser.add_argument('--cache-dir',
+                        help='启用转换结果缓存并指定缓存目录（也可用环境变量 PDF_WORD_CACHE_DIR）')
+    parser.add_argument('--cache-size', type=int, default=1024,
+                        help='缓存容量上限（MB），默认1024')
+    parser.add_argument('--cache-stats', action='store_true', help='结束时输出缓存命中统计')
+    parser.add_argument('--layout-dir',
+                        help='保存PDF解析结果的目录（也可用环境变量 PDF_WORD_LAYOUT_DIR），'
+                             '之后只改页码范围或生成选项时跳过解析')
+    parser.add_argument('--pages', type=page_range, metavar='N-M',
+                        help='只转换PDF的第N到M页（从1开始，含M）')
+    parser.add_argument('--trace', metavar='FILE',
+                        help='记录各阶段耗时，写出Chrome trace JSON并输出汇总表')
+    parser.add_argument('--preflight', action='store_true',
+                        help='转换前快速预检PDF：加密或损坏的文件直接报错，纯文字文档跳过表格识别，'
+                             '批量任务按预估代价排序')
+    parser.add_argument('--timeout', type=float, default=None, metavar='SECONDS',
+                        help='单个文件的最长转换时间，超时的任务结束后重试一次，再次超时的文件被隔离')
+    parser.add_argument('--memory-limit', type=int, default=None, metavar='MB',
+                        help='单个转换进程的内存上限，超限的处理同 --timeout')
+    parser.add_argument('--quarantine', metavar='FILE',
+                        help='隔离名单文件，默认在缓存目录下的 quarantine.json')
+    parser.add_argument('--resume', action='store_true',
+                        help='批量转换时记录断点续转日志；中断后用相同参数重新运行，'
+                             '跳过已完成且校验通过的文件')
+    parser.add_argument('--watch', action='store_true',
+                        help='监视模式：把唯一的输入当作收件目录，新增或修改的文档自动转换到 -o 指定的目录')
+    parser.add_argument('--settle', type=float, default=2.0,
+                        help='监视模式下文件大小和修改时间保持不变多少秒后才开始转换')
+    parser.add_argument('--poll', action='store_true', help='监视模式下不使用inotify，定期扫描目录')
+    parser.add_argument('--spool', metavar='DIR',
+                        help='不在本机转换，把任务放入多台机器共享的任务目录，由各节点的 --spool-worker 转换')
+    parser.add_argument('--wait', action='store_true', help='与 --spool 一起使用：等待所有任务完成并输出结果')
+    parser.add_argument('--spool-worker', metavar='DIR',
+                        help='作为转换节点运行：从共享任务目录领取任务转换，结果写回该目录')
+    parser.add_argument('--lease-timeout', type=float, default=60.0, metavar='SECONDS',
+                        help='转换节点的租约超时，超时未续约的任务由其他节点重新转换，默认60秒')
+    parser.add_argument('--idle-exit', type=float, default=None, metavar='SECONDS',
+                        help='共享任务目录中没有任务多少秒后转换节点退出，默认一直运行')
+    parser.add_argument('-q', '--quiet', action='store_true', help='不输出进度信息')
+    return parser
+
+
+def page_range(text):
+    """解析 N-M 或 N 形式的页码范围，返回 (start, end)，start从0开始、end不含"""
+    first, _, last = text.partition('-')
+    try:
+        start = int(first)
+        end = int(last) if last else start
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'无效的页码范围: {text}')
+    if start < 1 or end < start:
+        raise argparse.ArgumentTypeError(f'无效的页码范围: {text}')
+    return start - 1, end
+
+
+def resolve_jobs(inputs, output, kind):
+    """把命令行参数展开成 (输入, 输出, 类型) 列表
+
+    输入中的文件夹递归展开，指定了输出目录时在其中按相同的目录结构输出。
+    """
+    folders = [path for path in inputs if os.path.isdir(path)]
+    multiple = len(inputs) > 1 or bool(folders)
+    if multiple and output and not os.path.isdir(output):
+        os.makedirs(output, exist_ok=True)
+    jobs = []
+    seen = set()
+    for input_path in inputs:
+        if input_path in folders:
+            continue
+        seen.add(path_key(input_path))
+        job_kind = kind or guess_conversion_type(input_path)
+        if output and not multiple:
+            output_path = output
+        else:
+            output_path = default_output_path(input_path, job_kind, output)
+        jobs.append((input_path, output_path, job_kind))
+    extensions = {INPUT_EXTENSIONS[kind]} if kind else set(INPUT_EXTENSIONS.values())
+    created = set()
+    for chunk in scan(folders, extensions, seen):
+        for input_path, relative in chunk:
+            job_kind = kind or guess_conversion_type(input_path)
+            if output:
+                output_path = mirror_path(output, relative, OUTPUT_EXTENSIONS[job_kind])
+                directory = os.path.dirname(output_path)
+                if directory not in created:
+                    os.makedirs(directory, exist_ok=True)
+                    created.add(directory)
+            else:
+                output_path = default_output_path(input_path, job_kind)
+            jobs.append((input_path, output_path, job_kind))
+    return jobs
+
+
+def report_done(args, input_path, output_path, stats=None):
+    if not args.quiet:
+        line = f'完成: {input_path} -> {output_path}'
+        if stats and args.memory_budget and stats.get('peak_rss'):
+            line += f'  (峰值内存 {stats["peak_rss"] / 1024 / 1024:.0f} MB)'
+        if stats and stats.get('image_bytes_saved'):
+            line += (f'  (图片 {stats["images"]} 张/{stats["unique_images"]} 种，'
+                     f'节省 {stats["image_bytes_saved"] / 1024:.0f} KB)')
+        print(line)
+
+
+def build_options(args):
+    """把命令行参数转换为 convert() 的关键字参数"""
+    options = {'parallel': {'auto': None, 'on': True, 'off': False}[args.parallel]}
+    if args.mode != MODE_FULL:
+        options['mode'] = args.mode
+    if args.memory_budget:
+        options['memory_budget'] = args.memory_budget * 1024 * 1024
+    cache_dir = args.cache_dir or os.environ.get('PDF_WORD_CACHE_DIR')
+    if cache_dir:
+        from conversion_cache import ConversionCache
+        options['cache'] = ConversionCache(cache_dir, max_bytes=args.cache_size * 1024 * 1024)
+    layout_dir = args.layout_dir or os.environ.get('PDF_WORD_LAYOUT_DIR')
+    if layout_dir:
+        from layout_store import LayoutStore
+        options['layouts'] = LayoutStore(layout_dir)
+    if args.pages:
+        options['start'], options['end'] = args.pages
+    if args.max_image_dpi:
+        options['max_image_dpi'] = args.max_image_dpi
+    if args.image_quality:
+        options['image_quality'] = args.image_quality
+    return options
+
+
+def preflight_options(input_path, options):
+    """单文件转换前的预检：拒绝无法转换的文件，纯文字文档改走快速路径"""
+    from preflight import ROUTE_REJECT, ROUTE_TEXT, TEXT_ONLY_SETTINGS, classify
+    report = classify(input_path, options.get('password'))
+    if report.route == ROUTE_REJECT:
+        raise RuntimeError(f'预检未通过: {report.reason}')
+    if report.route == ROUTE_TEXT:
+        return dict(TEXT_ONLY_SETTINGS, **options)
+    return options
+
+
+def create_engine(args):
+    """按命令行参数创建批量引擎"""
+    from batch_engine import BatchEngine
+    watchdog = None
+    if args.timeout or args.memory_limit:
+        from job_watchdog import JobWatchdog, Quarantine
+        watchdog = JobWatchdog(args.timeout,
+                               args.memory_limit * 1024 * 1024 if args.memory_limit else None,
+                               quarantine=Quarantine(args.quarantine))
+    if args.jobs:
+        return BatchEngine(max_workers=args.jobs, policy=args.order, preflight=args.preflight,
+                           watchdog=watchdog)
+    return BatchEngine(max_workers=args.max_jobs, policy=args.order, autotune=True,
+                       preflight=args.preflight, watchdog=watchdog)
+
+
+def report_watchdog(metrics):
+    if metrics['timeouts'] or metrics['memory_kills'] or metrics['crashes'] or metrics['rejected']:
+        print('看门狗: 超时 {timeouts}, 内存超限 {memory_kills}, 崩溃 {crashes}, 重试 {retries} '
+              '(成功 {retry_successes}), 隔离 {quarantined}, 拒绝已隔离文件 {rejected}'.format(**metrics),
+              file=sys.stderr)
+
+
+def watch(args, options):
+    """监视收件目录直到按下 Ctrl+C"""
+    from watch_folder import FolderWatcher
+
+    if len(args.inputs) != 1 or not os.path.isdir(args.inputs[0]) or not args.output:
+        print('错误: 监视模式需要一个收件目录和 -o 输出目录', file=sys.stderr)
+        return 2
+    engine = create_engine(args)
+
+    def on_result(result):
+        if result.success:
+            report_done(args, result.job.input_path, result.job.output_path, result.stats)
+        elif not result.cancelled:
+            print(f'失败: {result.job.input_path}: {result.error}', file=sys.stderr)
+
+    watcher = FolderWatcher(args.inputs[0], args.output, engine, kind=args.kind, settle=args.settle,
+                            polling=args.poll, on_result=on_result, **options)
+    if not args.quiet:
+        print(f'正在监视 {watcher.inbox}（{watcher.mode}），按 Ctrl+C 退出', file=sys.stderr)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.shutdown()
+    if engine.watchdog is not None and not args.quiet:
+        report_watchdog(engine.watchdog_metrics())
+    return 0
+
+
+def spool_jobs(args, jobs, options):
+    """把任务放入共享任务目录，指定 --wait 时等待结果"""
+    from spool import Spool
+
+    spool = Spool(args.spool, lease_timeout=args.lease_timeout)
+    # 任务随文件传给其他机器，只带上可以序列化的设置（缓存等由各节点自己配置）
+    options = {name: value for name, value in options.items()
+               if isinstance(value, (str, int, float, bool)) or value is None}
+    job_ids = [spool.submit(os.path.abspath(input_path), os.path.abspath(output_path), kind, **options)
+               for input_path, output_path, kind in jobs]
+    if not args.quiet:
+        print(f'已放入 {len(job_ids)} 个任务: {spool.root}', file=sys.stderr)
+    if not args.wait:
+        return 0
+    failed = 0
+    for record in spool.wait(job_ids):
+        if record['success']:
+            report_done(args, record['input'], record['output'], record.get('stats'))
+        else:
+            failed += 1
+            print(f'失败: {record["input"]}: {record.get("error")}', file=sys.stderr)
+    return 1 if failed else 0
+
+
+def spool_worker(args, options):
+    """作为转换节点运行，直到空闲超时或按下 Ctrl+C"""
+    from spool import DEFAULT_HEARTBEAT, Spool, SpoolWorker
+
+    spool = Spool(args.spool_worker, lease_timeout=args.lease_timeout)
+    engine = create_engine(args)
+
+    def on_result(job, success, error):
+        if success:
+            report_done(args, job['input'], job['output'])
+        else:
+            print(f'失败: {job["input"]}: {error}', file=sys.stderr)
+
+    worker = SpoolWorker(spool, engine, heartbeat=min(DEFAULT_HEARTBEAT, args.lease_timeout / 3),
+                         idle_exit=args.idle_exit, on_result=on_result, **options)
+    if not args.quiet:
+        print(f'转换节点 {worker.node} 正在处理 {spool.root}，按 Ctrl+C 退出', file=sys.stderr)
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.shutdown()
+    if not args.quiet:
+        print('节点: 领取 {claimed}, 成功 {succeeded}, 失败 {failed}, 放回 {requeued}, '
+              '回收失联节点的任务 {reclaimed}'.format(**worker.stats), file=sys.stderr)
+    return 0
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.spool_worker:
+        return spool_worker(args, build_options(args))
+    if not args.inputs:
+        parser.error('需要至少一个输入文件或文件夹')
+    if args.watch:
+        return watch(args, build_options(args))
+    try:
+        jobs = resolve_jobs(args.inputs, args.output, args.kind)
+    except ValueError as e:
+        print(f'错误: {e}', file=sys.stderr)
+        return 2
+
+    if args.trace:
+        tracing.enable()
+    options = build_options(args)
+    if args.spool:
+        return spool_jobs(args, jobs, options)
+    failed = 0
+    if len(jobs) == 1 and not (args.timeout or args.memory_limit):
+        # 单个文件直接在当前进程转换，省去启动工作进程的开销
+        input_path, output_path, kind = jobs[0]
+        stats = {}
+        show = not args.quiet and sys.stderr.isatty()
+        throttle = Throttle(lambda event: print(f'\r{event.describe():<60}', end='', file=sys.stderr))
+
+        def progress(event):
+            stats.update(event.stats)
+            if show:
+                throttle(event)
+
+        try:
+            if args.preflight and kind == 'pdf2word':
+                options = preflight_options(input_path, options)
+            convert(input_path, output_path, kind, progress=progress, **options)
+            if show:
+                print(file=sys.stderr)
+            report_done(args, input_path, output_path, stats)
+        except Exception as e:
+            failed += 1
+            print(f'失败: {input_path}: {e}', file=sys.stderr)
+    else:
+        engine = create_engine(args)
+        journal = None
+        if args.resume:
+            from batch_journal import BatchJournal
+            journal = BatchJournal(jobs)
+            jobs, skipped = journal.resume()
+            journal.open()
+            if skipped and not args.quiet:
+                print(f'跳过 {len(skipped)} 个已完成的文件')
+        finished = False
+        try:
+            for result in engine.map(jobs, **options):
+                if journal is not None:
+                    journal.record_result(result)
+                if result.success:
+                    report_done(args, result.job.input_path, result.job.output_path, result.stats)
+                else:
+                    failed += 1
+                    print(f'失败: {result.job.input_path}: {result.error}', file=sys.stderr)
+            finished = True
+        finally:
+            engine.shutdown()
+            if journal is not None:
+                # 被中断或有失败的文件时保留日志，供下次续转
+                journal.close(complete=finished and not failed)
+        watchdog_metrics = engine.watchdog_metrics()
+        if watchdog_metrics is not None and not args.quiet:
+            report_watchdog(watchdog_metrics)
+        if args.metrics:
+            metrics = engine.scaling_metrics()
+            if watchdog_metrics is not None:
+                metrics['watchdog'] = watchdog_metrics
+            with open(args.metrics, 'w', encoding='utf-8') as f:
+                json.dump(metrics, f, ensure_ascii=False, indent=2)
+
+    if args.trace:
+        events = tracing.collect()
+        tracing.export_chrome_trace(args.trace, events)
+        if not args.quiet:
+            print(tracing.format_summary(tracing.summarize(events)), file=sys.stderr)
+    if args.cache_stats and 'cache' in options:
+        stats = options['cache'].stats()
+        print('缓存: 命中 {hits}, 未命中 {misses}, 淘汰 {evictions}, '
+              '{entries} 个条目共 {bytes} 字节'.format(**stats))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""转换进度
+
+ProgressTracker 把各阶段的逐页事件折算成总体百分比，并计算页/秒和剩余时间；
+Throttle 限制事件频率，避免大量逐页事件淹没界面线程或进程间队列。
+"""
+import time
+
+# 各阶段在总体进度中所占的百分比区间
+PHASE_RANGES = {
+    'open': (0, 5),
+    'analyze': (5, 15),
+    'parse': (15, 85),
+    'make': (85, 99),
+    'render': (5, 99),
+    'done': (100, 100),
+}
+
+PHASE_NAMES = {
+    'open': '打开文档',
+    'analyze': '分析文档',
+    'parse': '解析页面',
+    'make': '生成文档',
+    'render': '渲染PDF',
+    'done': '完成',
+}
+
+
+class ProgressEvent:
+    """一次进度更新"""
+
+    def __init__(self, phase, done, total, percent, rate=0.0, eta=None, stats=None):
+        self.phase = phase
+        self.done = done
+        self.total = total
+        self.percent = percent
+        self.rate = rate  # 当前阶段的页/秒
+        self.eta = eta    # 当前阶段预计剩余秒数，未知时为None
+        self.stats = stats or {}  # 结束事件附带的统计信息，如峰值内存
+
+    def describe(self):
+        """生成用于界面显示的文字"""
+        text = PHASE_NAMES.get(self.phase, self.phase)
+        if self.total:
+            text += f' {self.done}/{self.total} 页'
+        if self.rate:
+            text += f', {self.rate:.1f} 页/秒'
+        if self.eta is not None and self.done < self.total:
+            minutes, seconds = divmod(int(self.eta), 60)
+            text += f', 剩余约 {minutes}分{seconds:02d}秒' if minutes else f', 剩余约 {seconds}秒'
+        return text
+
+    def __repr__(self):
+        return f'ProgressEvent({self.phase!r}, {self.done}/{self.total}, {self.percent}%)'
+
+
+class ProgressTracker:
+    """记录当前阶段和已完成页数，每次变化时回调 ProgressEvent"""
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.phase = 'open'
+        self.total = 0
+        self.done = 0
+        self.phase_started = time.perf_counter()
+        # 转换过程中收集的统计信息，随结束事件一起送出
+        self.stats = {}
+
+    def start_phase(self, phase, total=0):
+        self.phase = phase
+        self.total = total
+        self.done = 0
+        self.phase_started = time.perf_counter()
+        self._emit()
+
+    def advance(self, count=1):
+        self.done += count
+        self._emit()
+
+    def finish(self):
+        self.start_phase('done')
+
+    def _emit(self):
+        if self.callback is None:
+            return
+        low, high = PHASE_RANGES.get(self.phase, (0, 100))
+        fraction = min(1.0, self.done / self.total) if self.total else 0.0
+        elapsed = time.perf_counter() - self.phase_started
+        rate = self.done / elapsed if self.done and elapsed > 0 else 0.0
+        eta = (self.total - self.done) / rate if rate else None
+        self.callback(ProgressEvent(self.phase, self.done, self.total,
+                                    int(low + (high - low) * fraction), rate, eta,
+                                    dict(self.stats) if self.phase == 'done' else None))
+
+
+class Throttle:
+    """限制进度回调的频率
+
+    阶段切换和阶段内最后一页的事件总是立即送出，其余事件至少间隔 interval 秒。
+    """
+
+    def __init__(self, callback, interval=0.1):
+        self.callback = callback
+        self.interval = interval
+        self._last_time = 0.0
+        self._last_phase = None
+
+    def __call__(self, event):
+        now = time.monotonic()
+        if (event.phase != self._last_phase
+                or (event.total and event.done >= event.total)
+                or now - self._last_time >= self.interval):
+            self._last_time = now
+            self._last_phase = event.phase
+            self.callback(event)
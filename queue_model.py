@@ -0,0 +1,173 @@
+"""批量转换队列的表格模型
+
+QTableView 只绘制可见的行，上万个文件的批次也只占用几十行的绘制开销。
+工作进程的结果和进度在引擎收集线程中通过 post() 放入缓冲区，不再每个文件发一次跨线程信号；
+界面线程的定时器每帧取出全部更新，一次性修改行数据和计数器，只对变化的行范围发出一次 dataChanged，
+然后发出 refreshed 信号供窗口刷新进度条和状态文字。各状态的文件数随更新增减，无需遍历整个批次。
+"""
+import collections
+import os
+
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt, QTimer, pyqtSignal
+from PyQt5.QtGui import QColor
+
+PENDING = 'pending'
+RUNNING = 'running'
+SUCCESS = 'success'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+SKIPPED = 'skipped'
+
+# 已结束的状态
+FINISHED_STATES = (SUCCESS, FAILED, CANCELLED, SKIPPED)
+
+STATE_LABELS = {
+    PENDING: '等待',
+    RUNNING: '转换中',
+    SUCCESS: '成功',
+    FAILED: '失败',
+    CANCELLED: '已取消',
+    SKIPPED: '已跳过',
+}
+STATE_COLORS = {
+    SUCCESS: QColor('#4CAF50'),
+    FAILED: QColor('#f44336'),
+    CANCELLED: QColor('#999999'),
+    SKIPPED: QColor('#999999'),
+}
+
+# 合并刷新的间隔（毫秒），约每帧一次
+REFRESH_INTERVAL = 16
+
+# 行数据的列
+NAME, STATE, PROGRESS, DURATION, ERROR = range(5)
+HEADERS = ('文件', '状态', '进度', '耗时', '错误')
+
+
+class BatchQueueModel(QAbstractTableModel):
+    """批量转换中每个文件的状态、进度、耗时和错误"""
+
+    refreshed = pyqtSignal()  # 一次合并刷新之后发出
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []      # [文件名, 状态, 进度, 耗时, 错误]
+        self._index = {}     # 输入路径 -> 行号
+        self.counts = collections.Counter()
+        # 各线程提交的更新，deque 的 append/popleft 本身是线程安全的
+        self._pending = collections.deque()
+        self._timer = QTimer(self)
+        self._timer.setInterval(REFRESH_INTERVAL)
+        self._timer.timeout.connect(self.flush)
+
+    # ---------- Qt 模型接口 ----------
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column == STATE:
+                return STATE_LABELS[row[STATE]]
+            if column == PROGRESS:
+                return f'{row[PROGRESS]}%'
+            if column == DURATION:
+                return f'{row[DURATION]:.1f} 秒' if row[DURATION] is not None else ''
+            return row[column]
+        if role == Qt.ToolTipRole and column in (NAME, ERROR):
+            return row[column] or None
+        if role == Qt.ForegroundRole and column == STATE:
+            return STATE_COLORS.get(row[STATE])
+        if role == Qt.TextAlignmentRole and column in (PROGRESS, DURATION):
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    # ---------- 批次 ----------
+
+    def reset(self, paths):
+        """换成新的一批文件，全部为等待状态"""
+        self.beginResetModel()
+        self._pending.clear()
+        self._rows = [[os.path.basename(path), PENDING, 0, None, ''] for path in paths]
+        self._index = {path: row for row, path in enumerate(paths)}
+        self.counts = collections.Counter({PENDING: len(self._rows)})
+        self.endResetModel()
+        self.refreshed.emit()
+
+    def append(self, paths):
+        """在末尾追加等待中的文件（边扫描文件夹边加入时使用）"""
+        paths = [path for path in paths if path not in self._index]
+        if not paths:
+            return
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(paths) - 1)
+        for row, path in enumerate(paths, first):
+            self._rows.append([os.path.basename(path), PENDING, 0, None, ''])
+            self._index[path] = row
+        self.counts[PENDING] += len(paths)
+        self.endInsertRows()
+        self.refreshed.emit()
+
+    def start(self):
+        self._timer.start()
+
+    def stop(self):
+        """停止定时刷新，剩余的更新立即应用"""
+        self._timer.stop()
+        self.flush()
+
+    @property
+    def total(self):
+        return len(self._rows)
+
+    @property
+    def finished_count(self):
+        return sum(self.counts[state] for state in FINISHED_STATES)
+
+    def post(self, path, state=None, progress=None, duration=None, error=None):
+        """提交一个文件的状态变化，可以在任意线程中调用，下一次刷新时生效"""
+        self._pending.append((path, state, progress, duration, error))
+
+    def flush(self):
+        """应用缓冲区中的全部更新（界面线程）"""
+        if not self._pending:
+            return
+        first = last = None
+        while self._pending:
+            path, state, progress, duration, error = self._pending.popleft()
+            row_index = self._index.get(path)
+            if row_index is None:
+                continue
+            row = self._rows[row_index]
+            if row[STATE] in FINISHED_STATES and state in (None, RUNNING):
+                # 结束之后才到达的进度不再改变状态
+                continue
+            if state is not None and state != row[STATE]:
+                self.counts[row[STATE]] -= 1
+                self.counts[state] += 1
+                row[STATE] = state
+            if state == SUCCESS:
+                row[PROGRESS] = 100
+            elif progress is not None:
+                row[PROGRESS] = progress
+            if duration is not None:
+                row[DURATION] = duration
+            if error is not None:
+                row[ERROR] = error
+            first = row_index if first is None else min(first, row_index)
+            last = row_index if last is None else max(last, row_index)
+        if first is not None:
+            self.dataChanged.emit(self.index(first, 0), self.index(last, len(HEADERS) - 1))
+            self.refreshed.emit()
@@ -0,0 +1,372 @@
+"""常驻的DOCX→PDF渲染进程池
+
+docx2pdf 每转换一个文件都要启动一次Word会话，短文档的耗时几乎全花在启动上；
+而且它只支持Windows和macOS。这里改为维护若干个常驻的渲染进程，
+转换请求通过标准输入输出上的单行JSON协议分发给它们：
+
+    {"op": "ping"}                                   -> {"ok": true}
+    {"op": "convert", "input": ..., "output": ...}   -> {"ok": true} / {"ok": false, "error": ...}
+    {"op": "quit"}
+
+默认的渲染进程就是本模块的 --serve 模式：启动一个 soffice --headless 监听进程，
+有 python3-uno 时通过UNO复用同一个LibreOffice实例；没有时退化为逐个调用
+soffice --convert-to，但仍复用同一个已初始化的用户配置目录。
+任何遵守上述协议的程序都可以作为渲染进程（测试时可用假渲染进程代替）。
+"""
+import json
+import os
+import queue
+import select
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# 每个渲染进程处理多少个任务后回收重启，防止内存泄漏累积
+DEFAULT_MAX_JOBS = 200
+# 空闲超过该秒数的渲染进程在下次使用前先做健康检查
+HEALTH_CHECK_INTERVAL = 30
+DEFAULT_TIMEOUT = 300
+PING_TIMEOUT = 10
+START_TIMEOUT = 60
+
+
+class RendererError(Exception):
+    """渲染进程无响应或异常退出"""
+
+
+def default_command():
+    """渲染进程的启动命令，可用环境变量 PDF_WORD_RENDERER_CMD 替换"""
+    command = os.environ.get('PDF_WORD_RENDERER_CMD')
+    if command:
+        return shlex.split(command)
+    return [sys.executable, os.path.abspath(__file__), '--serve']
+
+
+class Renderer:
+    """一个常驻渲染进程"""
+
+    def __init__(self, command):
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        text=True, bufsize=1)
+        self.jobs = 0
+        self.last_used = time.monotonic()
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def request(self, message, timeout):
+        """发送一条请求并等待一行应答"""
+        if not self.alive():
+            raise RendererError(f'渲染进程已退出 (exitcode={self.process.returncode})')
+        try:
+            self.process.stdin.write(json.dumps(message) + '\n')
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise RendererError(f'渲染进程无法写入: {e}')
+        ready, _, _ = select.select([self.process.stdout], [], [], timeout)
+        if not ready:
+            raise RendererError(f'渲染进程超过 {timeout} 秒未响应')
+        line = self.process.stdout.readline()
+        if not line:
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                pass
+            raise RendererError(f'渲染进程意外退出 (exitcode={self.process.poll()})')
+        self.last_used = time.monotonic()
+        return json.loads(line)
+
+    def ping(self, timeout=PING_TIMEOUT):
+        try:
+            return self.request({'op': 'ping'}, timeout).get('ok', False)
+        except (RendererError, ValueError):
+            return False
+
+    def convert(self, input_path, output_path, timeout=DEFAULT_TIMEOUT):
+        self.jobs += 1
+        reply = self.request({'op': 'convert',
+                              'input': os.path.abspath(input_path),
+                              'output': os.path.abspath(output_path)}, timeout)
+        if not reply.get('ok'):
+            raise RuntimeError(reply.get('error') or '渲染失败')
+
+    def close(self):
+        if self.alive():
+            try:
+                self.process.stdin.write(json.dumps({'op': 'quit'}) + '\n')
+                self.process.stdin.flush()
+                self.process.wait(timeout=10)
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+        if self.alive():
+            self.process.kill()
+            self.process.wait()
+
+
+class RendererPool:
+    """渲染进程池：带健康检查、按任务数回收以及崩溃后重启"""
+
+    def __init__(self, size=1, max_jobs=DEFAULT_MAX_JOBS, command=None, timeout=DEFAULT_TIMEOUT):
+        self.size = size
+        self.max_jobs = max_jobs
+        self.command = command or default_command()
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._started = 0
+        self._closed = False
+        self.restarts = 0
+        self.recycled = 0
+
+    def _acquire(self):
+        while True:
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError('渲染进程池已关闭')
+                spawn = self._idle.empty() and self._started < self.size
+                if spawn:
+                    self._started += 1
+            if spawn:
+                try:
+                    return self._spawn()
+                except RendererError:
+                    self._discard(None)
+                    raise
+            try:
+                renderer = self._idle.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if (not renderer.alive()
+                    or (time.monotonic() - renderer.last_used > HEALTH_CHECK_INTERVAL
+                        and not renderer.ping())):
+                renderer = self._replace(renderer)
+            return renderer
+
+    def _spawn(self):
+        renderer = Renderer(self.command)
+        # 等待渲染进程完成初始化
+        if not renderer.ping(START_TIMEOUT):
+            renderer.close()
+            raise RendererError('渲染进程启动失败')
+        return renderer
+
+    def _discard(self, renderer):
+        """关闭渲染进程并释放其名额"""
+        if renderer is not None:
+            renderer.close()
+        with self._lock:
+            self._started -= 1
+
+    def _replace(self, renderer):
+        """用新进程替换崩溃或无响应的渲染进程"""
+        renderer.close()
+        self.restarts += 1
+        try:
+            return self._spawn()
+        except RendererError:
+            self._discard(None)
+            raise
+
+    def _release(self, renderer):
+        if renderer.jobs >= self.max_jobs:
+            self.recycled += 1
+            self._discard(renderer)
+        else:
+            self._idle.put(renderer)
+
+    def convert(self, input_path, output_path):
+        """把DOCX渲染为PDF；渲染进程崩溃或卡死时换一个新进程重试一次"""
+        renderer = self._acquire()
+        try:
+            renderer.convert(input_path, output_path, self.timeout)
+        except RendererError:
+            renderer = self._replace(renderer)
+            try:
+                renderer.convert(input_path, output_path, self.timeout)
+            except RendererError:
+                self._discard(renderer)
+                raise
+            except Exception:
+                self._release(renderer)
+                raise
+        except Exception:
+            self._release(renderer)
+            raise
+        self._release(renderer)
+        return output_path
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        while not self._idle.empty():
+            self._idle.get().close()
+
+
+_default_pool = None
+_default_lock = threading.Lock()
+
+
+def default_pool():
+    """进程内共享的渲染进程池（批量引擎的每个工作进程各持有一个常驻渲染进程）"""
+    global _default_pool
+    with _default_lock:
+        if _default_pool is None:
+            import atexit
+            _default_pool = RendererPool()
+            atexit.register(_default_pool.close)
+        return _default_pool
+
+
+# ---------- 渲染进程（--serve 模式） ----------
+
+def _find_soffice():
+    for name in ('soffice', 'libreoffice'):
+        path = shutil.which(name)
+        if path:
+            return path
+    raise RuntimeError('未找到LibreOffice（soffice），请先安装')
+
+
+def _die_with_parent():
+    """让soffice在渲染进程被强制结束时一起退出（仅Linux）"""
+    try:
+        import ctypes
+        import signal
+        ctypes.CDLL('libc.so.6').prctl(1, signal.SIGKILL)  # PR_SET_PDEATHSIG
+    except Exception:
+        pass
+
+
+class _UnoBackend:
+    """通过UNO复用一个常驻的 soffice --headless 实例"""
+
+    def __init__(self, profile_dir):
+        import uno
+        from com.sun.star.connection import NoConnectException
+
+        self.uno = uno
+        pipe_name = f'pdfword_{os.getpid()}'
+        self.process = subprocess.Popen(
+            [_find_soffice(), '--headless', '--invisible', '--nologo', '--norestore',
+             '--nodefault', '--nolockcheck',
+             f'-env:UserInstallation={uno.systemPathToFileUrl(profile_dir)}',
+             f'--accept=pipe,name={pipe_name};urp;StarOffice.ComponentContext'],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            preexec_fn=_die_with_parent if sys.platform.startswith('linux') else None)
+
+        local = uno.getComponentContext()
+        resolver = local.ServiceManager.createInstanceWithContext(
+            'com.sun.star.bridge.UnoUrlResolver', local)
+        deadline = time.monotonic() + START_TIMEOUT
+        while True:
+            try:
+                context = resolver.resolve(f'uno:pipe,name={pipe_name};urp;StarOffice.ComponentContext')
+                break
+            except NoConnectException:
+                if time.monotonic() > deadline or self.process.poll() is not None:
+                    raise RuntimeError('无法连接到LibreOffice')
+                time.sleep(0.2)
+        self.desktop = context.ServiceManager.createInstanceWithContext(
+            'com.sun.star.frame.Desktop', context)
+
+    def _property(self, name, value):
+        from com.sun.star.beans import PropertyValue
+        prop = PropertyValue()
+        prop.Name = name
+        prop.Value = value
+        return prop
+
+    def ping(self):
+        if self.process.poll() is not None:
+            raise RuntimeError('LibreOffice已退出')
+        self.desktop.getComponents()
+
+    def convert(self, input_path, output_path):
+        doc = self.desktop.loadComponentFromURL(
+            self.uno.systemPathToFileUrl(input_path), '_blank', 0,
+            (self._property('Hidden', True),))
+        if doc is None:
+            raise RuntimeError(f'无法打开文档: {input_path}')
+        try:
+            doc.storeToURL(self.uno.systemPathToFileUrl(output_path),
+                           (self._property('FilterName', 'writer_pdf_Export'),))
+        finally:
+            doc.close(True)
+
+    def close(self):
+        try:
+            self.desktop.terminate()
+        except Exception:
+            pass
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+class _CommandBackend:
+    """没有UNO时逐个调用 soffice --convert-to，复用同一个用户配置目录"""
+
+    def __init__(self, profile_dir):
+        self.soffice = _find_soffice()
+        self.profile_url = 'file://' + profile_dir
+
+    def ping(self):
+        pass
+
+    def convert(self, input_path, output_path):
+        with tempfile.TemporaryDirectory(prefix='pdf-word-render-') as out_dir:
+            subprocess.run([self.soffice, '--headless', '--norestore', '--nolockcheck',
+                            f'-env:UserInstallation={self.profile_url}',
+                            '--convert-to', 'pdf', '--outdir', out_dir, input_path],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True)
+            produced = os.path.join(out_dir, os.path.splitext(os.path.basename(input_path))[0] + '.pdf')
+            if not os.path.exists(produced):
+                raise RuntimeError(f'LibreOffice未生成输出: {input_path}')
+            shutil.move(produced, output_path)
+
+    def close(self):
+        pass
+
+
+def serve(stdin=sys.stdin, stdout=sys.stdout):
+    """渲染进程主循环：逐行读取请求并应答"""
+    profile_dir = tempfile.mkdtemp(prefix='pdf-word-profile-')
+    try:
+        try:
+            backend = _UnoBackend(profile_dir)
+        except ImportError:
+            backend = _CommandBackend(profile_dir)
+
+        for line in stdin:
+            request = json.loads(line)
+            op = request.get('op')
+            if op == 'quit':
+                break
+            try:
+                if op == 'ping':
+                    backend.ping()
+                elif op == 'convert':
+                    backend.convert(request['input'], request['output'])
+                else:
+                    raise ValueError(f'未知请求: {op}')
+                reply = {'ok': True}
+            except Exception as e:
+                reply = {'ok': False, 'error': str(e)}
+            stdout.write(json.dumps(reply) + '\n')
+            stdout.flush()
+        backend.close()
+    finally:
+        shutil.rmtree(profile_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] == ['--serve']:
+        serve()
+    else:
+        print('用法: python render_pool.py --serve', file=sys.stderr)
+        sys.exit(2)
@@ -0,0 +1,86 @@
+"""批量任务调度
+
+用优先队列代替按到达顺序逐个扫描：
+- fifo：按提交顺序
+- largest：大文件优先，缩短整批的完成时间（避免最后才开始的大文件拖尾）
+- shortest：小文件优先，适合交互场景，尽快拿到第一批结果
+任务的大小来自廉价的预检（PDF页数，读取不到时按文件大小估算）。
+"""
+import heapq
+import itertools
+import os
+
+FIFO = 'fifo'
+LARGEST_FIRST = 'largest'
+SHORTEST_FIRST = 'shortest'
+POLICIES = (FIFO, LARGEST_FIRST, SHORTEST_FIRST)
+
+# 无法读取页数时，按每页约100KB估算
+BYTES_PER_PAGE = 100 * 1024
+
+
+def estimate_cost(input_path, kind):
+    """估算转换代价（以页数计）"""
+    try:
+        size = os.path.getsize(input_path)
+    except OSError:
+        return 0
+    if kind == 'pdf2word':
+        try:
+            from page_parallel import page_count
+            return page_count(input_path)
+        except Exception:
+            pass
+    return max(1, size // BYTES_PER_PAGE)
+
+
+class JobScheduler:
+    """按策略排序的等待队列，支持O(log n)的出队和取消"""
+
+    def __init__(self, policy=FIFO):
+        if policy not in POLICIES:
+            raise ValueError(f'未知的调度策略: {policy}')
+        self.policy = policy
+        self._heap = []
+        self._queued = {}
+        self._seq = itertools.count()
+
+    def needs_cost(self):
+        return self.policy != FIFO
+
+    def push(self, job, cost=0):
+        seq = next(self._seq)
+        if self.policy == LARGEST_FIRST:
+            key = (-cost, seq)
+        elif self.policy == SHORTEST_FIRST:
+            key = (cost, seq)
+        else:
+            key = (seq,)
+        self._queued[job.job_id] = job
+        heapq.heappush(self._heap, (key, job.job_id))
+
+    def pop(self):
+        """取出优先级最高的任务，队列为空时返回None"""
+        while self._heap:
+            _, job_id = heapq.heappop(self._heap)
+            job = self._queued.pop(job_id, None)
+            if job is not None:
+                return job
+        return None
+
+    def cancel(self, job_id):
+        """从队列中移除任务（延迟删除），返回被移除的任务"""
+        return self._queued.pop(job_id, None)
+
+    def drain(self):
+        """清空队列，返回所有等待中的任务"""
+        jobs = list(self._queued.values())
+        self._queued.clear()
+        self._heap.clear()
+        return jobs
+
+    def __len__(self):
+        return len(self._queued)
+
+    def __contains__(self, job_id):
+        return job_id in self._queued
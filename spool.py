@@ -0,0 +1,368 @@
+"""多台机器共享的任务目录（分布式批量转换）
+
+各台机器运行无界面的转换节点（pdf_word.py --spool-worker），从共享目录（NFS/SMB等）领取任务，
+每个节点用本机的批量引擎转换，单个文件的处理方式与界面的批量转换相同：
+创建输出目录、提交给引擎（时限、内存上限和隔离名单照常生效），按结果记为成功或失败。
+
+    <root>/pending/<任务>.json              等待领取
+    <root>/claimed/<任务>@<节点>.json       已被某个节点领取
+    <root>/claimed/<任务>@<节点>.lease      租约：节点信息，修改时间即最近一次心跳
+    <root>/done/<任务>.json                 成功的结果（耗时、统计、节点）
+    <root>/failed/<任务>.json               失败的结果（错误信息）
+
+领取任务就是把任务文件从 pending 重命名到 claimed，同一文件系统内的重命名是原子的，
+多个节点同时领取时只有一个成功。节点定期刷新租约的修改时间；租约超时的任务（节点崩溃、断电或断网）
+由其他节点重命名回 pending 再转换，重复失联的任务记为失败，避免一个文件拖垮所有节点。
+租约是否超时按共享目录所在文件系统的时钟判断，不受各台机器时钟偏差影响。
+被回收的任务如果原节点其实仍在转换，可能会被转换两次，结果以最后写入的为准（至少一次）。
+任务中的路径需要在各节点上都能访问（相对路径相对于共享目录）。
+
+只用本机的几个进程共享一个临时目录即可测试：
+
+    python pdf_word.py --spool /tmp/spool docs/*.pdf -o /tmp/out --wait
+    python pdf_word.py --spool-worker /tmp/spool --idle-exit 10    # 在几个终端中分别运行
+"""
+import json
+import os
+import re
+import socket
+import threading
+import time
+import uuid
+
+PENDING = 'pending'
+CLAIMED = 'claimed'
+DONE = 'done'
+FAILED = 'failed'
+
+DEFAULT_LEASE_TIMEOUT = 60.0
+DEFAULT_HEARTBEAT = 10.0
+DEFAULT_POLL_INTERVAL = 1.0
+# 节点失联后任务重新排队的次数
+DEFAULT_MAX_ATTEMPTS = 3
+
+_NODE_CHARS = re.compile(r'[^A-Za-z0-9._-]')
+
+
+def default_node_id():
+    """主机名 + 进程号，同一台机器上的多个节点互不冲突"""
+    return _NODE_CHARS.sub('_', f'{socket.gethostname()}-{os.getpid()}')
+
+
+def _write_json(path, data):
+    """原子地写入JSON：先写临时文件再重命名，读取方不会看到写了一半的文件"""
+    temp_path = f'{path}.{uuid.uuid4().hex[:8]}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+
+def _read_json(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+        return True
+    except OSError:
+        return False
+
+
+class Spool:
+    """共享任务目录：提交任务、查询和等待结果，以及节点使用的领取、续约和回收"""
+
+    def __init__(self, root, lease_timeout=DEFAULT_LEASE_TIMEOUT, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.root = os.path.abspath(root)
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+        for state in (PENDING, CLAIMED, DONE, FAILED):
+            os.makedirs(self._dir(state), exist_ok=True)
+
+    def _dir(self, state):
+        return os.path.join(self.root, state)
+
+    def _path(self, state, name):
+        return os.path.join(self.root, state, name)
+
+    def resolve(self, path):
+        """任务中的相对路径相对于共享目录"""
+        return path if os.path.isabs(path) else os.path.join(self.root, path)
+
+    # ---------- 提交与结果 ----------
+
+    def submit(self, input_path, output_path, kind=None, **options):
+        """放入一个任务，返回任务id；options 为 convert() 的设置，需可序列化为JSON"""
+        # 以时间开头，按名称排序即先进先出
+        job_id = f'{time.time_ns():020d}-{uuid.uuid4().hex[:8]}'
+        _write_json(self._path(PENDING, f'{job_id}.json'),
+                    {'id': job_id, 'input': input_path, 'output': output_path, 'kind': kind,
+                     'options': options, 'attempts': 0, 'submitted': time.time()})
+        return job_id
+
+    def result(self, job_id):
+        """已结束的任务返回结果记录（含 success），否则返回None"""
+        for state in (DONE, FAILED):
+            record = _read_json(self._path(state, f'{job_id}.json'))
+            if record is not None:
+                return record
+        return None
+
+    def wait(self, job_ids, poll_interval=DEFAULT_POLL_INTERVAL, stop=None):
+        """按完成顺序产出各任务的结果记录；stop 为可选的无参函数，返回True时提前结束"""
+        remaining = list(job_ids)
+        while remaining:
+            for job_id in list(remaining):
+                record = self.result(job_id)
+                if record is not None:
+                    remaining.remove(job_id)
+                    yield record
+            if remaining:
+                if stop is not None and stop():
+                    return
+                time.sleep(poll_interval)
+
+    def status(self):
+        """各状态的任务数"""
+        counts = {}
+        for state in (PENDING, CLAIMED, DONE, FAILED):
+            counts[state] = sum(1 for name in os.listdir(self._dir(state)) if name.endswith('.json'))
+        return counts
+
+    # ---------- 节点 ----------
+
+    def claim(self, node, limit):
+        """领取至多 limit 个等待中的任务，返回任务记录列表"""
+        claimed = []
+        if limit <= 0:
+            return claimed
+        for name in sorted(os.listdir(self._dir(PENDING))):
+            if not name.endswith('.json'):
+                continue
+            source = self._path(PENDING, name)
+            job_id = name[:-len('.json')]
+            target = self._path(CLAIMED, f'{job_id}@{node}.json')
+            try:
+                # 先刷新修改时间：写入租约之前，任务文件本身的修改时间就是领取时间
+                os.utime(source)
+                os.rename(source, target)
+            except OSError:
+                continue  # 已被其他节点领取
+            job = _read_json(target)
+            if job is None:
+                continue
+            _write_json(self._lease_path(job_id, node),
+                        {'node': node, 'host': socket.gethostname(), 'pid': os.getpid(),
+                         'claimed': time.time()})
+            claimed.append(job)
+            if len(claimed) >= limit:
+                break
+        return claimed
+
+    def _lease_path(self, job_id, node):
+        return self._path(CLAIMED, f'{job_id}@{node}.lease')
+
+    def heartbeat(self, node, job_ids):
+        """续约这些任务，返回已经被回收（租约不在了）的任务id"""
+        lost = []
+        for job_id in job_ids:
+            try:
+                os.utime(self._lease_path(job_id, node))
+            except OSError:
+                lost.append(job_id)
+        return lost
+
+    def _release(self, job_id, node):
+        _remove(self._path(CLAIMED, f'{job_id}@{node}.json'))
+        _remove(self._lease_path(job_id, node))
+
+    def finish(self, job, node, success, **fields):
+        """写回结果并释放任务"""
+        record = dict(job, success=success, node=node, finished=time.time(), **fields)
+        _write_json(self._path(DONE if success else FAILED, f'{job["id"]}.json'), record)
+        self._release(job['id'], node)
+        # 任务曾因租约超时被回收、重新排队时，不必再转换一次
+        _remove(self._path(PENDING, f'{job["id"]}.json'))
+
+    def requeue(self, job, node):
+        """把领取了但没有转换的任务放回等待队列（节点退出时）"""
+        try:
+            os.rename(self._path(CLAIMED, f'{job["id"]}@{node}.json'),
+                      self._path(PENDING, f'{job["id"]}.json'))
+        except OSError:
+            pass
+        _remove(self._lease_path(job['id'], node))
+
+    def _fs_now(self):
+        """共享目录所在文件系统的当前时间"""
+        path = os.path.join(self.root, '.clock')
+        try:
+            with open(path, 'a'):
+                pass
+            os.utime(path)
+            return os.stat(path).st_mtime
+        except OSError:
+            return time.time()
+
+    def reclaim(self, node=None):
+        """回收租约超时的任务（跳过 node 自己的），返回 (重新排队的任务id, 记为失败的任务id)"""
+        now = self._fs_now()
+        requeued, failed = [], []
+        for name in os.listdir(self._dir(CLAIMED)):
+            if not name.endswith('.json'):
+                continue
+            job_id, _, owner = name[:-len('.json')].partition('@')
+            if owner == node:
+                continue
+            path = self._path(CLAIMED, name)
+            lease = self._lease_path(job_id, owner)
+            try:
+                heartbeat = os.stat(lease).st_mtime
+            except OSError:
+                try:
+                    heartbeat = os.stat(path).st_mtime
+                except OSError:
+                    continue
+            if now - heartbeat <= self.lease_timeout:
+                continue
+            # 重命名是原子的，多个节点同时回收时只有一个成功
+            temp_path = self._path(PENDING, f'{job_id}.json.{uuid.uuid4().hex[:8]}.tmp')
+            try:
+                os.rename(path, temp_path)
+            except OSError:
+                continue
+            _remove(lease)
+            job = _read_json(temp_path)
+            if job is None:
+                _remove(temp_path)
+                continue
+            job['attempts'] = job.get('attempts', 0) + 1
+            job.setdefault('lost', []).append(owner)
+            if job['attempts'] >= self.max_attempts:
+                _write_json(self._path(FAILED, f'{job_id}.json'),
+                            dict(job, success=False, finished=time.time(),
+                                 error=f'转换节点 {job["attempts"]} 次失联（租约超时）'))
+                _remove(temp_path)
+                failed.append(job_id)
+            else:
+                _write_json(self._path(PENDING, f'{job_id}.json'), job)
+                _remove(temp_path)
+                requeued.append(job_id)
+        return requeued, failed
+
+
+class SpoolWorker:
+    """转换节点：从共享目录领取任务交给本机的批量引擎，结果写回共享目录
+
+    每次领取的任务数不超过引擎当前的工作进程数，其余任务留给其他节点。
+    idle_exit 为共享目录中没有任务（等待和执行中的都没有）多少秒后退出，None 表示一直运行；
+    on_result(job, success, error) 在每个任务写回结果后调用。
+    """
+
+    def __init__(self, spool, engine, node=None, heartbeat=DEFAULT_HEARTBEAT,
+                 poll_interval=DEFAULT_POLL_INTERVAL, idle_exit=None, on_result=None, **options):
+        self.spool = spool
+        self.engine = engine
+        self.node = node or default_node_id()
+        self.heartbeat_interval = heartbeat
+        self.poll_interval = poll_interval
+        self.idle_exit = idle_exit
+        self.on_result = on_result
+        self.options = options  # 本节点的转换设置（例如缓存），任务中的设置优先
+        self._inflight = {}     # 任务id -> 任务记录
+        self._finished = []
+        self._finished_lock = threading.Lock()
+        self._created_dirs = set()
+        self._stopped = threading.Event()
+        self.stats = {'claimed': 0, 'succeeded': 0, 'failed': 0, 'requeued': 0, 'reclaimed': 0,
+                      'lost': 0}
+
+    def _submit(self, job):
+        input_path = self.spool.resolve(job['input'])
+        output_path = self.spool.resolve(job['output'])
+        directory = os.path.dirname(output_path)
+        if directory and directory not in self._created_dirs:
+            os.makedirs(directory, exist_ok=True)
+            self._created_dirs.add(directory)
+        options = dict(self.options, **job.get('options', {}))
+        self._inflight[job['id']] = job
+        self.engine.submit(input_path, output_path, job.get('kind'),
+                           callback=lambda result, job_id=job['id']: self._job_finished(job_id, result),
+                           **options)
+
+    def _job_finished(self, job_id, result):
+        """在引擎收集线程中调用，结果交给节点主循环统一写回"""
+        with self._finished_lock:
+            self._finished.append((job_id, result))
+
+    def _record_finished(self):
+        with self._finished_lock:
+            finished, self._finished = self._finished, []
+        for job_id, result in finished:
+            job = self._inflight.pop(job_id, None)
+            if job is None:
+                continue
+            if result.cancelled:
+                self.spool.requeue(job, self.node)
+                self.stats['requeued'] += 1
+                continue
+            self.spool.finish(job, self.node, result.success, error=result.error,
+                              duration=result.duration, stats=result.stats)
+            self.stats['succeeded' if result.success else 'failed'] += 1
+            if self.on_result is not None:
+                self.on_result(job, result.success, result.error)
+
+    def run(self):
+        """阻塞运行，直到 stop() 被调用或空闲超时"""
+        last_heartbeat = last_reclaim = time.monotonic()
+        idle_since = None
+        try:
+            while not self._stopped.is_set():
+                self._record_finished()
+                now = time.monotonic()
+                if now - last_reclaim >= self.spool.lease_timeout / 4:
+                    requeued, failed = self.spool.reclaim(self.node)
+                    self.stats['reclaimed'] += len(requeued) + len(failed)
+                    last_reclaim = now
+                if now - last_heartbeat >= self.heartbeat_interval:
+                    # 租约已被回收的任务由其他节点重新转换，本节点的结果仍会写回
+                    self.stats['lost'] += len(self.spool.heartbeat(self.node, list(self._inflight)))
+                    last_heartbeat = now
+                capacity = self.engine.max_workers - len(self._inflight)
+                for job in self.spool.claim(self.node, capacity):
+                    self.stats['claimed'] += 1
+                    self._submit(job)
+
+                if self._inflight:
+                    idle_since = None
+                elif self.idle_exit is not None:
+                    counts = self.spool.status()
+                    if counts[PENDING] or counts[CLAIMED]:
+                        idle_since = None
+                    elif idle_since is None:
+                        idle_since = now
+                    elif now - idle_since >= self.idle_exit:
+                        break
+                self._stopped.wait(self.poll_interval)
+        finally:
+            self._shutdown()
+
+    def _shutdown(self):
+        """退出时取消执行中的任务并放回等待队列，其他节点可以立即领取"""
+        if self._inflight:
+            self.engine.cancel_all()
+            deadline = time.monotonic() + 10
+            while self._inflight and time.monotonic() < deadline:
+                self._record_finished()
+                time.sleep(0.05)
+            for job in self._inflight.values():
+                self.spool.requeue(job, self.node)
+                self.stats['requeued'] += 1
+            self._inflight.clear()
+
+    def stop(self):
+        self._stopped.set()
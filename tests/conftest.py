@@ -0,0 +1,24 @@
+"""测试公共设置：模块都在仓库根目录下，直接按模块名导入"""
+import os
+import random
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def make_pdf(tmp_path):
+    """生成合成PDF（与基准测试的语料相同），返回路径"""
+    pytest.importorskip('fitz')
+    from benchmark import make_pdf as generate
+
+    def make(name='input.pdf', style='text', pages=3, seed=0):
+        path = str(tmp_path / name)
+        generate(path, style, pages, random.Random(seed))
+        return path
+
+    return make
@@ -0,0 +1,33 @@
+"""测试用的假渲染进程，遵守 render_pool 的单行JSON协议
+
+convert 把本进程的pid写入输出文件；输入文件名以 crash 开头时第一次直接退出（模拟崩溃），
+以 fail 开头时返回失败。
+"""
+import json
+import os
+import sys
+
+
+def main():
+    for line in sys.stdin:
+        request = json.loads(line)
+        if request['op'] == 'quit':
+            break
+        reply = {'ok': True}
+        if request['op'] == 'convert':
+            name = os.path.basename(request['input'])
+            marker = request['input'] + '.crashed'
+            if name.startswith('crash') and not os.path.exists(marker):
+                open(marker, 'w').close()
+                os._exit(3)
+            if name.startswith('fail'):
+                reply = {'ok': False, 'error': '无法渲染'}
+            else:
+                with open(request['output'], 'w') as f:
+                    f.write(str(os.getpid()))
+        sys.stdout.write(json.dumps(reply) + '\n')
+        sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main()
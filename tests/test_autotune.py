@@ -0,0 +1,41 @@
+import os
+
+import autotune
+from autotune import ConcurrencyController, PeakRss, cpu_count
+
+CHUNK = 128 * 1024 * 1024
+
+
+def test_peak_rss_is_per_measurement():
+    outer = PeakRss().start()
+    first = PeakRss().start()
+    data = b'\x01' * CHUNK
+    del data
+    first_peak = first.stop()
+
+    second_peak = PeakRss().start().stop()
+
+    assert first_peak - second_peak > CHUNK // 2
+    # 内层测量重置峰值后，外层测量仍然记得之前的峰值
+    assert outer.stop() >= first_peak
+
+
+def test_default_max_workers_is_cpu_count():
+    assert ConcurrencyController().max_workers == cpu_count()
+
+
+def test_growth_reverted_when_pages_per_second_drop(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(autotune.time, 'monotonic', lambda: clock[0])
+    monkeypatch.setattr(autotune, 'memory_info', lambda: (16 << 30, 8 << 30))
+    controller = ConcurrencyController(max_workers=4, initial=1)
+    pids = [os.getpid()]
+
+    # 完成的文件数相同，但增加进程后每秒完成的页数下降
+    for pages, expected in ((100, 2), (40, 1)):
+        controller.record_pages(pages)
+        controller.record_completion()
+        clock[0] += controller.interval
+        assert controller.decide(pids, busy=controller.target, queued=5) == expected
+
+    assert controller.decisions[-1]['reason'] == 'throughput-regressed'
@@ -0,0 +1,163 @@
+import os
+import threading
+
+import pytest
+
+pytest.importorskip('pdf2docx')
+
+from batch_engine import BatchEngine, ConversionJob, shared_engine
+from job_watchdog import JobWatchdog, Quarantine
+from scheduler import LARGEST_FIRST
+
+
+@pytest.fixture
+def engine():
+    engine = BatchEngine(max_workers=2)
+    yield engine
+    engine.shutdown()
+
+
+def test_batch_converts_all_files(engine, make_pdf, tmp_path):
+    jobs = [(make_pdf(f'in{i}.pdf', pages=2, seed=i), str(tmp_path / f'out{i}.docx'), 'pdf2word')
+            for i in range(4)]
+
+    results = list(engine.map(jobs))
+
+    assert sorted(result.success for result in results) == [True] * 4
+    assert all(os.path.getsize(output) > 0 for _, output, _ in jobs)
+
+
+def test_cancel_running_job_replaces_worker(engine, make_pdf, tmp_path):
+    started = threading.Event()
+    results = []
+    job = engine.submit(make_pdf('long.pdf', pages=40), str(tmp_path / 'long.docx'),
+                        progress=lambda job, event: started.set(), callback=results.append)
+    assert started.wait(60)
+
+    engine.cancel([job.job_id])
+    follow_up = list(engine.map([(make_pdf('short.pdf'), str(tmp_path / 'short.docx'), 'pdf2word')]))
+
+    assert results[0].cancelled
+    assert follow_up[0].success
+
+
+def test_shared_engine_schedules_largest_first():
+    assert shared_engine()._scheduler.policy == LARGEST_FIRST
+
+
+def test_watchdog_quarantines_repeatedly_hung_file(make_pdf, tmp_path):
+    quarantine = Quarantine(str(tmp_path / 'quarantine.json'))
+    watchdog = JobWatchdog(time_limit=0.3, retries=1, quarantine=quarantine, interval=0.05)
+    engine = BatchEngine(max_workers=1, watchdog=watchdog)
+    try:
+        source = make_pdf('slow.pdf', pages=60)
+        first = list(engine.map([(source, str(tmp_path / 'slow.docx'), 'pdf2word')]))[0]
+        again = list(engine.map([(source, str(tmp_path / 'again.docx'), 'pdf2word')]))[0]
+    finally:
+        engine.shutdown()
+
+    assert not first.success and '已隔离' in first.error
+    assert watchdog.stats['timeouts'] == 2 and watchdog.stats['retries'] == 1
+    assert Quarantine(quarantine.path).lookup(source) is not None
+    assert not again.success and '文件已被隔离' in again.error
+
+
+def test_late_done_from_replaced_worker_is_dropped():
+    class FakeWorker:
+        job = None
+        retiring = False
+
+    engine = BatchEngine(max_workers=1)
+    job = ConversionJob(1, 'a.pdf', 'a.docx', 'pdf2word')
+    killed, current = FakeWorker(), FakeWorker()
+    killed.job = current.job = job
+    engine._jobs[job.job_id] = job
+    engine._workers.append(current)
+
+    with engine._lock:
+        assert engine._job_done(killed, job.job_id, True, None, 1.0, {}, []) is None
+        assert job.job_id in engine._jobs
+        result = engine._job_done(current, job.job_id, True, None, 1.0, {}, [])
+
+    assert result.success and current.job is None and not engine._jobs
+
+
+def test_autotune_counts_pages_from_progress():
+    from autotune import ConcurrencyController
+    from progress import ProgressEvent
+    controller = ConcurrencyController()
+    engine = BatchEngine(autotune=controller)
+    job = ConversionJob(1, 'a.pdf', 'a.docx', 'pdf2word')
+    engine._jobs[job.job_id] = job
+
+    for phase, done in (('parse', 3), ('parse', 10), ('make', 4), ('parse', 2), ('parse', 5)):
+        engine._notify_progress(job.job_id, ProgressEvent(phase, done, 10, 0))
+
+    # 重试后页数从头计起
+    assert controller._window_pages == 15
+
+
+class _IdleWorker:
+    def __init__(self, job=None):
+        self.job = job
+        self.retiring = False
+        self.tasks = []
+        self.task_queue = self
+
+    def put(self, task):
+        self.tasks.append(task)
+
+
+def _dispatched_page_workers(monkeypatch, pool_size, running, queued):
+    import batch_engine
+    monkeypatch.setattr(batch_engine, 'cpu_count', lambda: 8)
+    engine = BatchEngine(max_workers=pool_size)
+    busy = ConversionJob(0, 'busy.pdf', 'busy.docx', 'pdf2word')
+    engine._workers = [_IdleWorker(busy if i < running else None) for i in range(pool_size)]
+    for job_id in range(1, queued + 1):
+        engine._scheduler.push(ConversionJob(job_id, f'{job_id}.pdf', f'{job_id}.docx', 'pdf2word'), 0)
+    engine._dispatch()
+    return [task[4].get('workers') for worker in engine._workers for task in worker.tasks]
+
+
+def test_lone_job_in_full_size_engine_gets_all_cpus(monkeypatch):
+    assert _dispatched_page_workers(monkeypatch, pool_size=8, running=0, queued=1) == [8]
+
+
+def test_page_workers_shrink_with_busy_and_queued_jobs(monkeypatch):
+    assert _dispatched_page_workers(monkeypatch, pool_size=8, running=2, queued=2) == [2, 2]
+
+
+def _group_members(pgid):
+    members = []
+    for name in os.listdir('/proc'):
+        try:
+            with open(f'/proc/{name}/stat', 'rb') as f:
+                fields = f.read().rsplit(b')', 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        if int(fields[2]) == pgid and fields[0] != b'Z':
+            members.append(int(name))
+    return members
+
+
+@pytest.mark.skipif(not os.path.isdir('/proc'), reason='需要 /proc')
+def test_killing_a_job_also_kills_page_parallel_children(engine, make_pdf, tmp_path):
+    import time
+    from autotune import process_group_rss, process_rss
+    job = engine.submit(make_pdf('big.pdf', pages=60), str(tmp_path / 'big.docx'),
+                        parallel=True, workers=2)
+    worker = engine._workers[0] if engine._workers[0].job is job else engine._workers[1]
+    pid = worker.process.pid
+    deadline = time.monotonic() + 60
+    while len(_group_members(pid)) < 3 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert len(_group_members(pid)) >= 3
+    assert process_group_rss(pid) > process_rss(pid)
+
+    engine.cancel([job.job_id])
+    deadline = time.monotonic() + 5
+    while _group_members(pid) and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    assert _group_members(pid) == []
@@ -0,0 +1,53 @@
+import os
+
+from batch_journal import BatchJournal
+
+
+def _file(path, content):
+    with open(path, 'w') as f:
+        f.write(content)
+    return str(path)
+
+
+def _jobs(tmp_path, count):
+    return [(_file(tmp_path / f'in{i}.pdf', f'input {i}'), str(tmp_path / f'out{i}.docx'), 'pdf2word')
+            for i in range(count)]
+
+
+def test_resume_skips_only_verified_done_jobs(tmp_path):
+    jobs = _jobs(tmp_path, 5)
+    journal = BatchJournal(jobs, root=str(tmp_path / 'journals'))
+    journal.open()
+    for input_path, output_path, _ in jobs[:4]:
+        _file(output_path, 'output')
+        journal.record('done', input_path, output_path)
+    journal.record('failed', jobs[4][0], jobs[4][1], error='boom')
+    # 崩溃：日志未正常关闭，最后一行只写了一半
+    journal.close()
+    with open(journal.path, 'a') as f:
+        f.write('{"event": "do')
+
+    _file(jobs[1][0], 'input changed')          # 输入改动
+    _file(jobs[2][1], 'OUTPUT')                 # 输出被改写（大小不变）
+    os.remove(jobs[3][1])                       # 输出被删除
+
+    pending, skipped = BatchJournal(jobs, root=str(tmp_path / 'journals')).resume()
+
+    assert skipped == jobs[:1]
+    assert pending == jobs[1:]
+
+
+def test_complete_batch_removes_journal(tmp_path):
+    jobs = _jobs(tmp_path, 1)
+    journal = BatchJournal(jobs, root=str(tmp_path / 'journals'))
+    journal.open()
+    journal.record('done', jobs[0][0], _file(jobs[0][1], 'output'))
+    journal.close(complete=True)
+
+    assert not os.path.exists(journal.path)
+    assert BatchJournal(jobs, root=str(tmp_path / 'journals')).resume() == (jobs, [])
+
+
+def test_batch_identity_ignores_job_order(tmp_path):
+    jobs = _jobs(tmp_path, 3)
+    assert BatchJournal(jobs).path == BatchJournal(jobs[::-1]).path
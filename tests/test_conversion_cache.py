@@ -0,0 +1,77 @@
+import os
+import time
+
+import pytest
+
+from conversion_cache import ConversionCache
+
+
+def _file(path, content):
+    with open(path, 'wb') as f:
+        f.write(content)
+    return str(path)
+
+
+def test_store_fetch_and_lru_eviction(tmp_path):
+    cache = ConversionCache(str(tmp_path / 'cache'), max_bytes=250)
+    keys = []
+    for name in 'abc':
+        source = _file(tmp_path / f'{name}.pdf', name.encode())
+        key = cache.make_key(source, 'pdf2word')
+        cache.store(key, _file(tmp_path / f'{name}.docx', name.encode() * 100))
+        keys.append(key)
+        time.sleep(0.01)
+
+    assert cache.fetch(keys[2], str(tmp_path / 'hit.docx'))
+    assert not cache.fetch(keys[0], str(tmp_path / 'miss.docx'))
+    with open(tmp_path / 'hit.docx', 'rb') as f:
+        assert f.read() == b'c' * 100
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'evictions': 1, 'entries': 2, 'bytes': 200}
+
+
+def test_key_depends_on_content_and_options(tmp_path):
+    cache = ConversionCache(str(tmp_path / 'cache'))
+    first = _file(tmp_path / 'first.pdf', b'same')
+    second = _file(tmp_path / 'second.pdf', b'same')
+
+    assert cache.make_key(first, 'pdf2word') == cache.make_key(second, 'pdf2word')
+    assert cache.make_key(first, 'pdf2word') != cache.make_key(first, 'pdf2word', {'mode': 'fast'})
+
+
+def test_convert_reuses_cached_output(make_pdf, tmp_path):
+    pytest.importorskip('pdf2docx')
+    from converter_core import convert
+    cache = ConversionCache(str(tmp_path / 'cache'))
+    source = make_pdf()
+    first, second = str(tmp_path / 'first.docx'), str(tmp_path / 'second.docx')
+
+    convert(source, first, cache=cache)
+    convert(source, second, cache=cache)
+
+    assert cache.stats()['misses'] == 1 and cache.stats()['hits'] == 1
+    with open(first, 'rb') as a, open(second, 'rb') as b:
+        assert a.read() == b.read()
+    assert os.path.getsize(second) > 0
+
+
+@pytest.mark.skipif(os.name != 'posix', reason='用shell脚本模拟soffice')
+def test_libreoffice_version_is_part_of_the_backend_version(tmp_path, monkeypatch):
+    import conversion_cache
+
+    soffice = tmp_path / 'soffice'
+
+    def install(version):
+        soffice.write_text(f'#!/bin/sh\necho "LibreOffice {version}"\n')
+        soffice.chmod(0o755)
+        stat = soffice.stat()
+        # 升级后修改时间一定不同
+        os.utime(soffice, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    monkeypatch.setenv('PATH', str(tmp_path))
+    monkeypatch.setenv('PDF_WORD_RENDERER', 'libreoffice')
+    install('7.5.9.2')
+    old = conversion_cache.backend_version('word2pdf')
+    install('7.6.4.1')
+
+    assert old == 'LibreOffice 7.5.9.2'
+    assert conversion_cache.backend_version('word2pdf') == 'LibreOffice 7.6.4.1'
@@ -0,0 +1,69 @@
+import io
+
+import pytest
+
+pytest.importorskip('pdf2docx')
+
+from benchmark import WORDS
+from converter_core import convert, convert_bytes, convert_stream
+
+
+def _docx_words(data):
+    from docx import Document
+    document = Document(io.BytesIO(data))
+    paragraphs = list(document.paragraphs)
+    for table in document.tables:
+        paragraphs.extend(p for cell in table._cells for p in cell.paragraphs)
+    return {word for paragraph in paragraphs for word in paragraph.text.split()}
+
+
+def test_convert_bytes_round_trip(make_pdf):
+    with open(make_pdf(pages=2), 'rb') as f:
+        pdf = f.read()
+
+    docx = convert_bytes(pdf, 'pdf2word')
+
+    assert docx.startswith(b'PK')
+    assert _docx_words(docx) & set(WORDS)
+
+
+@pytest.mark.parametrize('memory_budget', [None, 512 * 1024 * 1024])
+def test_convert_stream_from_bytesio(make_pdf, memory_budget):
+    with open(make_pdf(pages=2), 'rb') as f:
+        source = io.BytesIO(f.read())
+    target = io.BytesIO()
+
+    convert_stream(source, target, 'pdf2word', memory_budget=memory_budget)
+
+    assert _docx_words(target.getvalue()) & set(WORDS)
+
+
+@pytest.mark.parametrize('style, mode, used', [
+    ('text', None, 'full'),
+    ('text', 'full', 'full'),
+    ('table', 'fast', 'fast'),
+    ('text', 'auto', 'fast'),
+    ('table', 'auto', 'full'),
+])
+def test_convert_modes(make_pdf, tmp_path, style, mode, used):
+    output = str(tmp_path / 'output.docx')
+    events = []
+
+    convert(make_pdf(style=style), output, progress=events.append, mode=mode, parallel=False)
+
+    assert events[-1].stats['mode'] == used
+    with open(output, 'rb') as f:
+        assert _docx_words(f.read()) & set(WORDS)
+
+
+def test_fast_mode_drops_table_structure(make_pdf, tmp_path):
+    from docx import Document
+    source = make_pdf(style='table')
+    tables = {}
+    for mode in ('full', 'fast'):
+        output = str(tmp_path / f'{mode}.docx')
+        convert(source, output, mode=mode, parallel=False)
+        tables[mode] = len(Document(output).tables)
+
+    assert tables['full'] > 0
+    assert tables['fast'] == 0
@@ -0,0 +1,232 @@
+import asyncio
+import contextlib
+import json
+import os
+import types
+
+import pytest
+
+from http_service import ConversionService
+
+
+class _FakeEngine:
+    """只记录提交的任务，由测试决定何时完成"""
+
+    def __init__(self):
+        self.jobs = []
+
+    def submit(self, input_path, output_path, kind=None, callback=None, progress=None, **options):
+        job = types.SimpleNamespace(job_id=len(self.jobs) + 1, input_path=input_path,
+                                    output_path=output_path, callback=callback, progress=progress)
+        self.jobs.append(job)
+        return job
+
+    def cancel(self, job_ids):
+        for job in self.jobs:
+            if job.job_id in job_ids:
+                job.callback(types.SimpleNamespace(cancelled=True, success=False, error=None, duration=0.1))
+
+    def finish(self, job):
+        with open(job.output_path, 'wb') as f:
+            f.write(b'docx')
+        job.callback(types.SimpleNamespace(cancelled=False, success=True, error=None, duration=0.5))
+
+    def scaling_metrics(self):
+        return {}
+
+
+@contextlib.asynccontextmanager
+async def _serving(tmp_path, engine=None, host='127.0.0.1', **options):
+    service = ConversionService(engine=engine or _FakeEngine(), spool_dir=str(tmp_path / 'spool'), **options)
+    server = await service.start(host, 0)
+    try:
+        yield service, server.sockets[0].getsockname()[1]
+    finally:
+        server.close()
+        service.close()
+
+
+def _head(method, path, headers):
+    lines = [f'{method} {path} HTTP/1.1'] + [f'{name}: {value}' for name, value in headers.items()]
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+
+def _parse(response):
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split(b' ', 2)[1]), body
+
+
+async def _http(port, method, path, body=b'', headers=None):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(_head(method, path, dict({'Content-Length': len(body)}, **(headers or {}))) + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return _parse(response)
+
+
+@pytest.mark.parametrize('content_type, length', [
+    ('application/pdf', 'abc'),
+    ('application/pdf', '-1'),
+    ('application/json', '1e3'),
+])
+def test_invalid_content_length_is_bad_request(tmp_path, content_type, length):
+    async def run():
+        async with _serving(tmp_path) as (_, port):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(_head('POST', '/jobs?filename=a.pdf',
+                               {'Content-Type': content_type, 'Content-Length': length}))
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+        return _parse(response)
+
+    status, body = asyncio.run(run())
+
+    assert status == 400
+    assert 'Content-Length' in json.loads(body)['error']
+
+
+def test_concurrent_submissions_cannot_exceed_max_pending(tmp_path):
+    source = tmp_path / 'a.pdf'
+    source.write_bytes(b'%PDF-1.4 test')
+    body = json.dumps({'path': str(source)}).encode()
+
+    async def run():
+        async with _serving(tmp_path, max_pending=1) as (_, port):
+            # 两个提交都只发出请求头，服务端读取请求体之前就要占用名额
+            connections = []
+            for _ in range(2):
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                writer.write(_head('POST', '/jobs', {'Content-Type': 'application/json',
+                                                     'Content-Length': len(body)}))
+                await writer.drain()
+                connections.append((reader, writer))
+            reads = {asyncio.ensure_future(reader.read()): writer for reader, writer in connections}
+            done, waiting = await asyncio.wait(reads, timeout=5, return_when=asyncio.FIRST_COMPLETED)
+            rejected = [_parse(task.result())[0] for task in done]
+            for task in waiting:
+                reads[task].write(body)
+            accepted = [_parse(await task)[0] for task in waiting]
+            for writer in reads.values():
+                writer.close()
+        return rejected, accepted
+
+    assert asyncio.run(run()) == ([429], [202])
+
+
+def test_close_cancels_the_expire_task(tmp_path):
+    async def run():
+        async with _serving(tmp_path) as (service, _):
+            task = service._expire_task
+        await asyncio.sleep(0)
+        return task
+
+    assert asyncio.run(run()).cancelled()
+
+
+@pytest.mark.parametrize('host, output_root, output, expected', [
+    ('127.0.0.1', None, 'out/a.docx', 202),
+    ('0.0.0.0', None, 'out/a.docx', 403),
+    ('0.0.0.0', 'allowed', 'sub/a.docx', 202),
+    ('0.0.0.0', 'allowed', '../a.docx', 403),
+    ('127.0.0.1', 'allowed', '/etc/a.docx', 403),
+])
+def test_output_path_is_restricted(tmp_path, host, output_root, output, expected):
+    source = tmp_path / 'a.pdf'
+    source.write_bytes(b'%PDF-1.4 test')
+    engine = _FakeEngine()
+    root = str(tmp_path / output_root) if output_root else None
+    body = json.dumps({'path': str(source), 'output': output}).encode()
+
+    async def run():
+        async with _serving(tmp_path, engine, host=host, output_root=root) as (_, port):
+            return await _http(port, 'POST', '/jobs', body, {'Content-Type': 'application/json'})
+
+    status, _ = asyncio.run(run())
+
+    assert status == expected
+    if expected == 202 and root:
+        assert engine.jobs[0].output_path == str(tmp_path / 'allowed' / 'sub' / 'a.docx')
+
+
+def _events(body):
+    """把SSE响应体解析为 [(事件名, 数据)]"""
+    events = []
+    for block in body.decode().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+        if fields:
+            events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+def test_upload_status_events_result_and_delete(tmp_path):
+    engine = _FakeEngine()
+
+    async def run():
+        async with _serving(tmp_path, engine) as (service, port):
+            status, body = await _http(port, 'POST', '/jobs?filename=report.pdf', b'%PDF-1.4 test')
+            assert status == 202
+            job = json.loads(body)
+            assert job['state'] == 'queued' and job['filename'] == 'report.pdf'
+            with open(engine.jobs[0].input_path, 'rb') as f:
+                assert f.read() == b'%PDF-1.4 test'
+
+            assert (await _http(port, 'GET', f'/jobs/{job["id"]}/result'))[0] == 409
+
+            events = asyncio.ensure_future(_http(port, 'GET', f'/jobs/{job["id"]}/events'))
+            await asyncio.sleep(0.1)
+            event = types.SimpleNamespace(phase='parse', done=1, total=2, percent=50, rate=1.0, eta=1)
+            engine.jobs[0].progress(None, event)
+            await asyncio.sleep(0.1)
+            engine.finish(engine.jobs[0])
+            status, body = await events
+            assert status == 200
+            assert [name for name, _ in _events(body)] == ['progress', 'progress', 'done']
+            assert _events(body)[1][1]['percent'] == 50
+
+            status, body = await _http(port, 'GET', f'/jobs/{job["id"]}')
+            assert status == 200 and json.loads(body)['state'] == 'done'
+            assert await _http(port, 'GET', f'/jobs/{job["id"]}/result') == (200, b'docx')
+
+            job_dir = service.jobs[job['id']].job_dir
+            assert os.path.isdir(job_dir)
+            assert (await _http(port, 'DELETE', f'/jobs/{job["id"]}'))[0] == 200
+            assert not os.path.exists(job_dir)
+            assert (await _http(port, 'GET', f'/jobs/{job["id"]}'))[0] == 404
+
+    asyncio.run(run())
+
+
+def test_delete_cancels_an_unfinished_job(tmp_path):
+    engine = _FakeEngine()
+
+    async def run():
+        async with _serving(tmp_path, engine) as (_, port):
+            _, body = await _http(port, 'POST', '/jobs?filename=a.pdf', b'%PDF-1.4 test')
+            job_id = json.loads(body)['id']
+            assert (await _http(port, 'DELETE', f'/jobs/{job_id}'))[0] == 202
+            await asyncio.sleep(0.1)
+            status, body = await _http(port, 'GET', f'/jobs/{job_id}')
+            return json.loads(body)['state']
+
+    assert asyncio.run(run()) == 'cancelled'
+
+
+def test_full_queue_returns_429_until_a_job_finishes(tmp_path):
+    engine = _FakeEngine()
+
+    async def run():
+        async with _serving(tmp_path, engine, max_pending=1) as (_, port):
+            assert (await _http(port, 'POST', '/jobs?filename=a.pdf', b'%PDF'))[0] == 202
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(_head('POST', '/jobs?filename=b.pdf', {'Content-Length': 4}) + b'%PDF')
+            head = (await reader.read()).partition(b'\r\n\r\n')[0]
+            writer.close()
+            assert head.startswith(b'HTTP/1.1 429') and b'Retry-After: 5' in head
+
+            engine.finish(engine.jobs[0])
+            await asyncio.sleep(0.1)
+            assert (await _http(port, 'POST', '/jobs?filename=b.pdf', b'%PDF'))[0] == 202
+
+    asyncio.run(run())
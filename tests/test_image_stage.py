@@ -0,0 +1,39 @@
+import zipfile
+
+import pytest
+
+pytest.importorskip('pdf2docx')
+
+from pdf_pipeline import convert_pdf
+from progress import ProgressTracker
+
+
+def _media_bytes(path):
+    with zipfile.ZipFile(path) as docx:
+        return sum(info.file_size for info in docx.infolist() if info.filename.startswith('word/media/'))
+
+
+def _convert(source, output, **options):
+    tracker = ProgressTracker()
+    convert_pdf(source, output, tracker, **options)
+    return tracker.stats
+
+
+def test_no_savings_reported_without_caps(make_pdf, tmp_path):
+    stats = _convert(make_pdf(style='image', pages=2), str(tmp_path / 'out.docx'))
+
+    assert stats['images'] == 6
+    assert stats['image_bytes_saved'] == 0
+
+
+def test_savings_match_resized_images(make_pdf, tmp_path):
+    source = make_pdf(style='image', pages=2)
+    plain = str(tmp_path / 'plain.docx')
+    small = str(tmp_path / 'small.docx')
+    _convert(source, plain)
+
+    stats = _convert(source, small, max_image_dpi=20)
+
+    assert stats['images_resized'] == stats['unique_images'] == 6
+    assert stats['image_bytes_saved'] == stats['image_bytes_in'] - stats['image_bytes_out'] > 0
+    assert _media_bytes(plain) - _media_bytes(small) == stats['image_bytes_saved']
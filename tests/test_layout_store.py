@@ -0,0 +1,79 @@
+import os
+import time
+
+import pytest
+
+import layout_store
+from layout_store import LayoutStore
+
+
+def _write(path, size, age=0):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+
+
+def test_evict_skips_temp_files_being_written(tmp_path):
+    store = LayoutStore(str(tmp_path), max_bytes=100)
+    old = str(tmp_path / 'ab' / 'old.json.gz')
+    new = str(tmp_path / 'ab' / 'new.json.gz')
+    writing = str(tmp_path / 'ab' / 'tmp123.tmp')
+    abandoned = str(tmp_path / 'cd' / 'tmp456.tmp')
+    _write(old, 80, age=100)
+    _write(new, 80, age=10)
+    _write(writing, 80, age=500)
+    _write(abandoned, 80, age=layout_store.TEMP_FILE_GRACE + 10)
+
+    store.evict()
+
+    assert [os.path.exists(path) for path in (old, new, writing, abandoned)] == [False, True, True, False]
+
+
+def test_save_evicts_at_most_once_per_interval(tmp_path, monkeypatch):
+    store = LayoutStore(str(tmp_path))
+    calls = []
+    monkeypatch.setattr(store, 'evict', lambda: calls.append(1))
+
+    for page_id in range(3):
+        store.save({page_id: f'{page_id:064x}'}, [{'id': page_id}])
+
+    assert len(calls) == 1
+
+
+def test_unchanged_pdf_reuses_every_page(make_pdf, tmp_path):
+    pytest.importorskip('pdf2docx')
+    from pdf_pipeline import convert_pdf
+    from progress import ProgressTracker
+    source = make_pdf(pages=4)
+    store = LayoutStore(str(tmp_path / 'layouts'))
+    first, second = ProgressTracker(), ProgressTracker()
+
+    convert_pdf(source, str(tmp_path / 'first.docx'), first, layouts=store)
+    convert_pdf(source, str(tmp_path / 'second.docx'), second, layouts=store)
+
+    assert (first.stats['layout_pages_reused'], first.stats['layout_pages_parsed']) == (0, 4)
+    assert (second.stats['layout_pages_reused'], second.stats['layout_pages_parsed']) == (4, 0)
+
+
+def test_revision_reparses_only_changed_and_inserted_pages(make_pdf, tmp_path):
+    pytest.importorskip('pdf2docx')
+    import fitz
+    from pdf_pipeline import convert_pdf
+    from progress import ProgressTracker
+    source = make_pdf(pages=5)
+    store = LayoutStore(str(tmp_path / 'layouts'))
+    convert_pdf(source, str(tmp_path / 'first.docx'), layouts=store)
+
+    revised = str(tmp_path / 'revised.pdf')
+    with fitz.open(source) as doc:
+        doc[3].insert_text((60, 50), 'revised page', fontsize=9)
+        doc.new_page(0).insert_text((60, 60), 'new cover page', fontsize=12)
+        doc.save(revised)
+    tracker = ProgressTracker()
+
+    convert_pdf(revised, str(tmp_path / 'revised.docx'), tracker, layouts=store)
+
+    assert tracker.stats['layout_pages_reused'] == 4
+    assert tracker.stats['layout_pages_parsed'] == 2
@@ -0,0 +1,42 @@
+import os
+
+import pytest
+
+pytest.importorskip('pdf2docx')
+
+from batch_engine import ConversionJob
+from layout_store import LayoutStore
+from page_parallel import convert_parallel
+from progress import ProgressTracker
+
+
+def test_engine_gives_page_workers_only_when_caller_did_not():
+    job = ConversionJob(1, 'a.pdf', 'a.docx', 'pdf2word')
+    assert job.task(2)[4] == {'workers': 2}
+
+    job = ConversionJob(1, 'a.pdf', 'a.docx', 'pdf2word', {'workers': 8})
+    assert job.task(2)[4] == {'workers': 8}
+
+
+def test_revised_pdf_fingerprints_pages_once(make_pdf, tmp_path, monkeypatch):
+    import fitz
+    source = make_pdf(pages=50)
+    store = LayoutStore(str(tmp_path / 'layouts'))
+    convert_parallel(source, str(tmp_path / 'first.docx'), workers=2, layouts=store)
+
+    revised = str(tmp_path / 'revised.pdf')
+    with fitz.open(source) as doc:
+        doc[10].insert_text((60, 50), 'revised page', fontsize=9)
+        doc.save(revised)
+    calls = []
+    make_keys = store.make_keys
+    monkeypatch.setattr(store, 'make_keys', lambda *args: calls.append(args) or make_keys(*args))
+    tracker = ProgressTracker()
+
+    convert_parallel(revised, str(tmp_path / 'second.docx'), workers=2, layouts=store,
+                     tracker=tracker)
+
+    assert len(calls) == 1
+    assert tracker.stats['layout_pages_reused'] == 49
+    assert tracker.stats['layout_pages_parsed'] == 1
+    assert os.path.getsize(str(tmp_path / 'second.docx')) > 0
@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+pytest.importorskip('pdf2docx')
+
+from pdf_pipeline import convert_pdf
+from progress import ProgressTracker
+
+
+def test_windowed_mode_produces_docx(make_pdf, tmp_path):
+    source = make_pdf(pages=6)
+    output = str(tmp_path / 'output.docx')
+    tracker = ProgressTracker()
+
+    convert_pdf(source, output, tracker, memory_budget=512 * 1024 * 1024)
+
+    assert os.path.getsize(output) > 0
+    assert tracker.stats['memory_budget'] == 512 * 1024 * 1024
+
+
+def test_windowed_mode_extracts_fonts_once(make_pdf, tmp_path, monkeypatch):
+    from pdf2docx.font.Fonts import Fonts
+
+    calls = []
+    extract = Fonts.extract.__func__
+
+    def counting_extract(cls, fitz_doc):
+        calls.append(fitz_doc)
+        return extract(cls, fitz_doc)
+
+    monkeypatch.setattr(Fonts, 'extract', classmethod(counting_extract))
+    source = make_pdf(pages=6)
+    windowed = str(tmp_path / 'windowed.docx')
+    whole = str(tmp_path / 'whole.docx')
+
+    # 预算极小时每个窗口只有一页
+    convert_pdf(source, windowed, ProgressTracker(), memory_budget=1)
+    assert len(calls) == 1
+
+    convert_pdf(source, whole, ProgressTracker())
+    from docx import Document
+    assert [p.text for p in Document(windowed).paragraphs] == [p.text for p in Document(whole).paragraphs]
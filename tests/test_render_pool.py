@@ -0,0 +1,53 @@
+import os
+import sys
+
+import pytest
+
+from render_pool import RendererPool
+
+FAKE_RENDERER = [sys.executable, os.path.join(os.path.dirname(__file__), 'fake_renderer.py')]
+
+
+@pytest.fixture
+def convert(tmp_path):
+    pools = []
+
+    def convert(name, **options):
+        if not pools:
+            pools.append(RendererPool(command=FAKE_RENDERER, **options))
+        source = tmp_path / name
+        source.write_bytes(b'docx')
+        output = str(tmp_path / (name + '.pdf'))
+        pools[0].convert(str(source), output)
+        with open(output) as f:
+            return int(f.read()), pools[0]
+
+    yield convert
+    for pool in pools:
+        pool.close()
+
+
+def test_renderer_is_reused_until_recycled(convert):
+    results = [convert(f'doc{i}.docx', max_jobs=3) for i in range(5)]
+    pids = [pid for pid, _ in results]
+
+    assert len(set(pids[:3])) == 1
+    assert pids[3] != pids[0] and pids[4] == pids[3]
+    assert results[-1][1].recycled == 1
+
+
+def test_crashed_renderer_is_replaced_and_job_retried(convert):
+    first, _ = convert('before.docx')
+    pid, pool = convert('crash.docx')
+
+    assert pid != first
+    assert pool.restarts == 1
+
+
+def test_render_failure_keeps_renderer(convert):
+    first, pool = convert('before.docx')
+    with pytest.raises(RuntimeError, match='无法渲染'):
+        convert('fail.docx')
+
+    assert convert('after.docx')[0] == first
+    assert pool.restarts == 0
@@ -0,0 +1,96 @@
+import os
+import time
+
+from spool import CLAIMED, DONE, FAILED, PENDING, Spool, SpoolWorker
+
+
+def _age(spool, job_id, node, seconds):
+    """把任务的租约改成 seconds 秒前续约的"""
+    past = spool._fs_now() - seconds
+    os.utime(spool._lease_path(job_id, node), (past, past))
+
+
+def test_each_job_is_claimed_by_one_node(tmp_path):
+    spool = Spool(str(tmp_path))
+    job_ids = [spool.submit(f'in{i}.pdf', f'out{i}.docx') for i in range(5)]
+
+    first = spool.claim('a', 3)
+    second = spool.claim('b', 10)
+
+    assert [job['id'] for job in first + second] == job_ids
+    assert spool.status() == {PENDING: 0, CLAIMED: 5, DONE: 0, FAILED: 0}
+
+
+def test_expired_lease_is_requeued_then_failed(tmp_path):
+    spool = Spool(str(tmp_path), lease_timeout=30, max_attempts=2)
+    job_id = spool.submit('in.pdf', 'out.docx')
+    spool.claim('a', 1)
+
+    _age(spool, job_id, 'a', 10)
+    assert spool.reclaim('b') == ([], [])
+    _age(spool, job_id, 'a', 60)
+    assert spool.reclaim('a') == ([], [])     # 不回收自己的任务
+    assert spool.reclaim('b') == ([job_id], [])
+    assert spool.heartbeat('a', [job_id]) == [job_id]
+
+    job = spool.claim('b', 1)[0]
+    assert (job['attempts'], job['lost']) == (1, ['a'])
+    _age(spool, job_id, 'b', 60)
+    assert spool.reclaim('c') == ([], [job_id])
+    assert not spool.result(job_id)['success']
+    assert spool.status()[CLAIMED] == 0
+
+
+def test_late_finish_from_lost_node_removes_requeued_copy(tmp_path):
+    spool = Spool(str(tmp_path), lease_timeout=30)
+    job_id = spool.submit('in.pdf', 'out.docx')
+    job = spool.claim('a', 1)[0]
+    _age(spool, job_id, 'a', 60)
+    spool.reclaim('b')
+
+    spool.finish(job, 'a', True)
+
+    assert spool.result(job_id)['node'] == 'a'
+    assert spool.status() == {PENDING: 0, CLAIMED: 0, DONE: 1, FAILED: 0}
+
+
+class _Result:
+    def __init__(self, success, error=None):
+        self.success = success
+        self.error = error
+        self.cancelled = False
+        self.duration = 0.1
+        self.stats = {}
+
+
+class _Engine:
+    """立即完成任务的假引擎：输入文件名含 bad 的任务失败"""
+
+    max_workers = 2
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, input_path, output_path, kind=None, callback=None, **options):
+        self.submitted.append((input_path, output_path, options))
+        callback(_Result('bad' not in input_path, '转换失败' if 'bad' in input_path else None))
+
+    def cancel_all(self):
+        pass
+
+
+def test_worker_converts_all_jobs_and_exits_when_idle(tmp_path):
+    spool = Spool(str(tmp_path / 'spool'))
+    job_ids = [spool.submit(name, f'out/{name}.docx', mode='fast') for name in ('a.pdf', 'bad.pdf', 'c.pdf')]
+    engine = _Engine()
+    worker = SpoolWorker(spool, engine, node='n1', poll_interval=0.01, idle_exit=0.05)
+
+    started = time.monotonic()
+    worker.run()
+
+    assert time.monotonic() - started < 5
+    assert [spool.result(job_id)['success'] for job_id in job_ids] == [True, False, True]
+    assert worker.stats['succeeded'] == 2 and worker.stats['failed'] == 1
+    assert os.path.isdir(tmp_path / 'spool' / 'out')
+    assert engine.submitted[0][0] == str(tmp_path / 'spool' / 'a.pdf')
+    assert engine.submitted[0][2] == {'mode': 'fast'}
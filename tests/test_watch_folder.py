@@ -0,0 +1,81 @@
+import os
+
+import watch_folder
+from watch_folder import FolderWatcher
+
+
+class _RecordingEngine:
+    """只记录提交的任务，不做转换"""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.submitted = []
+
+    def submit(self, input_path, output_path, kind=None, callback=None, **options):
+        if self.error is not None:
+            raise self.error
+        self.submitted.append(input_path)
+
+
+def _watcher(tmp_path, engine):
+    inbox = tmp_path / 'inbox'
+    inbox.mkdir(exist_ok=True)
+    return FolderWatcher(str(inbox), str(tmp_path / 'outbox'), engine, settle=0, polling=True)
+
+
+def _drop(watcher, name):
+    path = os.path.join(watcher.inbox, name)
+    with open(path, 'wb') as f:
+        f.write(b'%PDF-1.4 test')
+    return path
+
+
+def test_stable_file_is_submitted_once(tmp_path):
+    engine = _RecordingEngine()
+    watcher = _watcher(tmp_path, engine)
+    path = _drop(watcher, 'a.pdf')
+
+    watcher._scan(watcher.inbox)
+    watcher._submit_stable()
+    watcher._scan(watcher.inbox)
+    watcher._submit_stable()
+
+    assert engine.submitted == [path]
+    assert path in watcher._inflight
+    watcher.index.close()
+
+
+def test_file_removed_before_hashing_is_dropped(tmp_path, monkeypatch):
+    engine = _RecordingEngine()
+    watcher = _watcher(tmp_path, engine)
+    path = _drop(watcher, 'a.pdf')
+    watcher._scan(watcher.inbox)
+
+    digest = watch_folder.file_digest
+
+    def remove_then_hash(target):
+        os.remove(target)
+        return digest(target)
+
+    monkeypatch.setattr(watch_folder, 'file_digest', remove_then_hash)
+    watcher._submit_stable()
+
+    assert engine.submitted == []
+    assert watcher._candidates == {} and watcher._inflight == {}
+    watcher.index.close()
+
+
+def test_failed_submit_is_not_left_in_flight(tmp_path):
+    watcher = _watcher(tmp_path, _RecordingEngine(FileNotFoundError('gone')))
+    path = _drop(watcher, 'a.pdf')
+    watcher._scan(watcher.inbox)
+
+    watcher._submit_stable()
+    assert watcher._inflight == {}
+
+    # 文件重新出现后照常提交
+    watcher.engine = _RecordingEngine()
+    watcher._scan(watcher.inbox)
+    watcher._submit_stable()
+    assert watcher.engine.submitted == [path]
+    watcher.index.close()
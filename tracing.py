@@ -0,0 +1,162 @@
+"""分阶段计时与追踪导出
+
+用法:
+    with tracing.span('parse', page=3):
+        ...
+
+未启用时 span() 直接返回一个共享的空上下文，几乎没有开销。
+启用后（tracing.enable() 或环境变量 PDF_WORD_TRACE=1）每个阶段记录为一个事件，
+工作进程在任务结束时把事件随结果送回主进程汇总，
+可以导出为Chrome trace-event JSON（chrome://tracing 或 Perfetto 打开），也可以汇总成表格。
+"""
+import json
+import os
+import threading
+import time
+
+_enabled = bool(os.environ.get('PDF_WORD_TRACE'))
+_events = []
+_lock = threading.Lock()
+_context = threading.local()
+_instrumented = False
+
+# 转换后端内部值得单独计时的函数：(模块, 类, 方法, 阶段名)
+# 找不到的条目会被忽略，后端升级改名时不影响转换本身
+BACKEND_STAGES = (
+    ('pdf2docx.page.RawPageFitz', 'RawPageFitz', 'extract_raw_dict', 'extract-text'),
+    ('pdf2docx.image.ImagesExtractor', 'ImagesExtractor', 'extract_images', 'extract-images'),
+    ('pdf2docx.table.TablesConstructor', 'TablesConstructor', 'lattice_tables', 'detect-tables'),
+    ('pdf2docx.table.TablesConstructor', 'TablesConstructor', 'stream_tables', 'detect-tables'),
+)
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.ts = time.time_ns() // 1000
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        duration = (time.perf_counter_ns() - self.start) // 1000
+        _append(self.name, self.ts, duration, self.args)
+        return False
+
+
+def enable(flag=True):
+    global _enabled
+    _enabled = flag
+    if flag:
+        instrument_backend()
+
+
+def is_enabled():
+    return _enabled
+
+
+def set_context(**args):
+    """设置当前线程后续事件附带的参数（例如所属文件）"""
+    _context.args = args
+
+
+def span(name, **args):
+    """计时一个阶段；未启用时返回空上下文"""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def record(name, start, end, **args):
+    """记录一个由调用方自己计时的阶段（start/end 为 time.time() 秒数），例如排队等待"""
+    if _enabled:
+        _append(name, int(start * 1e6), int((end - start) * 1e6), args)
+
+
+def _append(name, ts, duration, args):
+    context = getattr(_context, 'args', None)
+    if context:
+        args = dict(context, **args)
+    event = {'name': name, 'ph': 'X', 'ts': ts, 'dur': duration,
+             'pid': os.getpid(), 'tid': threading.get_ident() % 100000, 'args': args}
+    with _lock:
+        _events.append(event)
+
+
+def collect():
+    """取出并清空本进程记录的事件"""
+    global _events
+    with _lock:
+        events, _events = _events, []
+    return events
+
+
+def add_events(events):
+    """并入其他进程送回的事件"""
+    with _lock:
+        _events.extend(events)
+
+
+def instrument_backend():
+    """给转换后端的内部步骤套上计时（只在启用追踪时调用一次）"""
+    global _instrumented
+    if _instrumented:
+        return
+    _instrumented = True
+    import importlib
+    for module_name, class_name, method_name, stage in BACKEND_STAGES:
+        try:
+            cls = getattr(importlib.import_module(module_name), class_name)
+            original = getattr(cls, method_name)
+        except (ImportError, AttributeError):
+            continue
+
+        def timed(*args, _original=original, _stage=stage, **kwargs):
+            with span(_stage):
+                return _original(*args, **kwargs)
+
+        setattr(cls, method_name, timed)
+
+
+def export_chrome_trace(path, events):
+    """导出为Chrome trace-event JSON"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+
+
+def summarize(events):
+    """按阶段汇总：次数、总耗时、平均和最大耗时（秒）"""
+    stages = {}
+    for event in events:
+        row = stages.setdefault(event['name'], {'stage': event['name'], 'count': 0,
+                                                'total': 0.0, 'max': 0.0})
+        seconds = event['dur'] / 1e6
+        row['count'] += 1
+        row['total'] += seconds
+        row['max'] = max(row['max'], seconds)
+    rows = sorted(stages.values(), key=lambda row: row['total'], reverse=True)
+    for row in rows:
+        row['mean'] = row['total'] / row['count']
+    return rows
+
+
+def format_summary(rows):
+    """把汇总结果排成文本表格"""
+    lines = [f'{"阶段":<16}{"次数":>8}{"总耗时(s)":>12}{"平均(ms)":>12}{"最大(ms)":>12}']
+    for row in rows:
+        lines.append(f'{row["stage"]:<18}{row["count"]:>8}{row["total"]:>14.3f}'
+                     f'{row["mean"] * 1000:>14.1f}{row["max"] * 1000:>14.1f}')
+    return '\n'.join(lines)
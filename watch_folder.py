@@ -0,0 +1,341 @@
+"""监视收件目录，自动转换新增或修改的文档
+
+文件放入收件目录后自动转换，结果按相同的相对路径写入输出目录。
+Linux上用inotify接收变化通知（通过ctypes调用libc，不需要额外依赖），
+其他平台或inotify不可用（例如监视数超过系统上限）时退化为定期扫描。
+
+已转换的文件记录在持久化索引中：(路径, 大小, 修改时间, SHA-256) → 输出文件，
+重启后只有大小或修改时间变化、且内容哈希也变化的文件才会重新转换，
+十万级文件的目录启动时只需一次 stat 遍历，不必重新计算哈希。
+刚出现或仍在写入的文件要等大小和修改时间稳定 settle 秒后才提交。
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import sqlite3
+import struct
+import sys
+import threading
+import time
+
+from conversion_cache import file_digest
+from converter_core import INPUT_EXTENSIONS, OUTPUT_EXTENSIONS, guess_conversion_type
+
+DEFAULT_SETTLE = 2.0
+DEFAULT_POLL_INTERVAL = 5.0
+INDEX_FILENAME = '.pdf-word-index.sqlite3'
+
+# inotify 事件掩码
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+_WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_MOVED_FROM | IN_DELETE | IN_DELETE_SELF
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class Inotify:
+    """最小化的inotify封装"""
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 失败')
+        self._paths = {}
+
+    def add_watch(self, path):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), _WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f'无法监视目录 {path}: {os.strerror(errno)}')
+        self._paths[wd] = path
+
+    def read(self, timeout):
+        """等待事件，返回 [(完整路径, 掩码)]；队列溢出时路径为None"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 256 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                events.append((None, mask))
+                continue
+            if mask & IN_IGNORED:
+                self._paths.pop(wd, None)
+                continue
+            directory = self._paths.get(wd)
+            if directory is not None:
+                events.append((os.path.join(directory, name) if name else directory, mask))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FileIndex:
+    """已处理文件的持久化索引（SQLite），常驻内存的副本用于快速比较"""
+
+    def __init__(self, path):
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS files ('
+                         'path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, sha256 TEXT, '
+                         'output TEXT, status TEXT, updated REAL)')
+        self.entries = {row[0]: row[1:] for row in self._db.execute(
+            'SELECT path, size, mtime, sha256, output, status FROM files')}
+
+    def get(self, path):
+        """返回 (size, mtime, sha256, output, status) 或 None"""
+        return self.entries.get(path)
+
+    def update(self, rows):
+        """批量写入 (path, size, mtime, sha256, output, status)"""
+        with self._db:
+            self._db.executemany('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                 [row + (time.time(),) for row in rows])
+        for row in rows:
+            self.entries[row[0]] = row[1:]
+
+    def remove(self, paths):
+        with self._db:
+            self._db.executemany('DELETE FROM files WHERE path = ?', [(path,) for path in paths])
+        for path in paths:
+            self.entries.pop(path, None)
+
+    def close(self):
+        self._db.close()
+
+
+class FolderWatcher:
+    """监视收件目录并把新文件提交给批量引擎
+
+    kind 为空时按扩展名判断每个文件的转换类型；on_result(result) 在每个文件转换完成后调用。
+    """
+
+    def __init__(self, inbox, outbox, engine, kind=None, index_path=None, settle=DEFAULT_SETTLE,
+                 poll_interval=DEFAULT_POLL_INTERVAL, polling=False, on_result=None, **options):
+        self.inbox = os.path.abspath(inbox)
+        self.outbox = os.path.abspath(outbox)
+        self.engine = engine
+        self.kind = kind
+        self.settle = settle
+        self.poll_interval = poll_interval
+        self.on_result = on_result
+        self.options = options
+        os.makedirs(self.outbox, exist_ok=True)
+        self.index = FileIndex(index_path or os.path.join(self.outbox, INDEX_FILENAME))
+        self._extensions = ({INPUT_EXTENSIONS[kind]} if kind else set(INPUT_EXTENSIONS.values()))
+        self._inotify = None
+        if not polling and sys.platform.startswith('linux'):
+            try:
+                self._inotify = Inotify()
+            except (OSError, AttributeError):
+                self._inotify = None
+        # 等待稳定的文件：路径 -> (大小, 修改时间, 最近一次变化的时间)
+        self._candidates = {}
+        self._inflight = {}
+        self._finished = []
+        self._finished_lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    @property
+    def mode(self):
+        return 'inotify' if self._inotify is not None else 'polling'
+
+    def _wanted(self, path, name):
+        if name.startswith(('.', '~$')) or os.path.splitext(name)[1].lower() not in self._extensions:
+            return False
+        return not path.startswith(self.outbox + os.sep)
+
+    # ---------- 发现变化 ----------
+
+    def _scan(self, directory):
+        """遍历目录（inotify模式下同时为子目录添加监视），把与索引不符的文件加入候选"""
+        stack = [directory]
+        seen = set()
+        while stack:
+            current = stack.pop()
+            if self._inotify is not None:
+                try:
+                    self._inotify.add_watch(current)
+                except OSError:
+                    # 超出监视数上限等情况，改为定期扫描
+                    self._inotify.close()
+                    self._inotify = None
+            try:
+                entries = os.scandir(current)
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.path != self.outbox:
+                            stack.append(entry.path)
+                    elif entry.is_file() and self._wanted(entry.path, entry.name):
+                        try:
+                            stat = entry.stat()
+                        except OSError:
+                            continue
+                        seen.add(entry.path)
+                        self._observe(entry.path, stat)
+        return seen
+
+    def _observe(self, path, stat=None):
+        """记录一次文件观测；大小或修改时间变化时重新开始计时"""
+        if stat is None:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                self._candidates.pop(path, None)
+                return
+        if path in self._inflight:
+            return
+        entry = self.index.get(path)
+        if entry is not None and entry[:2] == (stat.st_size, stat.st_mtime_ns):
+            self._candidates.pop(path, None)
+            return
+        previous = self._candidates.get(path)
+        if previous is None or previous[:2] != (stat.st_size, stat.st_mtime_ns):
+            # 修改时间早于稳定期的文件（例如启动前就已存在）无需再等待
+            changed = min(time.time(), stat.st_mtime_ns / 1e9)
+            self._candidates[path] = (stat.st_size, stat.st_mtime_ns, changed)
+
+    def _handle_events(self, events):
+        removed = []
+        for path, mask in events:
+            if path is None:
+                # 事件队列溢出，重新扫描一遍
+                self._scan(self.inbox)
+                continue
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self._scan(path)
+                continue
+            if mask & (IN_DELETE | IN_MOVED_FROM):
+                self._candidates.pop(path, None)
+                if path in self.index.entries:
+                    removed.append(path)
+            elif self._wanted(path, os.path.basename(path)):
+                self._observe(path)
+        if removed:
+            self.index.remove(removed)
+
+    def _poll(self):
+        seen = self._scan(self.inbox)
+        removed = [path for path in self.index.entries
+                   if path.startswith(self.inbox + os.sep) and path not in seen]
+        if removed:
+            self.index.remove(removed)
+        for path in list(self._candidates):
+            if path not in seen:
+                del self._candidates[path]
+
+    # ---------- 提交与结果 ----------
+
+    def output_path(self, input_path, kind):
+        """输出目录中与输入相同的相对路径"""
+        relative = os.path.relpath(input_path, self.inbox)
+        return os.path.join(self.outbox, os.path.splitext(relative)[0] + OUTPUT_EXTENSIONS[kind])
+
+    def _submit_stable(self):
+        now = time.time()
+        unchanged = []
+        for path, (size, mtime, changed) in list(self._candidates.items()):
+            if now - changed < self.settle:
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                del self._candidates[path]
+                continue
+            if (stat.st_size, stat.st_mtime_ns) != (size, mtime):
+                self._candidates[path] = (stat.st_size, stat.st_mtime_ns, now)
+                continue
+            del self._candidates[path]
+            kind = self.kind or guess_conversion_type(path)
+            output_path = self.output_path(path, kind)
+            try:
+                digest = file_digest(path)
+            except OSError:
+                # 稳定后又被删除或移走，等下次出现时重新观测
+                continue
+            entry = self.index.get(path)
+            if entry is not None and entry[2] == digest and (entry[4] != 'done' or os.path.exists(entry[3])):
+                # 只是修改时间变了（或上次已失败且内容未变），不再转换
+                unchanged.append((path, size, mtime, digest, entry[3], entry[4]))
+                continue
+            try:
+                os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                # 预检、估算开销时也会读取文件
+                self.engine.submit(path, output_path, kind, callback=self._job_finished, **self.options)
+            except OSError:
+                continue
+            # 结果回调只把结果排队，由本线程在下一轮写入索引，提交成功后再登记不会漏掉
+            self._inflight[path] = (size, mtime, digest)
+        if unchanged:
+            self.index.update(unchanged)
+
+    def _job_finished(self, result):
+        """在引擎收集线程中调用，结果交给监视线程统一写入索引"""
+        with self._finished_lock:
+            self._finished.append(result)
+        if self.on_result is not None:
+            self.on_result(result)
+
+    def _record_finished(self):
+        with self._finished_lock:
+            finished, self._finished = self._finished, []
+        rows = []
+        for result in finished:
+            path = result.job.input_path
+            size, mtime, digest = self._inflight.pop(path)
+            status = 'done' if result.success else ('cancelled' if result.cancelled else 'failed')
+            if status != 'cancelled':
+                rows.append((path, size, mtime, digest, result.job.output_path, status))
+            # 转换期间文件又被修改时重新观测
+            self._observe(path)
+        if rows:
+            self.index.update(rows)
+
+    # ---------- 主循环 ----------
+
+    def run(self):
+        """阻塞运行，直到 stop() 被调用"""
+        self._scan(self.inbox)
+        last_poll = time.monotonic()
+        tick = min(1.0, self.settle / 2) if self.settle else 0.5
+        try:
+            while not self._stopped.is_set():
+                if self._inotify is not None:
+                    self._handle_events(self._inotify.read(tick))
+                else:
+                    self._stopped.wait(tick)
+                    if time.monotonic() - last_poll >= self.poll_interval:
+                        self._poll()
+                        last_poll = time.monotonic()
+                self._record_finished()
+                self._submit_stable()
+        finally:
+            if self._inotify is not None:
+                self._inotify.close()
+            self.index.close()
+
+    def stop(self):
+        self._stopped.set()